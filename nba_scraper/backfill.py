@@ -0,0 +1,286 @@
+"""
+This file contains the job manifest that makes long scrapes resumable. Every
+game of a job is recorded as pending, completed or failed and each finished
+game's dataframe is saved to the job directory as soon as it is scraped so a
+rerun of the same job only scrapes the games that are left.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from nba_scraper.pipeline import iter_game_futures
+
+
+def atomic_write(path, write_func):
+    """
+    writes a file by writing to a temporary file in the same directory and
+    then renaming it over the real path so a crash never leaves half a file
+
+    Inputs:
+    path        - path of the file to write
+    write_func  - function that takes a file path and writes the file to it
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(file_descriptor)
+    try:
+        write_func(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class JobManifest:
+    """
+    Thread safe record of which games of a job are pending, completed or
+    failed. It is saved to manifest.json in the job directory after every
+    change
+    """
+
+    def __init__(self, job_dir):
+        """
+        Inputs:
+        job_dir - directory to keep the manifest and the scraped games in
+        """
+        self.job_dir = job_dir
+        self.games_dir = os.path.join(job_dir, "games")
+        self.path = os.path.join(job_dir, "manifest.json")
+        self.lock = threading.Lock()
+        os.makedirs(self.games_dir, exist_ok=True)
+
+        self.pending = []
+        self.completed = []
+        self.failed = {}
+        if os.path.exists(self.path):
+            with open(self.path) as manifest_file:
+                manifest = json.load(manifest_file)
+            self.pending = manifest["pending"]
+            self.completed = manifest["completed"]
+            self.failed = manifest["failed"]
+
+    def save(self):
+        """
+        writes the manifest to disk. Has to be called holding the lock
+        """
+        manifest = {
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+        def write_manifest(path):
+            with open(path, "w") as manifest_file:
+                json.dump(manifest, manifest_file, indent=4)
+
+        atomic_write(self.path, write_manifest)
+
+    def add_games(self, game_ids):
+        """
+        adds games to the job. Games that are already completed are left
+        alone and games that failed on an earlier run are tried again
+
+        Inputs:
+        game_ids    - list of full game id strings
+        """
+        with self.lock:
+            completed = set(self.completed)
+            for game_id in game_ids:
+                if game_id in completed:
+                    continue
+                self.failed.pop(game_id, None)
+                if game_id not in self.pending:
+                    self.pending.append(game_id)
+            self.save()
+
+    def game_path(self, game_id):
+        """
+        Inputs:
+        game_id     - full game id string
+
+        Outputs:
+        path        - path the game's dataframe is saved to
+        """
+        return os.path.join(self.games_dir, f"{game_id}.pkl")
+
+    def mark_completed(self, game_id, game_df):
+        """
+        saves a scraped game's dataframe and marks it completed
+
+        Inputs:
+        game_id     - full game id string
+        game_df     - dataframe of the game's play by play
+        """
+        atomic_write(self.game_path(game_id), game_df.to_pickle)
+        with self.lock:
+            if game_id in self.pending:
+                self.pending.remove(game_id)
+            self.failed.pop(game_id, None)
+            if game_id not in self.completed:
+                self.completed.append(game_id)
+            self.save()
+
+    def mark_failed(self, game_id, error):
+        """
+        Inputs:
+        game_id     - full game id string
+        error       - the exception the game failed with
+        """
+        with self.lock:
+            if game_id in self.pending:
+                self.pending.remove(game_id)
+            self.failed[game_id] = repr(error)
+            self.save()
+
+    def job_failed(self, job_games):
+        """
+        Inputs:
+        job_games   - set of the game ids of the job being run
+
+        Outputs:
+        game_ids    - list of the failed games that are in the job
+        """
+        with self.lock:
+            return [g for g in self.failed if g in job_games]
+
+    def retry_failed(self, job_games=None):
+        """
+        moves failed games back to pending. Games other runs in the same
+        directory added are left failed
+
+        Inputs:
+        job_games   - set of the game ids of the job being run. None moves
+                      every failed game
+
+        Outputs:
+        game_ids    - list of the game ids that were moved
+        """
+        with self.lock:
+            game_ids = [g for g in self.failed if job_games is None or g in job_games]
+            for game_id in game_ids:
+                del self.failed[game_id]
+            self.pending.extend(g for g in game_ids if g not in self.pending)
+            self.save()
+        return game_ids
+
+    def load_game(self, game_id):
+        """
+        Inputs:
+        game_id     - full game id string of a completed game
+
+        Outputs:
+        game_df     - the saved dataframe of the game
+        """
+        return pd.read_pickle(self.game_path(game_id))
+
+
+def iter_job(
+    game_ids,
+    scrape_func,
+    job_dir,
+    workers=1,
+    retries=2,
+    backoff=5.0,
+    parse_func=None,
+    processes=0,
+    finish_func=None,
+    ordered=True,
+):
+    """
+    generator that scrapes every game in a job that isn't completed yet
+    saving each one and yielding it as soon as it finishes. Games that fail
+    are retried at the end of the run with an exponential backoff between
+    rounds instead of stopping the run
+
+    Inputs:
+    game_ids    - list of full game id strings in the job
+    scrape_func - function that takes a game id and returns its pbp dataframe
+                  or downloads it for parse_func if one is passed
+    job_dir     - directory of the job manifest. Rerunning with the same
+                  directory picks up where the last run stopped
+    workers     - max number of games to scrape at the same time
+    retries     - number of times to retry the games that failed
+    backoff     - seconds to wait before the first retry. Doubles each retry
+    parse_func  - function that turns what scrape_func returns into the
+                  game's dataframe
+    processes   - number of processes to run parse_func in
+    finish_func - function run in this process on what parse_func returns
+    ordered     - True yields each round's games in the order of game_ids.
+                  False yields them as they finish
+
+    Outputs:
+    yields (game_id, game_df) tuples of the games scraped by this run.
+    Retried games come after the round they failed in
+    """
+    manifest = JobManifest(job_dir)
+    manifest.add_games(game_ids)
+    job_games = set(game_ids)
+
+    for attempt in range(retries + 1):
+        if attempt > 0:
+            failed = manifest.job_failed(job_games)
+            if not failed:
+                break
+            wait = backoff * 2 ** (attempt - 1)
+            print(f"Retrying {len(failed)} failed games in {wait} seconds")
+            time.sleep(wait)
+            manifest.retry_failed(job_games)
+
+        to_scrape = [g for g in manifest.pending if g in job_games]
+        for game_id, game_future in iter_game_futures(
+            to_scrape,
+            scrape_func,
+            parse_func,
+            workers,
+            processes,
+            ordered=ordered,
+            finish_func=finish_func,
+        ):
+            if game_future.exception() is not None:
+                print(f"Game {game_id} failed: {game_future.exception()!r}")
+                manifest.mark_failed(game_id, game_future.exception())
+            else:
+                manifest.mark_completed(game_id, game_future.result())
+                yield game_id, game_future.result()
+
+    failed = manifest.job_failed(job_games)
+    if failed:
+        print(f"Games still failing after {retries} retries: {failed}")
+
+
+def run_job(
+    game_ids,
+    scrape_func,
+    job_dir,
+    workers=1,
+    retries=2,
+    backoff=5.0,
+    parse_func=None,
+    processes=0,
+    finish_func=None,
+):
+    """
+    scrapes every game in a job that isn't completed yet without keeping the
+    games in memory. Takes the same arguments as iter_job
+
+    Outputs:
+    manifest    - the JobManifest of the job
+    """
+    for _ in iter_job(
+        game_ids,
+        scrape_func,
+        job_dir,
+        workers,
+        retries,
+        backoff,
+        parse_func,
+        processes,
+        finish_func,
+    ):
+        pass
+    return JobManifest(job_dir)
@@ -0,0 +1,315 @@
+"""
+This file contains the on disk cache that the scraper stores the NBA and WNBA
+api responses in so that rescraping a game doesn't have to download it again.
+
+The cache is a sqlite database in the cache directory which lets multiple
+processes share one cache directory safely. Any object with the same get and
+set methods as ResponseCache can be passed to set_cache to replace it.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from nba_scraper.json_decode import decode_json
+
+# how many seconds a response from each endpoint is good for. None means the
+# response never expires which is what we want for games that are already
+# finished. Endpoints not listed here use the ttl passed to the cache
+DAY = 24 * 60 * 60
+ENDPOINT_TTL = {
+    "playbyplayv2": None,
+    "boxscoreadvancedv2": None,
+    "teamgamelog": DAY,
+    "full_schedule": DAY,
+    "game_date_index": DAY,
+    "game_index": DAY,
+    "missing_games": None,
+    "wnba_pbp": None,
+    "wnba_period_count": None,
+    "wnba_boxscoreadvancedv2": None,
+    "wnba_player": None,
+    "wnba_player_list": DAY,
+    "wnba_player_directory": None,
+    "wnba_teamdetails": 7 * DAY,
+    "wnba_full_schedule": DAY,
+}
+
+# the cache the fetch functions use. None means responses aren't cached
+CACHE = None
+
+
+def cache_key(endpoint, params):
+    """
+    create the key a response is stored under from the endpoint and the
+    parameters of the request
+
+    Inputs:
+    endpoint    - name of the api endpoint
+    params      - dictionary of the parameters passed to the endpoint
+
+    Outputs:
+    key         - sha1 hex digest of the endpoint and sorted parameters
+    """
+    raw_key = json.dumps([endpoint, params], sort_keys=True, default=str)
+    return hashlib.sha1(raw_key.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Size capped on disk cache of api responses with least recently used
+    eviction and a time to live for each endpoint
+    """
+
+    def __init__(
+        self,
+        cache_dir=f"{Path.home()}/.nba_scraper_cache",
+        max_size=2 * 1024**3,
+        ttl=None,
+        endpoint_ttl=None,
+    ):
+        """
+        Inputs:
+        cache_dir    - directory to store the cache database in
+        max_size     - max size in bytes of the stored responses before the
+                       least recently used ones are evicted
+        ttl          - default seconds a response is valid for endpoints not
+                       in endpoint_ttl. None means they never expire
+        endpoint_ttl - dictionary of endpoint to ttl that overrides
+                       ENDPOINT_TTL
+        """
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, "responses.sqlite")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.endpoint_ttl = dict(ENDPOINT_TTL)
+        if endpoint_ttl is not None:
+            self.endpoint_ttl.update(endpoint_ttl)
+        self._local = threading.local()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, endpoint TEXT, value TEXT, size INTEGER, "
+            "created REAL, accessed REAL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+
+    def _connect(self):
+        """
+        sqlite connections can't be shared between threads or forked
+        processes so each thread in each process gets its own
+
+        Outputs:
+        conn    - sqlite connection to the cache database
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_ttl(self, endpoint):
+        """
+        Inputs:
+        endpoint    - name of the api endpoint
+
+        Outputs:
+        ttl         - seconds a response from the endpoint is valid for
+        """
+        return self.endpoint_ttl.get(endpoint, self.ttl)
+
+    def get(self, endpoint, params):
+        """
+        gets a stored response if there is one that hasn't expired
+
+        Inputs:
+        endpoint    - name of the api endpoint
+        params      - dictionary of the parameters passed to the endpoint
+
+        Outputs:
+        value       - the decoded JSON response or None if it isn't cached
+        """
+        key = cache_key(endpoint, params)
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        ttl = self.get_ttl(endpoint)
+        if ttl is not None and now - row[1] > ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+
+        conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return decode_json(row[0])
+
+    def set(self, endpoint, params, value):
+        """
+        stores a response and evicts the least recently used responses if
+        the cache is now bigger than max_size
+
+        Inputs:
+        endpoint    - name of the api endpoint
+        params      - dictionary of the parameters passed to the endpoint
+        value       - decoded JSON response to store
+        """
+        key = cache_key(endpoint, params)
+        data = json.dumps(value)
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, data, len(data), now, now),
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def update(self, endpoint, params, update_func):
+        """
+        reads a stored response, changes it and stores it again in one
+        transaction so updates from other threads and processes in between
+        aren't lost
+
+        Inputs:
+        endpoint    - name of the api endpoint
+        params      - dictionary of the parameters passed to the endpoint
+        update_func - function that takes the stored value, or None if there
+                      isn't one, and returns the value to store
+
+        Outputs:
+        value       - the value that was stored
+        """
+        key = cache_key(endpoint, params)
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            ttl = self.get_ttl(endpoint)
+            stored = None
+            if row is not None and (ttl is None or now - row[1] <= ttl):
+                stored = decode_json(row[0])
+            value = update_func(stored)
+            data = json.dumps(value)
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, data, len(data), now, now),
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def _evict(self, conn):
+        """
+        deletes the least recently used responses until the cache is under
+        max_size. Has to be called inside a transaction
+
+        Inputs:
+        conn    - sqlite connection with an open transaction
+        """
+        total_size = conn.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+        if total_size is None or total_size <= self.max_size:
+            return
+
+        evict_keys = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed ASC"
+        ):
+            if total_size <= self.max_size:
+                break
+            evict_keys.append((key,))
+            total_size -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evict_keys)
+
+    def size(self):
+        """
+        Outputs:
+        size    - total size in bytes of the stored responses
+        """
+        total = self._connect().execute("SELECT SUM(size) FROM responses").fetchone()
+        return total[0] or 0
+
+    def clear(self):
+        """
+        deletes every stored response
+        """
+        self._connect().execute("DELETE FROM responses")
+
+
+def set_cache(cache):
+    """
+    sets the cache every api call checks before going out to the network
+
+    Inputs:
+    cache   - ResponseCache or any object with the same get/set methods.
+              Pass None to turn caching off
+    """
+    global CACHE
+    CACHE = cache
+
+
+def get_cache():
+    """
+    Outputs:
+    cache   - the cache currently in use or None if caching is off
+    """
+    return CACHE
+
+
+def update_cache(endpoint, params, update_func):
+    """
+    changes a stored value in the cache in use. Caches without an update
+    method, like ones passed to set_cache that only have get and set, are
+    read and written without a transaction
+
+    Inputs:
+    endpoint    - name of the api endpoint
+    params      - dictionary of the parameters passed to the endpoint
+    update_func - function that takes the stored value, or None if there
+                  isn't one, and returns the value to store
+    """
+    cache = get_cache()
+    if cache is None:
+        return
+    if hasattr(cache, "update"):
+        cache.update(endpoint, params, update_func)
+    else:
+        cache.set(endpoint, params, update_func(cache.get(endpoint, params)))
+
+
+def enable_cache(cache_dir=f"{Path.home()}/.nba_scraper_cache", **kwargs):
+    """
+    turns on the on disk cache for all api calls
+
+    Inputs:
+    cache_dir   - directory to store the cache in
+    kwargs      - passed on to ResponseCache
+
+    Outputs:
+    cache       - the ResponseCache that is now in use
+    """
+    cache = ResponseCache(cache_dir, **kwargs)
+    set_cache(cache)
+    return cache
@@ -0,0 +1,153 @@
+"""
+This file contains the http client that every call to the NBA and WNBA apis
+goes through. It keeps a pool of open connections so each api call doesn't
+have to open a new one and lets the transport be swapped out so the whole
+scraper can be pointed at a different server.
+"""
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nba_scraper.json_decode import decode_json
+from nba_scraper.rate_limit import RateLimiter
+
+# TODO look at replacing this with the fake-useragent package Matt Barlowe 2019-12-04
+# have to pass this to the requests function or the api will return a 403 code
+USER_AGENT = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:72.0) Gecko/20100101 Firefox/72.0",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.5",
+    "X-NewRelic-ID": "VQECWF5UChAHUlNTBwgBVw==",
+    "x-nba-stats-origin": "stats",
+    "x-nba-stats-token": "true",
+    "Connection": "keep-alive",
+    "Referer": "https://stats.nba.com/",
+}
+
+# the client the fetch functions use when one isn't passed to them
+CLIENT = None
+
+
+class NBAClient:
+    """
+    Wrapper around a requests Session that pools and reuses connections,
+    asks for gzipped responses, always sets a timeout and throttles requests
+    with a RateLimiter
+    """
+
+    def __init__(
+        self,
+        timeout=(10, 60),
+        pool_size=20,
+        transport=None,
+        host_map=None,
+        rate_limiter=None,
+    ):
+        """
+        Inputs:
+        timeout     - seconds to wait for the connection and then the response.
+                      Either one number or a (connect, read) tuple
+        pool_size   - number of open connections to keep for each host
+        transport   - requests transport adapter to send the requests with.
+                      Defaults to a pooled HTTPAdapter
+        host_map    - dictionary of url prefixes to replace before sending the
+                      request ex: {'https://stats.nba.com': 'http://localhost:8000'}
+        rate_limiter - RateLimiter shared by every request this client sends.
+                       Defaults to one that starts the schedule host at one
+                       request a second. Pass False to turn off throttling
+        """
+        self.timeout = timeout
+        self.host_map = host_map if host_map is not None else {}
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(host_rates={"data.nba.com": 1.0})
+        self.rate_limiter = rate_limiter
+        if transport is None:
+            transport = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+        self.session = requests.Session()
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        self.session.mount("http://", transport)
+        self.session.mount("https://", transport)
+
+    def rewrite_url(self, url):
+        """
+        Inputs:
+        url     - url of the api call
+
+        Outputs:
+        url     - url with its prefix replaced if it is in host_map
+        """
+        for prefix, replacement in self.host_map.items():
+            if url.startswith(prefix):
+                return replacement + url[len(prefix) :]
+        return url
+
+    def get(self, url, headers=None):
+        """
+        Inputs:
+        url         - url of the api call
+        headers     - headers to pass with the request
+
+        Outputs:
+        response    - requests Response object
+        """
+        url = self.rewrite_url(url)
+        if not self.rate_limiter:
+            return self.session.get(url, headers=headers, timeout=self.timeout)
+
+        host = urlsplit(url).netloc
+        self.rate_limiter.acquire(host)
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            self.rate_limiter.record(host, time.monotonic() - start, None)
+            raise
+        self.rate_limiter.record(host, time.monotonic() - start, response.status_code)
+
+        return response
+
+    def get_json(self, url, headers=None):
+        """
+        Inputs:
+        url         - url of the api call
+        headers     - headers to pass with the request
+
+        Outputs:
+        response_dict - the decoded JSON response. Responses with an error
+                        status raise a requests.HTTPError instead
+        """
+        response = self.get(url, headers=headers)
+        response.raise_for_status()
+        return decode_json(response.content)
+
+    def close(self):
+        """
+        closes all the pooled connections
+        """
+        self.session.close()
+
+
+def set_client(client):
+    """
+    sets the client the fetch functions use when one isn't passed to them
+
+    Inputs:
+    client  - NBAClient or any object with the same get_json method
+    """
+    global CLIENT
+    CLIENT = client
+
+
+def get_client():
+    """
+    Outputs:
+    client  - the client currently in use. One with the default settings is
+              created the first time this is called
+    """
+    global CLIENT
+    if CLIENT is None:
+        CLIENT = NBAClient()
+    return CLIENT
@@ -0,0 +1,104 @@
+"""
+This file contains the functions that work out which of the derived play by
+play columns have to be calculated to give the columns a user asked for.
+
+Each league's derived columns are declared in a graph, a dictionary of the
+column name to a tuple of the columns it is calculated from and the function
+that calculates it. The function is passed the play by play dataframe of the
+api columns and a dictionary of the derived columns already calculated.
+Columns that start with an underscore are only used to calculate other
+columns and are never returned. Any column that isn't in the graph is an api
+column read straight from the response.
+"""
+
+# every column of the players on the court at each event in the order both
+# leagues add them. These come from the lineup api instead of the graphs
+ALL_LINEUP_COLUMNS = [
+    f"{side}_player_{number}{suffix}"
+    for side in ["home", "away"]
+    for number in range(1, 6)
+    for suffix in ["", "_id"]
+]
+
+
+def check_columns(columns, known_columns):
+    """
+    raises a ValueError if any of the columns can't be scraped
+
+    Inputs:
+    columns         - list of the columns asked for
+    known_columns   - collection of every column that can be scraped
+    """
+    unknown_columns = [column for column in columns if column not in known_columns]
+    if unknown_columns:
+        raise ValueError(
+            f"Unknown columns {unknown_columns}. "
+            "Columns must be api or derived play by play columns"
+        )
+
+
+def needs_lineups(columns):
+    """
+    Inputs:
+    columns     - list of the columns asked for or None for every column
+
+    Outputs:
+    needs_lineups - True if any of the lineup columns were asked for
+    """
+    return columns is None or any(column in ALL_LINEUP_COLUMNS for column in columns)
+
+
+def resolve_columns(graph, columns):
+    """
+    Inputs:
+    graph           - dictionary of derived column to the columns it needs and
+                      the function that calculates it
+    columns         - list of the columns asked for
+
+    Outputs:
+    derived_order   - list of the derived columns needed in the order they
+                      have to be calculated in so each one comes after the
+                      columns it needs
+    api_columns     - set of the api columns needed
+    """
+    derived_order = []
+    api_columns = set()
+    visited = set()
+
+    def visit(column):
+        if column in visited:
+            return
+        visited.add(column)
+        if column not in graph:
+            api_columns.add(column)
+            return
+        for dependency in graph[column][0]:
+            visit(dependency)
+        derived_order.append(column)
+
+    for column in columns:
+        visit(column)
+
+    return derived_order, api_columns
+
+
+def compute_columns(graph, derived_order, pbp_df, derived=None):
+    """
+    Inputs:
+    graph           - dictionary of derived column to the columns it needs and
+                      the function that calculates it
+    derived_order   - list of derived columns from resolve_columns
+    pbp_df          - dataframe of the api columns
+    derived         - dictionary of derived columns that are already known.
+                      These aren't calculated again
+
+    Outputs:
+    derived         - dictionary of every derived column in derived_order to
+                      its values
+    """
+    if derived is None:
+        derived = {}
+    for column in derived_order:
+        if column not in derived:
+            derived[column] = graph[column][1](pbp_df, derived)
+    return derived
@@ -0,0 +1,264 @@
+"""
+This file contains the writer and reader for saving scraped games as parquet
+or arrow datasets. Each game is its own file partitioned by league, season
+and game id:
+
+    data_dir/league=nba/season=2019/game_id=0021800001/part-0.parquet
+
+and each game's directory has an _index.json of its teams and date so
+reading back one team's games only opens the files of the games that team
+played in. Every game has its own index file so writers in different
+processes never overwrite each other's entries.
+"""
+import json
+import os
+
+try:
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    feather = None
+    pq = None
+import pandas as pd
+
+from nba_scraper.backfill import atomic_write
+from nba_scraper.schema import to_arrow_table
+
+FILE_SUFFIXES = {"parquet": ".parquet", "arrow": ".arrow"}
+INDEX_FILE = "_index.json"
+# the columns every game needs to be put in its partition and index
+DATASET_COLUMNS = [
+    "game_id",
+    "home_team_abbrev",
+    "away_team_abbrev",
+    "home_team_id",
+    "away_team_id",
+    "game_date",
+]
+
+
+def dataset_columns(columns):
+    """
+    Inputs:
+    columns     - list of the columns asked for or None for every column
+
+    Outputs:
+    columns     - the same columns followed by any of DATASET_COLUMNS that
+                  weren't asked for
+    """
+    if columns is None:
+        return None
+    return list(columns) + [
+        column for column in DATASET_COLUMNS if column not in columns
+    ]
+
+
+def get_game_season(league, game_df):
+    """
+    Inputs:
+    league      - either nba or wnba
+    game_df     - dataframe of the game's play by play
+
+    Outputs:
+    season      - season the game was played in as an integer. For the nba
+                  this is the year the season ends in
+    """
+    if "season" in game_df.columns:
+        return int(game_df["season"].iloc[0])
+    game_id = game_df["game_id"].iloc[0]
+    if league == "wnba" and game_id[2:4] in ["98", "99"]:
+        return int(f"19{game_id[2:4]}")
+    if league == "wnba":
+        return int(f"20{game_id[2:4]}")
+    return int(f"20{game_id[3:5]}") + 1
+
+
+def get_season_dir(data_dir, league, season):
+    """
+    Inputs:
+    data_dir    - root directory of the dataset
+    league      - either nba or wnba
+    season      - season as an integer
+
+    Outputs:
+    season_dir  - directory the season's games are saved in
+    """
+    return os.path.join(data_dir, f"league={league}", f"season={season}")
+
+
+def load_index(season_dir):
+    """
+    merges the index files of every game in a season. Datasets written
+    before each game had its own index file have one for the whole season
+
+    Inputs:
+    season_dir  - directory of a season in the dataset
+
+    Outputs:
+    index       - dictionary of game id to the game's file and teams
+    """
+    index = {}
+    if not os.path.isdir(season_dir):
+        return index
+    season_index_path = os.path.join(season_dir, INDEX_FILE)
+    if os.path.exists(season_index_path):
+        with open(season_index_path) as index_file:
+            index.update(json.load(index_file))
+
+    for game_dir in os.listdir(season_dir):
+        index_path = os.path.join(season_dir, game_dir, INDEX_FILE)
+        if not game_dir.startswith("game_id=") or not os.path.exists(index_path):
+            continue
+        with open(index_path) as index_file:
+            index[game_dir.split("=", 1)[1]] = json.load(index_file)
+    return index
+
+
+class DatasetWriter:
+    """
+    Writes each game to its own parquet or arrow file as it is scraped along
+    with the game's index entry
+    """
+
+    def __init__(
+        self, data_dir, league="nba", file_format="parquet", compression="zstd"
+    ):
+        """
+        Inputs:
+        data_dir    - root directory of the dataset
+        league      - either nba or wnba
+        file_format - parquet or arrow
+        compression - compression codec passed on to pyarrow
+        """
+        if pq is None:
+            raise ImportError(
+                "parquet and arrow output needs the pyarrow package. "
+                "Install it with pip install pyarrow"
+            )
+        if file_format not in FILE_SUFFIXES:
+            raise ValueError(
+                f"Unknown file format {file_format}. "
+                f"File format must be one of {list(FILE_SUFFIXES)}"
+            )
+        self.data_dir = data_dir
+        self.league = league
+        self.file_format = file_format
+        self.compression = compression
+        self.games_written = 0
+
+    def write_table(self, table, path):
+        """
+        Inputs:
+        table       - pyarrow Table of a game
+        path        - path of the file to write
+        """
+        if self.file_format == "parquet":
+            pq.write_table(table, path, compression=self.compression)
+        else:
+            feather.write_feather(table, path, compression=self.compression)
+
+    def write(self, game_df):
+        """
+        writes a game and its index entry to its partition
+
+        Inputs:
+        game_df     - dataframe of the game's play by play
+        """
+        season = get_game_season(self.league, game_df)
+        game_id = game_df["game_id"].iloc[0]
+        season_dir = get_season_dir(self.data_dir, self.league, season)
+        game_dir = os.path.join(season_dir, f"game_id={game_id}")
+        os.makedirs(game_dir, exist_ok=True)
+
+        table = to_arrow_table(game_df)
+        game_path = os.path.join(game_dir, f"part-0{FILE_SUFFIXES[self.file_format]}")
+        atomic_write(game_path, lambda path: self.write_table(table, path))
+
+        game_index = {
+            "path": os.path.relpath(game_path, season_dir),
+            "home_team_abbrev": game_df["home_team_abbrev"].iloc[0],
+            "away_team_abbrev": game_df["away_team_abbrev"].iloc[0],
+            "home_team_id": int(game_df["home_team_id"].iloc[0]),
+            "away_team_id": int(game_df["away_team_id"].iloc[0]),
+            "game_date": str(pd.to_datetime(game_df["game_date"].iloc[0]).date()),
+            "rows": len(game_df),
+        }
+
+        def write_index(path):
+            with open(path, "w") as index_file:
+                json.dump(game_index, index_file, indent=4, sort_keys=True)
+
+        atomic_write(os.path.join(game_dir, INDEX_FILE), write_index)
+        self.games_written += 1
+
+
+def write_dataset(
+    game_frames, data_dir, league="nba", file_format="parquet", compression="zstd"
+):
+    """
+    writes games to a partitioned dataset one at a time as they come in
+
+    Inputs:
+    game_frames - iterable of game dataframes
+    data_dir    - root directory of the dataset
+    league      - either nba or wnba
+    file_format - parquet or arrow
+    compression - compression codec passed on to pyarrow
+
+    Outputs:
+    games_written - number of games written to the dataset
+    """
+    writer = DatasetWriter(data_dir, league, file_format, compression)
+    for game_df in game_frames:
+        writer.write(game_df)
+    return writer.games_written
+
+
+def read_dataset(data_dir, league="nba", seasons=None, team=None, columns=None):
+    """
+    reads games back from a dataset. Only the files of the games that match
+    the seasons and team are opened
+
+    Inputs:
+    data_dir    - root directory of the dataset
+    league      - either nba or wnba
+    seasons     - list of seasons to read. None reads every season
+    team        - team abbreviation or id to read the games of. None reads
+                  every game
+    columns     - list of columns to read. None reads them all
+
+    Outputs:
+    games_df    - dataframe of the games in game id order or None if no games
+                  matched
+    """
+    league_dir = os.path.join(data_dir, f"league={league}")
+    if seasons is None:
+        seasons = sorted(
+            int(d.split("=")[1])
+            for d in os.listdir(league_dir)
+            if d.startswith("season=")
+        )
+
+    game_frames = []
+    for season in seasons:
+        season_dir = get_season_dir(data_dir, league, season)
+        index = load_index(season_dir)
+        for game_id in sorted(index):
+            game = index[game_id]
+            if team is not None and team not in [
+                game["home_team_abbrev"],
+                game["away_team_abbrev"],
+                game["home_team_id"],
+                game["away_team_id"],
+            ]:
+                continue
+            game_path = os.path.join(season_dir, game["path"])
+            if game_path.endswith(FILE_SUFFIXES["parquet"]):
+                table = pq.read_table(game_path, columns=columns)
+            else:
+                table = feather.read_table(game_path, columns=columns)
+            game_frames.append(table.to_pandas())
+
+    if len(game_frames) == 0:
+        return None
+    return pd.concat(game_frames, ignore_index=True)
@@ -0,0 +1,156 @@
+"""
+This file contains the game index the scrapers look up each game's teams,
+date, season type and period count in instead of working them out from the
+play by play. The index is filled in bulk from each season's schedule and
+saved in the response cache if one is set. Games the schedule or play by play
+get wrong are corrected by the entries in data/game_overrides.json.
+
+Each game's entry can have any of home_team_id, home_team_abbrev,
+away_team_id, away_team_abbrev, game_date, season_type and periods.
+"""
+import json
+import os
+import threading
+
+from nba_scraper.cache import get_cache
+
+GAME_OVERRIDES_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "game_overrides.json"
+)
+
+
+def get_index_season(game_id):
+    """
+    Inputs:
+    game_id     - full game id string like 0021900001
+
+    Outputs:
+    season      - the year the game's season started in as an integer. Years
+                  from 46 on are 19xx since the NBA's first season was 1946
+    """
+    if int(game_id[3:5]) >= 46:
+        return int(f"19{game_id[3:5]}")
+    return int(f"20{game_id[3:5]}")
+
+
+class GameIndex:
+    """
+    Thread safe index of game id to the game's metadata for each league. Each
+    season's games are stored in the cache under their own key so only the
+    seasons that are scraped are loaded
+    """
+
+    def __init__(self, overrides_file=GAME_OVERRIDES_FILE):
+        """
+        Inputs:
+        overrides_file - json file of the game entries that override the
+                         schedule's
+        """
+        # league -> {game_id: dictionary of the game's fields}
+        self.games = {}
+        self.overrides_file = overrides_file
+        self.overrides = None
+        self.cached_seasons = set()
+        self.schedule_seasons = set()
+        self.lock = threading.Lock()
+
+    def get_overrides(self, league):
+        """
+        Inputs:
+        league      - either nba or wnba
+
+        Outputs:
+        overrides   - dictionary of game id to the fields that override the
+                      index's
+        """
+        with self.lock:
+            if self.overrides is None:
+                with open(self.overrides_file) as overrides_file:
+                    self.overrides = json.load(overrides_file)
+            return self.overrides.get(league, {})
+
+    def load_cached_season(self, league, season):
+        """
+        adds a season's games saved in the cache to the index. Each season is
+        only read from the cache once
+
+        Inputs:
+        league      - either nba or wnba
+        season      - the year the season started in
+        """
+        with self.lock:
+            if (league, season) in self.cached_seasons:
+                return
+            self.cached_seasons.add((league, season))
+
+        cache = get_cache()
+        if cache is None:
+            return
+        stored_games = cache.get("game_index", {"league": league, "season": season})
+        if stored_games:
+            with self.lock:
+                league_games = self.games.setdefault(league, {})
+                for game_id, game_info in stored_games.items():
+                    league_games.setdefault(game_id, {}).update(game_info)
+
+    def add_games(self, league, season, games):
+        """
+        adds games to the index and saves the season's games to the cache if
+        one is set
+
+        Inputs:
+        league      - either nba or wnba
+        season      - the year the games' season started in
+        games       - dictionary of game id to a dictionary of its fields
+        """
+        self.load_cached_season(league, season)
+        with self.lock:
+            league_games = self.games.setdefault(league, {})
+            for game_id, game_info in games.items():
+                league_games.setdefault(game_id, {}).update(game_info)
+            season_games = {
+                game_id: dict(league_games[game_id])
+                for game_id in league_games
+                if get_index_season(game_id) == season
+            }
+
+        cache = get_cache()
+        if cache is not None:
+            cache.set("game_index", {"league": league, "season": season}, season_games)
+
+    def get(self, league, game_id):
+        """
+        Inputs:
+        league      - either nba or wnba
+        game_id     - full game id string
+
+        Outputs:
+        game_info   - dictionary of the fields known for the game with the
+                      override entries applied. Empty if nothing is known
+        """
+        self.load_cached_season(league, get_index_season(game_id))
+        overrides = self.get_overrides(league)
+        with self.lock:
+            game_info = dict(self.games.get(league, {}).get(game_id, {}))
+        game_info.update(overrides.get(game_id, {}))
+        return game_info
+
+    def start_schedule_load(self, league, season):
+        """
+        Inputs:
+        league      - either nba or wnba
+        season      - the year the season started in
+
+        Outputs:
+        first_load  - True the first time it is called for a season so the
+                      season's schedule is only tried once
+        """
+        with self.lock:
+            if (league, season) in self.schedule_seasons:
+                return False
+            self.schedule_seasons.add((league, season))
+            return True
+
+
+# the index both the scrapers and the schedule use
+GAME_INDEX = GameIndex()
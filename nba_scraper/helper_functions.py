@@ -4,8 +4,9 @@
 # TODO get all the shot types from the hackathon data they sent out and update
 # this dictionary
 import datetime
-import time
-import requests
+
+from nba_scraper.cache import get_cache
+from nba_scraper.client import get_client
 
 
 # this dictionary will categorize the event types that happen in the NBA
@@ -29,54 +30,54 @@ EVENT_TYPE_DICT = {
 }
 
 
-def get_date_games(from_date, to_date):
+def get_json(endpoint, params, url, headers=None, client=None, is_final=None):
+    """
+    Gets the JSON response of an api call. If a cache has been set the
+    response is looked up in it first and stored in it after it is downloaded
+    unless is_final says it can still change
+
+    Inputs:
+    endpoint    - name of the api endpoint used as part of the cache key
+    params      - dictionary of the request parameters used as the rest of
+                  the cache key
+    url         - full url of the api call
+    headers     - headers to pass with the request
+    client      - NBAClient to make the request with. Defaults to the one
+                  returned by client.get_client
+    is_final    - function that takes the decoded response and returns False
+                  if it isn't final yet, like the play by play of a game that
+                  is still being played, so it isn't cached. None caches every
+                  response
+
+    Outputs:
+    response_dict - the decoded JSON response
     """
-    Get all the game_ids in a valid date range
+    cache = get_cache()
+    if cache is not None:
+        response_dict = cache.get(endpoint, params)
+        if response_dict is not None:
+            return response_dict
 
+    if client is None:
+        client = get_client()
+    response_dict = client.get_json(url, headers=headers)
+
+    if cache is not None and (is_final is None or is_final(response_dict)):
+        cache.set(endpoint, params, response_dict)
+
+    return response_dict
+
+
+def has_lineup_rows(lineup_dict):
+    """
     Inputs:
-    date_from   - Date to scrape from
-    date_to     - Date to scrape to
+    lineup_dict - dictionary of the boxscoreadvancedv2 api response
 
     Outputs:
-    game_ids - List of game_ids in range
+    has_rows    - True if the response has any players. A period that hasn't
+                  started yet has none
     """
-    game_ids = []
-    from_date = datetime.datetime.strptime(from_date, "%Y-%m-%d")
-    to_date = datetime.datetime.strptime(to_date, "%Y-%m-%d")
-
-    # Must check each season in between date range
-    for season in range(get_season(from_date), get_season(to_date) + 1):
-        url = (
-            "http://data.nba.com/data/10s/v2015/json/mobile_teams"
-            f"/nba/{season}/league/00_full_schedule.json"
-        )
-        schedule = requests.get(url).json()
-        time.sleep(1)
-
-        for month in schedule["lscd"]:
-            if month["mscd"]["g"]:
-                # Assume games in order so first in list is first game in month
-                cur_month = datetime.datetime.strptime(
-                    month["mscd"]["g"][0]["gdte"], "%Y-%m-%d"
-                )
-
-                # If first game in month doesn't fall in range no need to check each game for rest of month
-                # Convert from_date to beginning of month as that is where cur_month starts
-                if (
-                    to_date
-                    >= cur_month
-                    >= (from_date - datetime.timedelta(from_date.day - 1))
-                ):
-                    for game in month["mscd"]["g"]:
-                        # print(game['gdte'])
-                        # Check if individual game in date range
-                        if (
-                            to_date
-                            >= datetime.datetime.strptime(game["gdte"], "%Y-%m-%d")
-                            >= from_date
-                        ):
-                            game_ids.append(game["gid"])
-    return game_ids
+    return len(lineup_dict["resultSets"][0]["rowSet"]) > 0
 
 
 def get_season(date):
@@ -0,0 +1,26 @@
+"""
+This file contains the JSON decoder the api responses and the cached
+responses are read with. orjson is used if it is installed since it decodes
+the large play by play responses several times faster than the standard
+library json module, which is used otherwise.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def decode_json(data):
+    """
+    Inputs:
+    data        - JSON document as bytes or a string
+
+    Outputs:
+    decoded     - the decoded python object. Invalid JSON raises a
+                  json.JSONDecodeError with either decoder
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,26 +1,34 @@
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 import pandas as pd
 
 # TODO fix import for get_game_date which is now stored in helper_functions.py
 import nba_scraper.scrape_functions as sf
+import nba_scraper.schedule as sd
 import nba_scraper.wnba_scrape_functions as wsf
+from nba_scraper.backfill import JobManifest, iter_job, run_job
+from nba_scraper.datasets import dataset_columns, write_dataset
+from nba_scraper.pipeline import iter_game_futures
+from nba_scraper.schema import compact_game
+from nba_scraper.writers import write_csv
 
 
 def check_format(data_format):
     """
-    Check that the format for the data is either csv or pandas
+    Check that the format for the data is either pandas, csv, parquet or arrow
 
     Inputs:
     data_format - String of format
 
     Outputs:
     """
-    possible_formats = ["pandas", "csv"]
+    possible_formats = ["pandas", "csv", "parquet", "arrow"]
     if data_format.lower() not in possible_formats:
         print(
             f"You passed {data_format} to scrape_game function as a data format.\n"
-            "This is an unaccepted format. Please either pass 'pandas' or 'csv'.\n"
+            "This is an unaccepted format. Please pass 'pandas', 'csv', "
+            "'parquet' or 'arrow'.\n"
         )
 
 
@@ -47,8 +55,308 @@ def check_valid_dates(from_date, to_date):
         )
 
 
+def scrape_game_ids(
+    game_ids, scrape_func, workers=1, parse_func=None, processes=0, finish_func=None
+):
+    """
+    Scrapes every game id with the passed scrape function. If workers is more
+    than one the games are scraped in a pool of threads so that the network
+    waits overlap. If a parse function and processes are passed the scrape
+    function only downloads each game and the parsing is done in a pool of
+    processes. Either way the dataframes come back in the same order as
+    game_ids
+
+    Inputs:
+    game_ids    - list of full game id strings to be scraped
+    scrape_func - function that takes a game id and returns its pbp dataframe
+                  or downloads it for parse_func if one is passed
+    workers     - max number of games to scrape at the same time. 1 scrapes
+                  them one after another
+    parse_func  - function that turns what scrape_func returns into the
+                  game's dataframe
+    processes   - number of processes to run parse_func in
+    finish_func - function run in this process on what parse_func returns
+
+    Outputs:
+    scraped_games - list of game dataframes in the same order as game_ids
+    """
+    return [
+        game_future.result()
+        for _, game_future in iter_game_futures(
+            game_ids,
+            scrape_func,
+            parse_func,
+            workers,
+            processes,
+            finish_func=finish_func,
+        )
+    ]
+
+
+def iter_game_frames(
+    game_ids,
+    scrape_func,
+    workers=1,
+    job_dir=None,
+    retries=2,
+    parse_func=None,
+    processes=0,
+    ordered=True,
+    compact=False,
+    finish_func=None,
+):
+    """
+    generator that scrapes every game id and yields each game's dataframe as
+    soon as it can so only a few games are ever held in memory
+
+    Inputs:
+    game_ids    - list of full game id strings to be scraped
+    scrape_func - function that takes a game id and returns its pbp dataframe
+                  or downloads it for parse_func if one is passed
+    workers     - max number of games to scrape at the same time
+    job_dir     - directory to save the job manifest and each scraped game
+                  in. Rerunning with the same directory only scrapes the games
+                  that haven't been scraped yet. Games an earlier run
+                  finished are yielded from the job directory first, then
+                  each game is yielded as the job finishes it with retried
+                  games coming after the rest
+    retries     - number of times a job retries its failed games
+    parse_func  - function that turns what scrape_func returns into the
+                  game's dataframe
+    processes   - number of processes to run parse_func in
+    ordered     - True yields the games in the order of game_ids. False
+                  yields them as they finish
+    compact     - True converts each game to the compact schema
+    finish_func - function run in this process on what parse_func returns
+
+    Outputs:
+    yields game dataframes. Games of a job that still failed after the
+    retries are left out
+    """
+    if compact:
+        yield from map(
+            compact_game,
+            iter_game_frames(
+                game_ids,
+                scrape_func,
+                workers,
+                job_dir,
+                retries,
+                parse_func,
+                processes,
+                ordered,
+                finish_func=finish_func,
+            ),
+        )
+        return
+
+    if job_dir is None:
+        for _, game_future in iter_game_futures(
+            game_ids,
+            scrape_func,
+            parse_func,
+            workers,
+            processes,
+            ordered=ordered,
+            finish_func=finish_func,
+        ):
+            yield game_future.result()
+        return
+
+    manifest = JobManifest(job_dir)
+    completed = set(manifest.completed)
+    for game_id in game_ids:
+        if game_id in completed:
+            yield manifest.load_game(game_id)
+
+    for _, game_df in iter_job(
+        game_ids,
+        scrape_func,
+        job_dir,
+        workers,
+        retries,
+        parse_func=parse_func,
+        processes=processes,
+        finish_func=finish_func,
+        ordered=ordered,
+    ):
+        yield game_df
+
+
+def scrape_games(
+    game_ids,
+    scrape_func,
+    workers=1,
+    job_dir=None,
+    retries=2,
+    parse_func=None,
+    processes=0,
+    finish_func=None,
+):
+    """
+    Scrapes every game id either all in memory or as a resumable job if a job
+    directory is passed
+
+    Inputs:
+    game_ids    - list of full game id strings to be scraped
+    scrape_func - function that takes a game id and returns its pbp dataframe
+                  or downloads it for parse_func if one is passed
+    workers     - max number of games to scrape at the same time
+    job_dir     - directory to save the job manifest and each scraped game
+                  in. Rerunning with the same directory only scrapes the games
+                  that haven't been scraped yet
+    retries     - number of times a job retries its failed games
+    parse_func  - function that turns what scrape_func returns into the
+                  game's dataframe
+    processes   - number of processes to run parse_func in
+    finish_func - function run in this process on what parse_func returns
+
+    Outputs:
+    scraped_games - list of game dataframes in the same order as game_ids.
+                    Games of a job that still failed after the retries are
+                    left out
+    """
+    if job_dir is None:
+        return list(
+            iter_game_frames(
+                game_ids,
+                scrape_func,
+                workers,
+                parse_func=parse_func,
+                processes=processes,
+                finish_func=finish_func,
+            )
+        )
+
+    # the job yields retried games after the others so the finished games are
+    # read back in order instead
+    manifest = run_job(
+        game_ids,
+        scrape_func,
+        job_dir,
+        workers,
+        retries,
+        parse_func=parse_func,
+        processes=processes,
+        finish_func=finish_func,
+    )
+    completed = set(manifest.completed)
+    return [manifest.load_game(g) for g in game_ids if g in completed]
+
+
+def concat_games(game_frames):
+    """
+    Inputs:
+    game_frames - iterable of game dataframes
+
+    Outputs:
+    games_df    - all the games in one dataframe or None if there weren't any
+    """
+    game_frames = list(game_frames)
+    if len(game_frames) == 0:
+        return None
+    return pd.concat(game_frames)
+
+
+def get_nba_stages(lineup_mode="api", processes=0, columns=None):
+    """
+    picks the functions that scrape an NBA game. With processes the download
+    and the parsing are split so they can run in different pools
+
+    Inputs:
+    lineup_mode - lineup mode passed on to the scrape functions
+    processes   - number of processes the games will be parsed in
+    columns     - columns passed on to the scrape functions. Unknown columns
+                  raise a ValueError before any game is scraped
+
+    Outputs:
+    scrape_func - function that takes a game id
+    parse_func  - function that parses what scrape_func returns or None if
+                  scrape_func returns the finished dataframe
+    finish_func - function that adds the lineup stats parse_func returns to
+                  this process's counts or None if there is no parse_func
+    """
+    sf.check_nba_columns(columns)
+    if processes > 0:
+        return (
+            partial(sf.fetch_game, lineup_mode=lineup_mode, columns=columns),
+            partial(
+                sf.parse_game,
+                lineup_mode=lineup_mode,
+                columns=columns,
+                return_stats=True,
+            ),
+            sf.finish_parsed_game,
+        )
+    return (
+        partial(sf.main_scrape, lineup_mode=lineup_mode, columns=columns),
+        None,
+        None,
+    )
+
+
+def iter_date_range(
+    date_from,
+    date_to,
+    workers=1,
+    lineup_mode="api",
+    job_dir=None,
+    retries=2,
+    processes=0,
+    ordered=True,
+    compact=False,
+    columns=None,
+):
+    """
+    generator that scrapes all `regular-season` nba games between two dates
+    yielding one game at a time. Takes the same key words as
+    scrape_date_range
+
+    Inputs:
+    date_from   - Date to scrape from
+    date_to     - Date to scrape to
+    ordered     - True yields the games in the order they were played. False
+                  yields them as they finish
+    compact     - True converts each game to the compact schema
+    columns     - list of the columns to return in that order. None returns
+                  every column
+
+    Outputs:
+    yields a pandas dataframe of each game's play by play
+    """
+    check_valid_dates(date_from, date_to)
+
+    game_ids = sf.get_date_games(date_from, date_to)
+    scrape_func, parse_func, finish_func = get_nba_stages(
+        lineup_mode, processes, columns
+    )
+    yield from iter_game_frames(
+        game_ids,
+        scrape_func,
+        workers,
+        job_dir,
+        retries,
+        parse_func,
+        processes,
+        ordered,
+        compact,
+        finish_func=finish_func,
+    )
+
+
 def scrape_date_range(
-    date_from, date_to, data_format="pandas", data_dir=f"{Path.home()}/nbadata.csv"
+    date_from,
+    date_to,
+    data_format="pandas",
+    data_dir=f"{Path.home()}/nbadata.csv",
+    workers=1,
+    lineup_mode="api",
+    job_dir=None,
+    retries=2,
+    processes=0,
+    compression=None,
+    compact=False,
+    columns=None,
 ):
     """
     Function scrapes all `regular-season` nba games between two dates
@@ -57,10 +365,30 @@ def scrape_date_range(
     date_from   - Date to scrape from
     date_to     - Date to scrape to
     data_format - the format of the data the user wants returned. This is either
-                  a pandas dataframe or a csv file
+                  a pandas dataframe, a csv file or a parquet or arrow dataset
     data_dir    - a filepath which to write the csv file if that option is chosen.
                   If no filepath is passed then it will attempt to write to the
-                  user's home directory
+                  user's home directory. For parquet and arrow this is the
+                  root directory of the dataset
+    workers     - number of games to scrape concurrently. Defaults to 1 which
+                  scrapes the games one at a time
+    lineup_mode - api pulls every period's starters from the lineup api. infer
+                  works them out from the play by play and only calls the api
+                  when they can't be
+    job_dir     - directory to save the progress of the scrape in so that
+                  it can be resumed if it fails part way through. None keeps
+                  everything in memory
+    retries     - number of times to retry failed games when using job_dir
+    processes   - number of processes to parse games in while the workers
+                  download the next ones. 0 parses them in the workers
+    compression - compression for the csv file. None, gzip or zstd. Parquet
+                  and arrow files default to zstd
+    compact     - True returns the dataframe with the compact schema which
+                  uses categoricals and small integer types to save memory
+    columns     - list of the columns to return in that order. Only these and
+                  the columns they are calculated from are worked out and the
+                  lineup api isn't called unless lineup columns are in it.
+                  None returns every column
 
     Outputs:
     nba_df     - If pandas is chosen then this function will
@@ -68,23 +396,66 @@ def scrape_date_range(
                  a csv file will be written but None will be returned
     """
     check_format(data_format)
+    if data_format in ["parquet", "arrow"]:
+        columns = dataset_columns(columns)
     check_valid_dates(date_from, date_to)
 
-    game_ids = sf.get_date_games(date_from, date_to)
-    scraped_games = []
-
-    for game in game_ids:
-        print(f"Scraping game id: {game}")
-        scraped_games.append(sf.main_scrape(game))
+    game_frames = iter_date_range(
+        date_from,
+        date_to,
+        workers,
+        lineup_mode,
+        job_dir,
+        retries,
+        processes,
+        compact=compact,
+        columns=columns,
+    )
 
     if data_format == "pandas":
-        return pd.concat(scraped_games)
+        return concat_games(game_frames)
+    elif data_format in ["parquet", "arrow"]:
+        write_dataset(game_frames, data_dir, "nba", data_format, compression or "zstd")
+        return None
     else:
-        pd.concat(scraped_games).to_csv(data_dir, index=False)
+        write_csv(game_frames, data_dir, compression)
         return None
 
 
-def scrape_wnba_game(game_ids, data_format="pandas", data_dir=f"{Path.home()}/"):
+def iter_wnba_games(game_ids, workers=1, ordered=True, compact=False, columns=None):
+    """
+    generator that scrapes wnba games yielding one game at a time
+
+    Inputs:
+    game_ids    - list of wnba game ids to scrape
+    workers     - number of games to scrape concurrently
+    ordered     - True yields the games in the order of game_ids. False
+                  yields them as they finish
+    compact     - True converts each game to the compact schema
+    columns     - list of the columns to return in that order. None returns
+                  every column
+
+    Outputs:
+    yields a pandas dataframe of each game's play by play
+    """
+    yield from iter_game_frames(
+        [f"0{game}" for game in game_ids],
+        partial(wsf.wnba_main_scrape, columns=columns),
+        workers,
+        ordered=ordered,
+        compact=compact,
+    )
+
+
+def scrape_wnba_game(
+    game_ids,
+    data_format="pandas",
+    data_dir=f"{Path.home()}/",
+    workers=1,
+    compression=None,
+    compact=False,
+    columns=None,
+):
     """
     function scrapes wnba games and returns them in the data format requested
     by the user.
@@ -92,10 +463,21 @@ def scrape_wnba_game(game_ids, data_format="pandas", data_dir=f"{Path.home()}/")
     Inputs:
     game_ids    - list of nba game ids to scrape
     data_format - the format of the data the user wants returned. This is either
-                  a pandas dataframe or a csv file
+                  a pandas dataframe, a csv file or a parquet or arrow dataset
     data_dir    - a filepath which to write the csv file if that option is chosen.
                   If no filepath is passed then it will attempt to write to the
-                  user's home directory
+                  user's home directory. For parquet and arrow this is the
+                  root directory of the dataset
+    workers     - number of games to scrape concurrently. Defaults to 1 which
+                  scrapes the games one at a time
+    compression - compression for the csv file. None, gzip or zstd. Parquet
+                  and arrow files default to zstd
+    compact     - True returns the dataframe with the compact schema which
+                  uses categoricals and small integer types to save memory
+    columns     - list of the columns to return in that order. Only these and
+                  the columns they are calculated from are worked out and the
+                  lineup api isn't called unless lineup columns are in it.
+                  None returns every column
 
     Outputs:
     wnba_df     - If pandas is chosen then this function will
@@ -104,23 +486,98 @@ def scrape_wnba_game(game_ids, data_format="pandas", data_dir=f"{Path.home()}/")
     """
 
     check_format(data_format)
+    if data_format in ["parquet", "arrow"]:
+        columns = dataset_columns(columns)
 
-    scraped_games = []
-    for game in game_ids:
-        print(f"Scraping game id: 0{game}")
-        scraped_games.append(wsf.wnba_main_scrape(f"0{game}"))
-    if len(scraped_games) == 0:
-        return
-    wnba_df = pd.concat(scraped_games)
+    game_frames = iter_wnba_games(game_ids, workers, compact=compact, columns=columns)
 
     if data_format == "pandas":
-        return wnba_df
+        return concat_games(game_frames)
+    elif data_format in ["parquet", "arrow"]:
+        write_dataset(game_frames, data_dir, "wnba", data_format, compression or "zstd")
+        return None
     else:
-        wnba_df.to_csv(f"{data_dir}/{game_ids[0]}.csv", index=False)
+        write_csv(game_frames, f"{data_dir}/{game_ids[0]}.csv", compression)
         return None
 
 
-def scrape_game(game_ids, data_format="pandas", data_dir=f"{Path.home()}/"):
+def get_available_games(game_ids):
+    """
+    turns nba game ids into full game id strings leaving out the games in the
+    missing games catalog
+
+    Inputs:
+    game_ids    - list of nba game ids as integers
+
+    Outputs:
+    available_games - list of full game id strings that can be scraped
+    """
+    missing_games = sd.get_missing_games("nba")
+    available_games = []
+    for game in game_ids:
+        if f"00{game}" in missing_games:
+            print(f"Game {game} is not available: {missing_games[f'00{game}']}")
+        else:
+            available_games.append(f"00{game}")
+    return available_games
+
+
+def iter_games(
+    game_ids,
+    workers=1,
+    lineup_mode="api",
+    job_dir=None,
+    retries=2,
+    processes=0,
+    ordered=True,
+    compact=False,
+    columns=None,
+):
+    """
+    generator that scrapes nba games yielding one game at a time. Takes the
+    same key words as scrape_game
+
+    Inputs:
+    game_ids    - list of nba game ids to scrape
+    ordered     - True yields the games in the order of game_ids. False
+                  yields them as they finish
+    compact     - True converts each game to the compact schema
+    columns     - list of the columns to return in that order. None returns
+                  every column
+
+    Outputs:
+    yields a pandas dataframe of each game's play by play
+    """
+    scrape_func, parse_func, finish_func = get_nba_stages(
+        lineup_mode, processes, columns
+    )
+    yield from iter_game_frames(
+        get_available_games(game_ids),
+        scrape_func,
+        workers,
+        job_dir,
+        retries,
+        parse_func,
+        processes,
+        ordered,
+        compact,
+        finish_func=finish_func,
+    )
+
+
+def scrape_game(
+    game_ids,
+    data_format="pandas",
+    data_dir=f"{Path.home()}/",
+    workers=1,
+    lineup_mode="api",
+    job_dir=None,
+    retries=2,
+    processes=0,
+    compression=None,
+    compact=False,
+    columns=None,
+):
     """
     function scrapes nba games and returns them in the data format requested
     by the user.
@@ -128,10 +585,30 @@ def scrape_game(game_ids, data_format="pandas", data_dir=f"{Path.home()}/"):
     Inputs:
     game_ids    - list of nba game ids to scrape
     data_format - the format of the data the user wants returned. This is either
-                  a pandas dataframe or a csv file
+                  a pandas dataframe, a csv file or a parquet or arrow dataset
     data_dir    - a filepath which to write the csv file if that option is chosen.
                   If no filepath is passed then it will attempt to write to the
-                  user's home directory
+                  user's home directory. For parquet and arrow this is the
+                  root directory of the dataset
+    workers     - number of games to scrape concurrently. Defaults to 1 which
+                  scrapes the games one at a time
+    lineup_mode - api pulls every period's starters from the lineup api. infer
+                  works them out from the play by play and only calls the api
+                  when they can't be
+    job_dir     - directory to save the progress of the scrape in so that
+                  it can be resumed if it fails part way through. None keeps
+                  everything in memory
+    retries     - number of times to retry failed games when using job_dir
+    processes   - number of processes to parse games in while the workers
+                  download the next ones. 0 parses them in the workers
+    compression - compression for the csv file. None, gzip or zstd. Parquet
+                  and arrow files default to zstd
+    compact     - True returns the dataframe with the compact schema which
+                  uses categoricals and small integer types to save memory
+    columns     - list of the columns to return in that order. Only these and
+                  the columns they are calculated from are worked out and the
+                  lineup api isn't called unless lineup columns are in it.
+                  None returns every column
 
     Outputs:
     nba_df     - If pandas is chosen then this function will
@@ -139,27 +616,88 @@ def scrape_game(game_ids, data_format="pandas", data_dir=f"{Path.home()}/"):
                  a csv file will be written but None will be returned
     """
     check_format(data_format)
-
-    scraped_games = []
-    for game in game_ids:
-        if game == 21201214:
-            print(f"Game {game} is not available")
-            continue
-        else:
-            print(f"Scraping game id: 00{game}")
-            scraped_games.append(sf.main_scrape(f"00{game}"))
-    if len(scraped_games) == 0:
-        return
-    nba_df = pd.concat(scraped_games)
+    if data_format in ["parquet", "arrow"]:
+        columns = dataset_columns(columns)
+
+    game_frames = iter_games(
+        game_ids,
+        workers,
+        lineup_mode,
+        job_dir,
+        retries,
+        processes,
+        compact=compact,
+        columns=columns,
+    )
 
     if data_format == "pandas":
-        return nba_df
+        return concat_games(game_frames)
+    elif data_format in ["parquet", "arrow"]:
+        write_dataset(game_frames, data_dir, "nba", data_format, compression or "zstd")
+        return None
     else:
-        nba_df.to_csv(f"{data_dir}/{game_ids[0]}.csv", index=False)
+        write_csv(game_frames, f"{data_dir}/{game_ids[0]}.csv", compression)
         return None
 
 
-def scrape_season(season, data_format="pandas", data_dir=f"{Path.home()}/nbadata.csv"):
+def iter_season(
+    season,
+    workers=1,
+    lineup_mode="api",
+    season_types=("regular",),
+    job_dir=None,
+    retries=2,
+    processes=0,
+    ordered=True,
+    compact=False,
+    columns=None,
+):
+    """
+    generator that scrapes an entire season yielding one game at a time.
+    Takes the same key words as scrape_season
+
+    Inputs:
+    season      - season to be scraped must be an integer
+    ordered     - True yields the games in the order they were played. False
+                  yields them as they finish
+    compact     - True converts each game to the compact schema
+    columns     - list of the columns to return in that order. None returns
+                  every column
+
+    Outputs:
+    yields a pandas dataframe of each game's play by play
+    """
+    scrape_func, parse_func, finish_func = get_nba_stages(
+        lineup_mode, processes, columns
+    )
+    yield from iter_game_frames(
+        sd.get_season_games(season, season_types),
+        scrape_func,
+        workers,
+        job_dir,
+        retries,
+        parse_func,
+        processes,
+        ordered,
+        compact,
+        finish_func=finish_func,
+    )
+
+
+def scrape_season(
+    season,
+    data_format="pandas",
+    data_dir=f"{Path.home()}/nbadata.csv",
+    workers=1,
+    lineup_mode="api",
+    season_types=("regular",),
+    job_dir=None,
+    retries=2,
+    processes=0,
+    compression=None,
+    compact=False,
+    columns=None,
+):
     """
     This function scrapes and entire season and either returns it as a pandas
     dataframe or writes it to file as a csv file
@@ -167,10 +705,32 @@ def scrape_season(season, data_format="pandas", data_dir=f"{Path.home()}/nbadata
     Inputs:
     season      - season to be scraped must be an integer
     data_format - the format of the data the user wants returned. This is either
-                  a pandas dataframe or a csv file
+                  a pandas dataframe, a csv file or a parquet or arrow dataset
     data_dir    - a filepath which to write the csv file if that option is chosen.
                   If no filepath is passed then it will attempt to write to the
-                  user's home directory
+                  user's home directory. For parquet and arrow this is the
+                  root directory of the dataset
+    workers     - number of games to scrape concurrently. Defaults to 1 which
+                  scrapes the games one at a time
+    lineup_mode - api pulls every period's starters from the lineup api. infer
+                  works them out from the play by play and only calls the api
+                  when they can't be
+    season_types - parts of the season to scrape. Any of preseason, regular,
+                   all_star, playoffs and play_in
+    job_dir     - directory to save the progress of the scrape in so that
+                  it can be resumed if it fails part way through. None keeps
+                  everything in memory
+    retries     - number of times to retry failed games when using job_dir
+    processes   - number of processes to parse games in while the workers
+                  download the next ones. 0 parses them in the workers
+    compression - compression for the csv file. None, gzip or zstd. Parquet
+                  and arrow files default to zstd
+    compact     - True returns the dataframe with the compact schema which
+                  uses categoricals and small integer types to save memory
+    columns     - list of the columns to return in that order. Only these and
+                  the columns they are calculated from are worked out and the
+                  lineup api isn't called unless lineup columns are in it.
+                  None returns every column
 
     Outputs:
     nba_df     - If pandas is chosen then this function will
@@ -178,27 +738,28 @@ def scrape_season(season, data_format="pandas", data_dir=f"{Path.home()}/nbadata
                  a csv file will be written but None will be returned
     """
     check_format(data_format)
-
-    scraped_games = []
-    game_ids = list(range(int(f"2{season-2001}00001"), int(f"2{season-2001}01231")))
-
-    for game in game_ids:
-        if game == 21201214:
-            print(f"Game {game} is not available")
-            continue
-        else:
-            print(f"Scraping game id: 00{game}")
-            scraped_games.append(sf.main_scrape(f"00{game}"))
-
-    if len(scraped_games) == 0:
-        return
-
-    nba_df = pd.concat(scraped_games)
+    if data_format in ["parquet", "arrow"]:
+        columns = dataset_columns(columns)
+
+    game_frames = iter_season(
+        season,
+        workers,
+        lineup_mode,
+        season_types,
+        job_dir,
+        retries,
+        processes,
+        compact=compact,
+        columns=columns,
+    )
 
     if data_format == "pandas":
-        return nba_df
+        return concat_games(game_frames)
+    elif data_format in ["parquet", "arrow"]:
+        write_dataset(game_frames, data_dir, "nba", data_format, compression or "zstd")
+        return None
     else:
-        nba_df.to_csv(f"{data_dir}/nba{season}.csv", index=False)
+        write_csv(game_frames, f"{data_dir}/nba{season}.csv", compression)
         return None
 
 
@@ -0,0 +1,201 @@
+"""
+This file contains the pipeline that scrapes many games at once. Downloading
+a game's api responses runs in a pool of threads so requests stay in flight
+while the pandas parsing of the games that have already arrived runs in a
+pool of processes so it can use every core.
+
+At most buffer_size games are between the two stages at any time so the
+downloads can't run far ahead of the parsing or of whoever is using the
+results.
+"""
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from functools import partial
+from itertools import islice
+
+
+def copy_future(target_future, source_future):
+    """
+    sets the result or exception of one future from another finished future
+
+    Inputs:
+    target_future   - future to set
+    source_future   - future that is done
+    """
+    if source_future.cancelled():
+        target_future.cancel()
+    elif source_future.exception() is not None:
+        target_future.set_exception(source_future.exception())
+    else:
+        target_future.set_result(source_future.result())
+
+
+def finish_future(finish_func, result_future):
+    """
+    runs finish_func on a finished game's result in the process collecting
+    the games
+
+    Inputs:
+    finish_func     - function that takes the parse result and returns the
+                      game's dataframe. None returns result_future
+    result_future   - the game's finished future
+
+    Outputs:
+    future          - done future holding what finish_func returned or the
+                      game's exception
+    """
+    if finish_func is None or result_future.exception() is not None:
+        return result_future
+    future = Future()
+    try:
+        future.set_result(finish_func(result_future.result()))
+    except Exception as ex:
+        future.set_exception(ex)
+    return future
+
+
+def start_parse(parse_pool, parse_func, result_future, stage_futures, fetch_future):
+    """
+    callback that sends a downloaded game to the parse stage once its fetch
+    future is done
+
+    Inputs:
+    parse_pool      - ProcessPoolExecutor to parse the game in. None means
+                      the fetch result is the final result
+    parse_func      - function that takes the fetch result and returns the
+                      game's dataframe
+    result_future   - future to set with the parsed game
+    stage_futures   - list of the game's fetch and parse futures the parse
+                      future is added to so it can be cancelled
+    fetch_future    - the finished fetch future
+    """
+    if parse_pool is None or fetch_future.cancelled():
+        copy_future(result_future, fetch_future)
+        return
+    if fetch_future.exception() is not None:
+        result_future.set_exception(fetch_future.exception())
+        return
+
+    try:
+        parse_future = parse_pool.submit(parse_func, fetch_future.result())
+    except RuntimeError as ex:
+        result_future.set_exception(ex)
+        return
+    stage_futures.append(parse_future)
+    parse_future.add_done_callback(partial(copy_future, result_future))
+
+
+def fetch_and_parse(fetch_func, parse_func, game_id):
+    """
+    runs both stages for a game one after another
+
+    Inputs:
+    fetch_func  - function that takes a game id and downloads the game
+    parse_func  - function that takes the download and returns the dataframe
+    game_id     - full game id string
+
+    Outputs:
+    game_df     - the parsed game
+    """
+    return parse_func(fetch_func(game_id))
+
+
+def iter_game_futures(
+    game_ids,
+    fetch_func,
+    parse_func=None,
+    workers=1,
+    processes=0,
+    buffer_size=None,
+    ordered=True,
+    finish_func=None,
+):
+    """
+    generator that scrapes games through the fetch and parse stages and
+    yields each one's finished future either in the same order as game_ids
+    or as soon as each finishes. A game that fails doesn't stop the others,
+    its future holds the exception
+
+    Inputs:
+    game_ids    - list of full game id strings to scrape
+    fetch_func  - function that takes a game id and downloads it. If there
+                  is no parse_func this has to return the game's dataframe
+    parse_func  - function that takes what fetch_func returns and turns it
+                  into the game's dataframe. Has to be picklable if
+                  processes is more than 0
+    workers     - number of threads downloading games
+    processes   - number of processes parsing games. 0 parses them in the
+                  download threads
+    buffer_size - max number of games between being submitted and being
+                  yielded. Defaults to workers plus twice processes
+    ordered     - True yields the games in the order of game_ids. False
+                  yields them as they finish
+    finish_func - function run in this process on what parse_func returns
+                  before the game is yielded, such as adding up stats the
+                  parse processes can't update themselves
+
+    Outputs:
+    yields (game_id, future) tuples where the future is done
+    """
+    if parse_func is not None and processes <= 0:
+        fetch_func = partial(fetch_and_parse, fetch_func, parse_func)
+        parse_func = None
+
+    if workers <= 1 and parse_func is None:
+        for game_id in game_ids:
+            print(f"Scraping game id: {game_id}")
+            result_future = Future()
+            try:
+                result_future.set_result(fetch_func(game_id))
+            except Exception as ex:
+                result_future.set_exception(ex)
+            yield game_id, finish_future(finish_func, result_future)
+        return
+
+    workers = max(workers, 1)
+    if buffer_size is None:
+        buffer_size = workers + 2 * max(processes, 0)
+
+    fetch_pool = ThreadPoolExecutor(max_workers=workers)
+    parse_pool = ProcessPoolExecutor(max_workers=processes) if parse_func else None
+
+    def submit(game_id):
+        print(f"Scraping game id: {game_id}")
+        result_future = Future()
+        fetch_future = fetch_pool.submit(fetch_func, game_id)
+        stage_futures = [fetch_future]
+        fetch_future.add_done_callback(
+            partial(start_parse, parse_pool, parse_func, result_future, stage_futures)
+        )
+        return game_id, result_future, stage_futures
+
+    in_flight = deque()
+    try:
+        game_ids = iter(game_ids)
+        in_flight.extend(submit(g) for g in islice(game_ids, buffer_size))
+        while in_flight:
+            if ordered:
+                game = in_flight.popleft()
+                wait([game[1]])
+            else:
+                wait([g[1] for g in in_flight], return_when=FIRST_COMPLETED)
+                game = next(g for g in in_flight if g[1].done())
+                in_flight.remove(game)
+            for next_game in islice(game_ids, 1):
+                in_flight.append(submit(next_game))
+            yield game[0], finish_future(finish_func, game[1])
+    finally:
+        # cancelled by hand since shutdown only takes cancel_futures from
+        # python 3.9
+        for _, _, stage_futures in in_flight:
+            for future in stage_futures:
+                future.cancel()
+        fetch_pool.shutdown(wait=True)
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=True)
@@ -0,0 +1,171 @@
+"""
+This file contains the player directory the WNBA scraper looks player names up
+in. The WNBA play by play only has player ids so without it every substitution
+needs its own api call to get the name of the player coming in.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from nba_scraper.cache import get_cache, update_cache
+from nba_scraper.client import USER_AGENT
+from nba_scraper.helper_functions import get_json
+
+
+def fetch_player_name(player_id, client=None):
+    """
+    function to get the players name givn a player id from the api
+
+    Inputs:
+    player_id   - id of player you want the name of
+    client      - NBAClient to make the api call with
+
+    Ouputs:
+    player_name - full name of player with given player_id
+    """
+    player_url = f"https://a.data.nba.com/wnba/player/{player_id}"
+    player_dict = get_json(
+        "wnba_player",
+        {"player_id": player_id},
+        player_url,
+        headers=USER_AGENT,
+        client=client,
+    )
+    player_name = (
+        f"{player_dict['data']['info']['fn']} {player_dict['data']['info']['ln']}"
+    )
+
+    return player_name
+
+
+class PlayerDirectory:
+    """
+    Thread safe player id to name directory that is saved to the response
+    cache so it carries over between games and runs
+    """
+
+    def __init__(self, workers=8):
+        """
+        Inputs:
+        workers - number of unknown player names to look up at the same time
+        """
+        self.workers = workers
+        self.names = {}
+        self.loaded_seasons = set()
+        self.cache_loaded = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        """
+        adds the names saved in the response cache to the directory
+        """
+        cache = get_cache()
+        if cache is None:
+            return
+        self.cache_loaded = True
+        stored_names = cache.get("wnba_player_directory", {})
+        if stored_names is not None:
+            with self.lock:
+                self.names.update(stored_names)
+
+    def save(self):
+        """
+        saves the directory to the response cache if one is set. The names
+        are merged into the stored ones in one transaction so names other
+        processes saved in the meantime aren't lost
+        """
+        with self.lock:
+            names = dict(self.names)
+
+        def merge_names(stored_names):
+            stored_names = stored_names or {}
+            stored_names.update(names)
+            return stored_names
+
+        update_cache("wnba_player_directory", {}, merge_names)
+
+    def load_season(self, season, client=None):
+        """
+        adds every player on the season's player list to the directory with
+        one api call. Does nothing if the season is already loaded
+
+        Inputs:
+        season  - season in the format of YYYY
+        client  - NBAClient to make the api call with
+        """
+        with self.lock:
+            if season in self.loaded_seasons:
+                return
+            self.loaded_seasons.add(season)
+
+        players_url = (
+            "https://data.wnba.com/data/5s/v2015/json/mobile_teams/wnba/"
+            f"{season}/players/10_player_info.json"
+        )
+        try:
+            players_dict = get_json(
+                "wnba_player_list", {"season": season}, players_url, client=client
+            )
+            season_names = {
+                str(p["pid"]): f"{p['fn']} {p['ln']}" for p in players_dict["pls"]["pl"]
+            }
+        except (ValueError, KeyError, TypeError, OSError) as ex:
+            print(f"Couldn't load the {season} WNBA player list: {ex}")
+            return
+
+        with self.lock:
+            self.names.update(season_names)
+        self.save()
+
+    def resolve(self, player_ids, client=None):
+        """
+        makes sure every player id is in the directory. Ids that aren't are
+        deduplicated and looked up at the same time
+
+        Inputs:
+        player_ids  - iterable of player ids
+        client      - NBAClient to make the api calls with
+        """
+        if not self.cache_loaded:
+            self.load()
+        with self.lock:
+            unknown_ids = {
+                str(p)
+                for p in player_ids
+                if str(p) not in self.names and str(p) not in ["0", ""]
+            }
+        if len(unknown_ids) == 0:
+            return
+
+        unknown_ids = sorted(unknown_ids)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            player_names = list(
+                executor.map(lambda p: fetch_player_name(p, client=client), unknown_ids)
+            )
+
+        with self.lock:
+            self.names.update(zip(unknown_ids, player_names))
+        self.save()
+
+    def get_name(self, player_id, client=None):
+        """
+        Inputs:
+        player_id   - id of player you want the name of
+        client      - NBAClient to look the name up with if it isn't known
+
+        Ouputs:
+        player_name - full name of player with given player_id
+        """
+        if not self.cache_loaded:
+            self.load()
+        with self.lock:
+            player_name = self.names.get(str(player_id))
+        if player_name is None:
+            player_name = fetch_player_name(player_id, client=client)
+            with self.lock:
+                self.names[str(player_id)] = player_name
+            self.save()
+        return player_name
+
+
+# the directory the WNBA scraper uses
+PLAYER_DIRECTORY = PlayerDirectory()
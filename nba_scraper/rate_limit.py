@@ -0,0 +1,170 @@
+"""
+This file contains the rate limiter the http client uses to keep from getting
+banned by the NBA's apis. Each host gets its own token bucket whose rate goes
+up while the api is answering quickly and is cut whenever the api starts
+returning errors or slowing down.
+"""
+import random
+import threading
+import time
+
+# status codes the apis return when they want us to slow down
+BACKOFF_STATUS_CODES = {403, 429, 500, 502, 503, 504}
+
+
+class HostBucket:
+    """
+    token bucket and request counts for one host
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.backoff_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.latency = None
+
+
+class RateLimiter:
+    """
+    Thread safe token bucket rate limiter with a separate budget for each
+    host. The rate is raised additively after fast successful requests and
+    cut multiplicatively with a jittered pause after errors
+    """
+
+    def __init__(
+        self,
+        rate=2.0,
+        min_rate=0.1,
+        max_rate=10.0,
+        burst=1,
+        host_rates=None,
+        increase=0.05,
+        decrease=0.5,
+        target_latency=2.0,
+        backoff=5.0,
+    ):
+        """
+        Inputs:
+        rate            - starting requests per second for each host
+        min_rate        - lowest requests per second the rate is cut to
+        max_rate        - highest requests per second the rate is raised to
+        burst           - number of requests that can be sent at once after
+                          the bucket has been idle
+        host_rates      - dictionary of host to starting rate that overrides
+                          rate for those hosts
+        increase        - requests per second added after each fast success
+        decrease        - fraction the rate is multiplied by after an error
+        target_latency  - seconds above which a response counts as slow and
+                          the rate is eased off instead of raised
+        backoff         - max seconds to pause a host after an error. The
+                          actual pause is a random amount up to this
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.host_rates = host_rates if host_rates is not None else {}
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def get_bucket(self, host):
+        """
+        has to be called while holding the lock
+
+        Inputs:
+        host    - host name of the api
+
+        Outputs:
+        bucket  - HostBucket for the host
+        """
+        if host not in self.buckets:
+            self.buckets[host] = HostBucket(
+                self.host_rates.get(host, self.rate), self.burst
+            )
+        return self.buckets[host]
+
+    def acquire(self, host):
+        """
+        blocks until a request can be sent to the host
+
+        Inputs:
+        host    - host name of the api
+        """
+        with self.lock:
+            bucket = self.get_bucket(host)
+            now = time.monotonic()
+            bucket.tokens = min(
+                bucket.burst, bucket.tokens + (now - bucket.last) * bucket.rate
+            )
+            bucket.last = now
+            # taking the token now even if it goes negative reserves this
+            # request's place in line for other threads
+            bucket.tokens -= 1
+            wait = max(0.0, -bucket.tokens / bucket.rate, bucket.backoff_until - now)
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, host, latency, status_code):
+        """
+        adjusts the host's rate based on how the request went
+
+        Inputs:
+        host        - host name of the api
+        latency     - seconds the request took
+        status_code - http status code of the response or None if the
+                      request failed without one
+        """
+        with self.lock:
+            bucket = self.get_bucket(host)
+            bucket.requests += 1
+            bucket.latency = latency
+
+            if status_code is None or status_code in BACKOFF_STATUS_CODES:
+                bucket.errors += 1
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                bucket.backoff_until = time.monotonic() + random.uniform(
+                    0, self.backoff
+                )
+            elif latency > self.target_latency:
+                bucket.rate = max(
+                    self.min_rate, bucket.rate * (1 - (1 - self.decrease) / 4)
+                )
+            else:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+
+    def get_rate(self, host):
+        """
+        Inputs:
+        host    - host name of the api
+
+        Outputs:
+        rate    - current requests per second allowed to the host
+        """
+        with self.lock:
+            return self.get_bucket(host).rate
+
+    def stats(self):
+        """
+        Outputs:
+        stats   - dictionary of host to its current rate, the number of
+                  requests and errors recorded and the last latency seen
+        """
+        with self.lock:
+            return {
+                host: {
+                    "rate": bucket.rate,
+                    "requests": bucket.requests,
+                    "errors": bucket.errors,
+                    "latency": bucket.latency,
+                }
+                for host, bucket in self.buckets.items()
+            }
@@ -0,0 +1,343 @@
+"""
+This file contains the schedule lookups the scraper uses to find which games
+were played on which dates. Each season's schedule is downloaded once and kept
+as arrays sorted by date so date ranges can be found with a binary search.
+"""
+import datetime
+import json
+import os
+import threading
+import numpy as np
+
+from nba_scraper.cache import get_cache, update_cache
+from nba_scraper.client import USER_AGENT
+from nba_scraper.game_index import GAME_INDEX, get_index_season
+from nba_scraper.helper_functions import get_json, get_season
+
+# season -> dictionary of arrays of the season's games sorted by date
+SEASON_SCHEDULES = {}
+SCHEDULE_LOCK = threading.Lock()
+
+# the first three digits of a game id say what part of the season it's from
+SEASON_TYPES = {
+    "preseason": "001",
+    "regular": "002",
+    "all_star": "003",
+    "playoffs": "004",
+    "play_in": "005",
+}
+SEASON_TYPE_NAMES = {code: name for name, code in SEASON_TYPES.items()}
+
+# game ids that are known to have no data or break the scraper. The shipped
+# catalog is in data/missing_games.json and games found to have an empty play
+# by play while scraping are added to the response cache
+MISSING_GAMES_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "missing_games.json"
+)
+MISSING_GAMES = None
+MISSING_LOCK = threading.Lock()
+
+# (season, season_type) -> {game_id: game date} built up from every team game
+# log downloaded so far. After about half the teams' logs have been pulled every
+# game in the season is in here
+GAME_DATES = {}
+DATE_LOCK = threading.Lock()
+
+
+def load_team_dates(season, season_type, team_id, client=None):
+    """
+    downloads a team's game log and adds the dates of all its games to the
+    season's date index. The merged index is also stored in the cache if one
+    is set so other processes can use it
+
+    Inputs:
+    season      - season string in the format of YYYY-YY
+    season_type - season type as passed to the api ex: Regular+Season
+    team_id     - id of the team whose game log is downloaded
+    client      - NBAClient to make the api call with
+    """
+    date_url = (
+        f"https://stats.nba.com/stats/teamgamelog?DateFrom=&DateTo=&LeagueID=&"
+        f"Season={season}"
+        f"&SeasonType={season_type}&TeamID={team_id}"
+    )
+    params = {"Season": season, "SeasonType": season_type, "TeamID": team_id}
+    dates_dict = get_json(
+        "teamgamelog", params, date_url, headers=USER_AGENT, client=client
+    )
+    team_dates = {
+        g[1]: datetime.datetime.strptime(g[2], "%b %d, %Y").strftime("%Y-%m-%d")
+        for g in dates_dict["resultSets"][0]["rowSet"]
+    }
+
+    with DATE_LOCK:
+        GAME_DATES.setdefault((season, season_type), {}).update(team_dates)
+        season_dates = dict(GAME_DATES[(season, season_type)])
+
+    def merge_dates(stored_dates):
+        stored_dates = stored_dates or {}
+        stored_dates.update(season_dates)
+        return stored_dates
+
+    update_cache(
+        "game_date_index",
+        {"Season": season, "SeasonType": season_type},
+        merge_dates,
+    )
+
+
+def get_game_date(game_id, season, season_type, team_id, client=None):
+    """
+    looks up the date of a game in the season's date index. The index is
+    checked in memory, then in the cache and only if the game still isn't
+    found is the team's game log downloaded
+
+    Inputs:
+    game_id     - id of the game
+    season      - season string in the format of YYYY-YY
+    season_type - season type as passed to the api ex: Regular+Season
+    team_id     - id of either team in the game
+    client      - NBAClient to make the api call with
+
+    Outputs:
+    game_date   - datetime of the day the game was played
+    """
+    key = (season, season_type)
+
+    with DATE_LOCK:
+        game_date = GAME_DATES.get(key, {}).get(game_id)
+
+    if game_date is None:
+        cache = get_cache()
+        if cache is not None:
+            stored_dates = cache.get(
+                "game_date_index", {"Season": season, "SeasonType": season_type}
+            )
+            if stored_dates is not None:
+                with DATE_LOCK:
+                    GAME_DATES.setdefault(key, {}).update(stored_dates)
+                game_date = stored_dates.get(game_id)
+
+    if game_date is None:
+        load_team_dates(season, season_type, team_id, client=client)
+        with DATE_LOCK:
+            game_date = GAME_DATES[key][game_id]
+
+    return datetime.datetime.strptime(game_date, "%Y-%m-%d")
+
+
+def load_season_schedule(season, client=None):
+    """
+    downloads a season's full schedule and turns it into arrays sorted by
+    date. Each season is only downloaded once per process
+
+    Inputs:
+    season      - season in the format of YYYY
+    client      - NBAClient to make the api call with
+
+    Outputs:
+    season_schedule - dictionary with a game_date array of numpy dates and
+                      the game_id and season type code arrays lined up with it
+    """
+    with SCHEDULE_LOCK:
+        season_schedule = SEASON_SCHEDULES.get(season)
+    if season_schedule is not None:
+        return season_schedule
+
+    url = (
+        "http://data.nba.com/data/10s/v2015/json/mobile_teams"
+        f"/nba/{season}/league/00_full_schedule.json"
+    )
+    schedule = get_json("full_schedule", {"season": season}, url, client=client)
+    games = [g for month in schedule["lscd"] for g in month["mscd"]["g"]]
+
+    game_dates = np.array([g["gdte"] for g in games], dtype="datetime64[D]")
+    game_ids = np.array([g["gid"] for g in games], dtype=object)
+    # stable sort keeps games on the same day in schedule order
+    order = np.argsort(game_dates, kind="stable")
+    game_ids = game_ids[order]
+    season_schedule = {
+        "game_date": game_dates[order],
+        "game_id": game_ids,
+        "type_code": np.array([g[:3] for g in game_ids], dtype=object),
+    }
+
+    GAME_INDEX.add_games(
+        "nba", season, {g["gid"]: get_schedule_game_info(g) for g in games}
+    )
+    with SCHEDULE_LOCK:
+        SEASON_SCHEDULES[season] = season_schedule
+    return season_schedule
+
+
+def get_schedule_game_info(game):
+    """
+    Inputs:
+    game        - dictionary of a game from the full schedule api
+
+    Outputs:
+    game_info   - dictionary of the game's fields for the game index
+    """
+    game_info = {"game_date": game["gdte"]}
+    if game["gid"][:3] in SEASON_TYPE_NAMES:
+        game_info["season_type"] = SEASON_TYPE_NAMES[game["gid"][:3]]
+    for side, team in [("h", "home"), ("v", "away")]:
+        if side in game:
+            game_info[f"{team}_team_id"] = int(game[side]["tid"])
+            game_info[f"{team}_team_abbrev"] = game[side]["ta"]
+    return game_info
+
+
+def build_game_index(seasons, client=None):
+    """
+    adds every game of the seasons to the game index from their schedules.
+    Seasons already loaded aren't downloaded again
+
+    Inputs:
+    seasons     - list of seasons in the format of YYYY where 2019 is the
+                  2019-20 season
+    client      - NBAClient to make the api calls with
+    """
+    for season in seasons:
+        load_season_schedule(season, client=client)
+
+
+def get_game_info(game_id, client=None):
+    """
+    looks a game up in the game index. If the game's date isn't in it the
+    season's schedule is loaded into the index first, which is only tried once
+    per season
+
+    Inputs:
+    game_id     - full game id string
+    client      - NBAClient to make the api call with
+
+    Outputs:
+    game_info   - dictionary of the fields known for the game
+    """
+    game_info = GAME_INDEX.get("nba", game_id)
+    season = get_index_season(game_id)
+    if "game_date" not in game_info and GAME_INDEX.start_schedule_load("nba", season):
+        try:
+            load_season_schedule(season, client=client)
+        except (ValueError, KeyError, TypeError, OSError) as ex:
+            print(f"Couldn't load the {season} schedule: {ex}")
+        game_info = GAME_INDEX.get("nba", game_id)
+    return game_info
+
+
+def get_date_games(from_date, to_date, client=None):
+    """
+    Get all the game_ids in a valid date range
+
+    Inputs:
+    date_from   - Date to scrape from
+    date_to     - Date to scrape to
+    client      - NBAClient to make the api calls with
+
+    Outputs:
+    game_ids - List of game_ids in range
+    """
+    game_ids = []
+    from_date = datetime.datetime.strptime(from_date, "%Y-%m-%d")
+    to_date = datetime.datetime.strptime(to_date, "%Y-%m-%d")
+    from_day = np.datetime64(from_date.date(), "D")
+    to_day = np.datetime64(to_date.date(), "D")
+
+    # Must check each season in between date range
+    for season in range(get_season(from_date), get_season(to_date) + 1):
+        season_schedule = load_season_schedule(season, client=client)
+        start = np.searchsorted(season_schedule["game_date"], from_day, side="left")
+        end = np.searchsorted(season_schedule["game_date"], to_day, side="right")
+        game_ids.extend(season_schedule["game_id"][start:end].tolist())
+
+    return game_ids
+
+
+def get_missing_games(league="nba"):
+    """
+    Inputs:
+    league      - either nba or wnba
+
+    Outputs:
+    missing_games - dictionary of game id to the reason it can't be scraped
+    """
+    global MISSING_GAMES
+    with MISSING_LOCK:
+        if MISSING_GAMES is None:
+            with open(MISSING_GAMES_FILE) as catalog_file:
+                MISSING_GAMES = json.load(catalog_file)
+            cache = get_cache()
+            if cache is not None:
+                for cache_league, games in (
+                    cache.get("missing_games", {}) or {}
+                ).items():
+                    MISSING_GAMES.setdefault(cache_league, {}).update(games)
+        return dict(MISSING_GAMES.get(league, {}))
+
+
+def mark_missing_game(game_id, reason, league="nba"):
+    """
+    adds a game to the missing games catalog so it is skipped from now on.
+    The catalog is saved to the response cache if one is set
+
+    Inputs:
+    game_id     - full game id string of the game
+    reason      - why the game can't be scraped
+    league      - either nba or wnba
+    """
+    get_missing_games(league)
+    with MISSING_LOCK:
+        MISSING_GAMES.setdefault(league, {})[game_id] = reason
+
+    def add_game(stored_games):
+        stored_games = stored_games or {}
+        stored_games.setdefault(league, {})[game_id] = reason
+        return stored_games
+
+    update_cache("missing_games", {}, add_game)
+
+
+def get_season_games(season, season_types=("regular",), client=None):
+    """
+    lists every game id in a season that can be scraped using the season's
+    schedule. Games in the missing games catalog are left out. If the
+    schedule can't be downloaded regular season ids are guessed from the
+    range they are numbered in instead
+
+    Inputs:
+    season       - season to list the games of in the format of YYYY where
+                   2019 is the 2018-19 season
+    season_types - list of the parts of the season to include. Any of
+                   preseason, regular, all_star, playoffs and play_in
+    client       - NBAClient to make the api call with
+
+    Outputs:
+    game_ids     - list of full game id strings in the order they were played
+    """
+    unknown_types = [t for t in season_types if t not in SEASON_TYPES]
+    if unknown_types:
+        raise ValueError(
+            f"Unknown season types {unknown_types}. "
+            f"Season types must be in {list(SEASON_TYPES)}"
+        )
+    missing_games = get_missing_games("nba")
+    type_codes = [SEASON_TYPES[t] for t in season_types]
+
+    try:
+        season_schedule = load_season_schedule(season - 1, client=client)
+    except (ValueError, KeyError, TypeError, OSError) as ex:
+        print(f"Couldn't load the {season} schedule: {ex}")
+        if "regular" not in season_types:
+            return []
+        print("Falling back to the regular season game id range")
+        game_ids = [
+            f"00{game}"
+            for game in range(int(f"2{season-2001}00001"), int(f"2{season-2001}01231"))
+        ]
+        return [game for game in game_ids if game not in missing_games]
+
+    game_ids = season_schedule["game_id"][
+        np.isin(season_schedule["type_code"], type_codes)
+    ]
+    return [game for game in game_ids.tolist() if game not in missing_games]
@@ -0,0 +1,351 @@
+"""
+This file contains the column types of the play by play dataframes so every
+game is saved with the same schema no matter which values happen to be
+missing from it. Columns that aren't listed here are stored as strings.
+
+It also has the compact schema games can be converted to in memory. Low
+cardinality strings become categoricals with fixed categories, flags become
+int8 and ids become nullable int32 so a season of games takes several times
+less memory and every game has the same dtypes so concat doesn't upcast them.
+"""
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+import numpy as np
+import pandas as pd
+
+from nba_scraper.helper_functions import EVENT_TYPE_DICT
+from nba_scraper.stat_calc_functions import SHOT_DICT, foul_dict
+
+LINEUP_ID_COLUMNS = [
+    f"{side}_player_{number}_id" for side in ["home", "away"] for number in range(1, 6)
+]
+INT_COLUMNS = [
+    "eventnum",
+    "eventmsgtype",
+    "eventmsgactiontype",
+    "period",
+    "person1type",
+    "person2type",
+    "person3type",
+    "player1_id",
+    "player2_id",
+    "player3_id",
+    "player1_team_id",
+    "player2_team_id",
+    "player3_team_id",
+    "video_available_flag",
+    "home_team_id",
+    "away_team_id",
+    "season",
+    "shot_made",
+    "is_block",
+    "is_three",
+    "points_made",
+    "is_o_rebound",
+    "is_d_rebound",
+    "is_turnover",
+    "is_steal",
+    "is_putback",
+] + LINEUP_ID_COLUMNS
+# the integer columns of the WNBA api. The player ids opid and epid are empty
+# strings when there is no player
+WNBA_INT_COLUMNS = [
+    "evt",
+    "locx",
+    "locy",
+    "mtype",
+    "etype",
+    "opid",
+    "tid",
+    "pid",
+    "hs",
+    "vs",
+    "epid",
+    "oftid",
+]
+INT_COLUMNS += WNBA_INT_COLUMNS
+# the WNBA clock has tenths of a second so its seconds_elapsed aren't whole
+FLOAT_COLUMNS = ["seconds_elapsed", "event_length"]
+DATE_COLUMNS = ["game_date"]
+
+# the types scrape_pbp reads each playbyplayv2 column as. Integer columns with
+# a missing value in a game are read as floats like pandas would
+PBP_V2_DTYPES = {
+    "game_id": object,
+    "eventnum": np.int64,
+    "eventmsgtype": np.int64,
+    "eventmsgactiontype": np.int64,
+    "period": np.int64,
+    "wctimestring": object,
+    "pctimestring": object,
+    "homedescription": object,
+    "neutraldescription": object,
+    "visitordescription": object,
+    "score": object,
+    "scoremargin": object,
+    "person1type": np.float64,
+    "player1_id": np.int64,
+    "player1_name": object,
+    "player1_team_id": np.float64,
+    "player1_team_city": object,
+    "player1_team_nickname": object,
+    "player1_team_abbreviation": object,
+    "person2type": np.int64,
+    "player2_id": np.int64,
+    "player2_name": object,
+    "player2_team_id": np.float64,
+    "player2_team_city": object,
+    "player2_team_nickname": object,
+    "player2_team_abbreviation": object,
+    "person3type": np.int64,
+    "player3_id": np.int64,
+    "player3_name": object,
+    "player3_team_id": np.float64,
+    "player3_team_city": object,
+    "player3_team_nickname": object,
+    "player3_team_abbreviation": object,
+    "video_available_flag": np.int64,
+}
+
+
+def column_array(values, dtype):
+    """
+    Inputs:
+    values      - list of a column's values
+    dtype       - numpy dtype to read the values as. None works it out from
+                  the values
+
+    Outputs:
+    array       - numpy array of the values
+    """
+    if dtype is None:
+        return pd.Series(values, dtype=None if values else object).values
+    try:
+        return np.array(values, dtype=dtype)
+    except TypeError:
+        # None in an integer column
+        return np.array(values, dtype=np.float64)
+
+
+def rowset_frame(result_set, dtypes=None, columns=None):
+    """
+    builds a dataframe from a stats.nba.com api result set. Each column is
+    read straight from the rows into an array of its type instead of going
+    through an object array of every row first
+
+    Inputs:
+    result_set  - dictionary of the headers and rowSet of an api response
+    dtypes      - dictionary of lowercased column name to the numpy dtype to
+                  read it as. Columns that aren't listed have their type
+                  worked out from the values
+    columns     - list of the lowercased columns to read. None reads them all
+
+    Outputs:
+    rowset_df   - dataframe of the result set with lowercased column names
+    """
+    if dtypes is None:
+        dtypes = {}
+    rows = result_set["rowSet"]
+    headers = [header.lower() for header in result_set["headers"]]
+    if columns is None:
+        # transposing every row at once is quicker than pulling each column
+        # out one at a time when they are all needed
+        columns = headers
+        column_values = zip(*rows) if rows else [[] for _ in headers]
+    else:
+        column_values = (
+            [row[headers.index(column)] for row in rows] for column in columns
+        )
+
+    arrays = {
+        column: column_array(list(values), dtypes.get(column))
+        for column, values in zip(columns, column_values)
+    }
+
+    return pd.DataFrame(
+        arrays, columns=columns, index=pd.RangeIndex(len(rows)), copy=False
+    )
+
+
+def to_strings(values):
+    """
+    Inputs:
+    values      - series of a column of any dtype
+
+    Outputs:
+    values      - object series of the values as strings with missing values
+                  kept as missing instead of turned into "nan"
+    """
+    return values.astype(object).map(str, na_action="ignore")
+
+
+def to_arrow_table(game_df):
+    """
+    converts a game's dataframe to an arrow table with the fixed column types
+    above. Empty strings in integer columns, like lineup ids that couldn't be
+    found, are stored as nulls
+
+    Inputs:
+    game_df     - dataframe of the game's play by play
+
+    Outputs:
+    table       - pyarrow Table of the game
+    """
+    if pa is None:
+        raise ImportError(
+            "parquet and arrow output needs the pyarrow package. "
+            "Install it with pip install pyarrow"
+        )
+
+    arrays = []
+    for column in game_df.columns:
+        values = game_df[column]
+        if column in INT_COLUMNS:
+            values = pd.to_numeric(values.replace("", np.nan), errors="coerce")
+            arrays.append(pa.array(values.astype("Int64"), type=pa.int64()))
+        elif column in FLOAT_COLUMNS:
+            values = pd.to_numeric(values, errors="coerce").astype(float)
+            arrays.append(pa.array(values, type=pa.float64(), from_pandas=True))
+        elif column in DATE_COLUMNS:
+            values = pd.to_datetime(values)
+            arrays.append(pa.array(values, type=pa.timestamp("ns"), from_pandas=True))
+        else:
+            values = to_strings(values)
+            arrays.append(pa.array(values, type=pa.string(), from_pandas=True))
+
+    return pa.Table.from_arrays(arrays, names=[str(c) for c in game_df.columns])
+
+
+# every NBA and WNBA team abbreviation since the 1997 season
+TEAM_ABBREVS = sorted(
+    set(
+        "ATL BKN BOS CHA CHH CHI CLE DAL DEN DET GSW HOU IND LAC LAL MEM MIA MIL "
+        "MIN NJN NOH NOK NOP NYK OKC ORL PHI PHX POR SAC SAS SEA TOR UTA VAN WAS "
+        "CON LAS LVA NYL PHO TUL".split()
+    )
+)
+CATEGORY_COLUMNS = {
+    "event_type_de": sorted(set(EVENT_TYPE_DICT.values())),
+    "shot_type_de": [""],
+    "shot_type": sorted(
+        {shot for shots in SHOT_DICT.values() for shot in shots.values()}
+    ),
+    "foul_type": sorted(set(foul_dict.values())),
+    "home_team_abbrev": TEAM_ABBREVS,
+    "away_team_abbrev": TEAM_ABBREVS,
+    "event_team": TEAM_ABBREVS,
+    "player1_team_abbreviation": TEAM_ABBREVS,
+    "player2_team_abbreviation": TEAM_ABBREVS,
+    "player3_team_abbreviation": TEAM_ABBREVS,
+}
+COMPACT_DTYPES = {
+    "eventnum": "int32",
+    "eventmsgtype": "int8",
+    "eventmsgactiontype": "int16",
+    "period": "int8",
+    "person1type": "Int8",
+    "person2type": "Int8",
+    "person3type": "Int8",
+    "player1_id": "Int32",
+    "player2_id": "Int32",
+    "player3_id": "Int32",
+    "player1_team_id": "Int32",
+    "player2_team_id": "Int32",
+    "player3_team_id": "Int32",
+    "video_available_flag": "int8",
+    "home_team_id": "Int32",
+    "away_team_id": "Int32",
+    "season": "int16",
+    "shot_made": "Int8",
+    "is_block": "int8",
+    "seconds_elapsed": "float32",
+    "event_length": "float32",
+    "is_three": "int8",
+    "points_made": "int8",
+    "is_o_rebound": "int8",
+    "is_d_rebound": "int8",
+    "is_turnover": "int8",
+    "is_steal": "int8",
+    "is_putback": "int8",
+}
+COMPACT_DTYPES.update({column: "Int32" for column in LINEUP_ID_COLUMNS})
+COMPACT_DTYPES.update(
+    {
+        "evt": "Int32",
+        "locx": "Int16",
+        "locy": "Int16",
+        "mtype": "Int16",
+        "etype": "Int8",
+        "opid": "Int32",
+        "tid": "Int32",
+        "pid": "Int32",
+        "hs": "Int16",
+        "vs": "Int16",
+        "epid": "Int32",
+        "oftid": "Int32",
+    }
+)
+
+
+def get_string_dtype(pandas_version=pd.__version__):
+    """
+    the rest of the text columns are stored as arrow strings which take a
+    fraction of the memory of python strings. They need pyarrow and pandas
+    1.3 or newer so they are left as objects otherwise
+
+    Inputs:
+    pandas_version  - version string of the installed pandas
+
+    Outputs:
+    string_dtype    - string[pyarrow] or None to leave the columns as objects
+    """
+    major, minor = (int(part) for part in pandas_version.split(".")[:2])
+    if pa is None or (major, minor) < (1, 3):
+        return None
+    return "string[pyarrow]"
+
+
+STRING_DTYPE = get_string_dtype()
+
+
+def compact_game(game_df):
+    """
+    converts a game's dataframe to the compact schema. A value that isn't in
+    its column's fixed categories raises a ValueError instead of being lost
+    or changing the column's dtype
+
+    Inputs:
+    game_df     - dataframe of the game's play by play
+
+    Outputs:
+    compact_df  - dataframe of the game with the compact dtypes
+    """
+    compact_columns = {}
+    for column in game_df.columns:
+        values = game_df[column]
+        if column in CATEGORY_COLUMNS:
+            values = to_strings(values)
+            categories = pd.Categorical(values, categories=CATEGORY_COLUMNS[column])
+            unknown = values[pd.isna(categories) & values.notna()]
+            if len(unknown) > 0:
+                raise ValueError(
+                    f"{column} has values {sorted(unknown.unique())} that aren't "
+                    "in its categories. Add them to CATEGORY_COLUMNS"
+                )
+            compact_columns[column] = categories
+            continue
+        elif column in COMPACT_DTYPES:
+            values = pd.to_numeric(values.replace("", np.nan), errors="coerce")
+            compact_columns[column] = values.astype(COMPACT_DTYPES[column])
+            continue
+        elif column in DATE_COLUMNS:
+            compact_columns[column] = pd.to_datetime(values)
+            continue
+
+        if values.dtype == object and STRING_DTYPE is not None:
+            values = values.astype(STRING_DTYPE)
+        compact_columns[column] = values
+
+    return pd.DataFrame(compact_columns, index=game_df.index)
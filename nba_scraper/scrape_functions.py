@@ -7,320 +7,564 @@ Email: matt@barloweanalytics.com
 This file contains the main functions to scrape and compile the NBA api and
 return a CSV file of the pbp for the provided game
 """
-import sys
 import json
 import datetime
-import requests
-import time
+import threading
 import pandas as pd
 import numpy as np
 
 # TODO probably need to fix these to import modularly correctly
-from nba_scraper.helper_functions import EVENT_TYPE_DICT, get_season
+from nba_scraper.client import USER_AGENT
+from nba_scraper.column_graph import (
+    ALL_LINEUP_COLUMNS,
+    check_columns,
+    compute_columns,
+    needs_lineups,
+    resolve_columns,
+)
+from nba_scraper.game_index import GAME_INDEX
+from nba_scraper.helper_functions import (
+    EVENT_TYPE_DICT,
+    get_season,
+    get_json,
+    has_lineup_rows,
+)
+from nba_scraper.schedule import (
+    get_date_games,
+    get_game_date,
+    get_game_info,
+    mark_missing_game,
+)
+from nba_scraper.schema import PBP_V2_DTYPES, rowset_frame
 from nba_scraper.stat_calc_functions import (
     made_shot,
     parse_foul,
     parse_shot_types,
     create_seconds_elapsed,
     calc_points_made,
+    made_shot_array,
+    foul_type_array,
+    shot_type_array,
+    seconds_elapsed_array,
+    points_made_array,
+    replace_codes,
+    tokenize_descriptions,
+    has_token,
+    is_missing,
+    event_length_array,
+    same_as_previous,
+    putback_array,
 )
 
-# TODO look at replacing this with the fake-useragent package Matt Barlowe 2019-12-04
-# have to pass this to the requests function or the api will return a 403 code
-USER_AGENT = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:72.0) Gecko/20100101 Firefox/72.0",
-    "Accept": "application/json, text/plain, */*",
-    "Accept-Language": "en-US,en;q=0.5",
-    "X-NewRelic-ID": "VQECWF5UChAHUlNTBwgBVw==",
-    "x-nba-stats-origin": "stats",
-    "x-nba-stats-token": "true",
-    "Connection": "keep-alive",
-    "Referer": "https://stats.nba.com/",
+# how many lineup api calls main_scrape made and how many it skipped because
+# the starters could be worked out from the play by play. get_lineup also
+# counts how many team periods it checked the api's starters for and how
+# many of those it had to work the starters out from the play by play
+LINEUP_API_STATS = {
+    "called": 0,
+    "skipped": 0,
+    "starters_checked": 0,
+    "starters_inferred": 0,
 }
-
-
-def get_date_games(from_date, to_date):
+LINEUP_STATS_LOCK = threading.Lock()
+# the name columns of the ten players on the court, home players first. Each
+# one is followed by its _id column in the dataframe
+LINEUP_COLUMNS = [
+    f"{side}_player_{number}" for side in ["home", "away"] for number in range(1, 6)
+]
+# the play by play columns the starters and lineups are worked out from
+LINEUP_DEPENDENCIES = [
+    "game_id",
+    "period",
+    "homedescription",
+    "visitordescription",
+    "player1_id",
+    "player1_name",
+    "player1_team_abbreviation",
+    "player2_id",
+    "player2_name",
+    "home_team_id",
+    "away_team_id",
+    "home_team_abbrev",
+    "away_team_abbrev",
+    "event_team",
+    "event_type_de",
+    "is_block",
+    "is_steal",
+]
+
+
+def get_home_away_abbrevs(pbp_df):
     """
-    Get all the game_ids in a valid date range
+    works out the home and away team abbreviations of a game from its play
+    by play. This is only used when the game index doesn't have the game's
+    teams. Home team events are recorded in the home description column and
+    away team events in the visitor description column so the most common
+    team of each column's events is taken. If that doesn't give two
+    different teams it falls back on the teams in the first jump ball
+
     Inputs:
-    date_from   - Date to scrape from
-    date_to     - Date to scrape to
+    pbp_df           - play by play dataframe straight from the api
+
     Outputs:
-    game_ids - List of game_ids in range
+    home_team_abbrev - abbreviation of the home team
+    away_team_abbrev - abbreviation of the away team
     """
-    game_ids = []
-    from_date = datetime.datetime.strptime(from_date, "%Y-%m-%d")
-    to_date = datetime.datetime.strptime(to_date, "%Y-%m-%d")
+    team_events = pbp_df[~pd.isnull(pbp_df["player1_team_abbreviation"])]
+    home_abbrevs = team_events[
+        ~pd.isnull(team_events["homedescription"])
+        & pd.isnull(team_events["visitordescription"])
+    ]["player1_team_abbreviation"]
+    away_abbrevs = team_events[
+        pd.isnull(team_events["homedescription"])
+        & ~pd.isnull(team_events["visitordescription"])
+    ]["player1_team_abbreviation"]
+
+    if len(home_abbrevs) > 0 and len(away_abbrevs) > 0:
+        home_team_abbrev = home_abbrevs.mode()[0]
+        away_team_abbrev = away_abbrevs.mode()[0]
+        if home_team_abbrev != away_team_abbrev:
+            return home_team_abbrev, away_team_abbrev
 
-    # Must check each season in between date range
-    for season in range(get_season(from_date), get_season(to_date) + 1):
-        url = (
-            "http://data.nba.com/data/10s/v2015/json/mobile_teams"
-            f"/nba/{season}/league/00_full_schedule.json"
-        )
-        schedule = requests.get(url).json()
-        time.sleep(1)
-
-        for month in schedule["lscd"]:
-            if month["mscd"]["g"]:
-                # Assume games in order so first in list is first game in month
-                cur_month = datetime.datetime.strptime(
-                    month["mscd"]["g"][0]["gdte"], "%Y-%m-%d"
-                )
-
-                # If first game in month doesn't fall in range no need to check each game for rest of month
-                # Convert from_date to beginning of month as that is where cur_month starts
-                if (
-                    to_date
-                    >= cur_month
-                    >= (from_date - datetime.timedelta(from_date.day - 1))
-                ):
-                    for game in month["mscd"]["g"]:
-                        # print(game['gdte'])
-                        # Check if individual game in date range
-                        if (
-                            to_date
-                            >= datetime.datetime.strptime(game["gdte"], "%Y-%m-%d")
-                            >= from_date
-                        ):
-                            game_ids.append(game["gid"])
-    return game_ids
-
-
-def scrape_pbp(v2_dict):
+    if (
+        pd.isnull(pbp_df[pbp_df["eventmsgtype"] == 10][["homedescription"]].values[0])
+        == 1
+    ):
+        home_team_abbrev = pbp_df[pbp_df["eventmsgtype"] == 10][
+            "player2_team_abbreviation"
+        ].iloc[0]
+        away_team_abbrev = pbp_df[pbp_df["eventmsgtype"] == 10][
+            "player1_team_abbreviation"
+        ].iloc[0]
+    else:
+        home_team_abbrev = pbp_df[pbp_df["eventmsgtype"] == 10][
+            "player1_team_abbreviation"
+        ].iloc[0]
+        away_team_abbrev = pbp_df[pbp_df["eventmsgtype"] == 10][
+            "player2_team_abbreviation"
+        ].iloc[0]
+
+    return home_team_abbrev, away_team_abbrev
+
+
+def get_game_teams(pbp_df, game_info):
     """
-    This function scrapes both of the pbp urls and returns a joined/cleaned
-    pbp dataframe
+    gets the ids and abbreviations of the home and away teams. Teams in the
+    game index are used when they are there and otherwise worked out from the
+    play by play. Abbreviations are taken from the play by play where the
+    team has an event so they match the player team abbreviation columns.
+    Abbreviations in game_overrides.json are applied last so they fix games
+    the schedule has the wrong teams for
 
     Inputs:
-    v2_dict     - stats.nba.com api response
+    pbp_df           - play by play dataframe straight from the api
+    game_info        - the game's entry in the game index
 
     Outputs:
-    clean_df - final cleaned dataframe
+    teams            - tuple of the home abbreviation, away abbreviation,
+                       home team id and away team id
     """
+    team_ids = pbp_df["player1_team_id"].values
+    team_abbrevs = pbp_df["player1_team_abbreviation"].values
+    has_team = pd.notnull(team_ids) & pd.notnull(team_abbrevs)
+    team_ids = team_ids[has_team][::-1].astype(int)
+    team_abbrevs = team_abbrevs[has_team][::-1]
+    # the first abbreviation each team id has and the first id each
+    # abbreviation has in the play by play
+    id_abbrevs = dict(zip(team_ids, team_abbrevs))
+    abbrev_ids = dict(zip(team_abbrevs, team_ids))
+
+    overrides = GAME_INDEX.get_overrides("nba").get(game_id_value(pbp_df), {})
+    has_override = "home_team_abbrev" in overrides and "away_team_abbrev" in overrides
+
+    if "home_team_id" in game_info and "away_team_id" in game_info and not has_override:
+        home_team_id = game_info["home_team_id"]
+        away_team_id = game_info["away_team_id"]
+        return (
+            id_abbrevs.get(home_team_id, game_info.get("home_team_abbrev")),
+            id_abbrevs.get(away_team_id, game_info.get("away_team_abbrev")),
+            home_team_id,
+            away_team_id,
+        )
 
-    # converting stats.nba.com json into pandas dataframe
-    pbp_v2_df = pd.DataFrame(
-        v2_dict["resultSets"][0]["rowSet"], columns=v2_dict["resultSets"][0]["headers"]
-    )
-    pbp_v2_df.columns = list(map(str.lower, pbp_v2_df.columns))
-
-    # pulling the home and away team abbreviations and the game date
-
-    # TODO look at these and see if they are jump ball violations which is
-    # TODO eventmsgtype 7 instead of 10
-    if pbp_v2_df.game_id.unique()[0] == "0020200577":
-        home_team_abbrev = "WAS"
-        away_team_abbrev = "DEN"
-        pbp_v2_df["home_team_abbrev"] = "WAS"
-        pbp_v2_df["away_team_abbrev"] = "DEN"
-
-    elif pbp_v2_df.game_id.unique()[0] == "0020300286":
-        home_team_abbrev = "NOH"
-        away_team_abbrev = "MIL"
-        pbp_v2_df["home_team_abbrev"] = "NOH"
-        pbp_v2_df["away_team_abbrev"] = "MIL"
-
-    elif pbp_v2_df.game_id.unique()[0] == "0021700259":
-        home_team_abbrev = "HOU"
-        away_team_abbrev = "DEN"
-        pbp_v2_df["home_team_abbrev"] = "HOU"
-        pbp_v2_df["away_team_abbrev"] = "DEN"
-    elif pbp_v2_df.game_id.unique()[0] == "0021700477":
-        home_team_abbrev = "OKC"
-        away_team_abbrev = "ATL"
-        pbp_v2_df["home_team_abbrev"] = "OKC"
-        pbp_v2_df["away_team_abbrev"] = "ATL"
-    elif pbp_v2_df.game_id.unique()[0] == "0021700957":
-        home_team_abbrev = "CHA"
-        away_team_abbrev = "PHI"
-        pbp_v2_df["home_team_abbrev"] = "CHA"
-        pbp_v2_df["away_team_abbrev"] = "PHI"
-    elif pbp_v2_df.game_id.unique()[0] == "0021900251":
-        home_team_abbrev = "DAL"
-        away_team_abbrev = "LAC"
-        pbp_v2_df["home_team_abbrev"] = "DAL"
-        pbp_v2_df["away_team_abbrev"] = "LAC"
-    elif pbp_v2_df.game_id.unique()[0] == "0021900539":
-        home_team_abbrev = "CHA"
-        away_team_abbrev = "IND"
-        pbp_v2_df["home_team_abbrev"] = "CHA"
-        pbp_v2_df["away_team_abbrev"] = "IND"
+    if has_override:
+        home_team_abbrev = overrides["home_team_abbrev"]
+        away_team_abbrev = overrides["away_team_abbrev"]
+    elif "home_team_abbrev" in game_info and "away_team_abbrev" in game_info:
+        home_team_abbrev = game_info["home_team_abbrev"]
+        away_team_abbrev = game_info["away_team_abbrev"]
     else:
-        if (
-            pd.isnull(
-                pbp_v2_df[pbp_v2_df["eventmsgtype"] == 10][["homedescription"]].values[
-                    0
-                ]
-            )
-            == 1
-        ):
-            home_team_abbrev = pbp_v2_df[pbp_v2_df["eventmsgtype"] == 10][
-                "player2_team_abbreviation"
-            ].iloc[0]
-            away_team_abbrev = pbp_v2_df[pbp_v2_df["eventmsgtype"] == 10][
-                "player1_team_abbreviation"
-            ].iloc[0]
-        else:
-            home_team_abbrev = pbp_v2_df[pbp_v2_df["eventmsgtype"] == 10][
-                "player1_team_abbreviation"
-            ].iloc[0]
-            away_team_abbrev = pbp_v2_df[pbp_v2_df["eventmsgtype"] == 10][
-                "player2_team_abbreviation"
-            ].iloc[0]
-
-        pbp_v2_df["home_team_abbrev"] = home_team_abbrev
-        pbp_v2_df["away_team_abbrev"] = away_team_abbrev
-
-    clean_df = pbp_v2_df
-
-    print(
-        clean_df[clean_df["player1_team_abbreviation"] == home_team_abbrev][
-            "player1_team_id"
-        ]
-        .astype(int)
-        .unique()
-    )
-    # code to properly get the team ids as the scientific notation cuts off some digits
-    clean_df.loc[:, "home_team_id"] = (
-        clean_df[clean_df["player1_team_abbreviation"] == home_team_abbrev][
-            "player1_team_id"
-        ]
-        .astype(int)
-        .unique()[0]
-    )
+        home_team_abbrev, away_team_abbrev = get_home_away_abbrevs(pbp_df)
 
-    clean_df.loc[:, "away_team_id"] = (
-        clean_df[clean_df["player1_team_abbreviation"] == away_team_abbrev][
-            "player1_team_id"
-        ]
-        .astype(int)
-        .unique()[0]
+    return (
+        home_team_abbrev,
+        away_team_abbrev,
+        int(abbrev_ids[home_team_abbrev]),
+        int(abbrev_ids[away_team_abbrev]),
     )
 
-    clean_df["game_date"] = ""
 
-    if clean_df["game_id"].unique()[0][3:5] == "99":
-        clean_df["season"] = 2000
-    elif clean_df["game_id"].unique()[0][3:5] == "00":
-        clean_df["season"] = 2001
-    else:
-        clean_df.loc[
-            :, ("season")
-        ] = f"20{int(clean_df['game_id'].unique()[0][3:5])+1:02}"
-    # TODO columns to pull out [['evt', 'locX', 'locY', 'hs', 'vs', 'de']]
-    # create an event team colum
-    clean_df["event_team"] = np.where(
-        clean_df["homedescription"].isnull(),
-        clean_df["away_team_abbrev"],
+def game_id_value(pbp_df):
+    """
+    Inputs:
+    pbp_df      - play by play dataframe of the api columns
+
+    Outputs:
+    game_id     - the game id string of the play by play
+    """
+    return pbp_df["game_id"].iloc[0]
+
+
+def game_info_column(pbp_df, derived):
+    """
+    the game's entry in the game index
+    """
+    return GAME_INDEX.get("nba", game_id_value(pbp_df))
+
+
+def teams_column(pbp_df, derived):
+    """
+    tuple of the home and away team abbreviations and ids
+    """
+    return get_game_teams(pbp_df, derived["_game_info"])
+
+
+def season_column(pbp_df, derived):
+    """
+    season the game was played in
+    """
+    game_id = game_id_value(pbp_df)
+    if game_id[3:5] == "99":
+        return 2000
+    elif game_id[3:5] == "00":
+        return 2001
+    return f"20{int(game_id[3:5])+1:02}"
+
+
+def event_team_column(pbp_df, derived):
+    """
+    abbreviation of the team of each event
+    """
+    home_flags = derived["_home_flags"]
+    away_flags = derived["_away_flags"]
+    home_team_abbrev = derived["home_team_abbrev"]
+    away_team_abbrev = derived["away_team_abbrev"]
+    return np.where(
+        is_missing(home_flags),
+        away_team_abbrev,
         np.where(
-            clean_df["visitordescription"].isnull(),
-            clean_df["home_team_abbrev"],
+            is_missing(away_flags),
+            home_team_abbrev,
             np.where(
-                (clean_df["homedescription"].str.contains("Turnover"))
-                | (clean_df["homedescription"].str.contains("MISS")),
-                clean_df["home_team_abbrev"],
-                clean_df["away_team_abbrev"],
+                has_token(home_flags, "Turnover") | has_token(home_flags, "MISS"),
+                home_team_abbrev,
+                away_team_abbrev,
             ),
         ),
-    )
+    ).astype(object)
 
-    # create and event type description column
-    clean_df["event_type_de"] = clean_df[["eventmsgtype"]].replace(
-        {"eventmsgtype": EVENT_TYPE_DICT}
-    )
 
-    # DON'T DELETE THIS WILL BRAKE WHOLE PROGRAM
-    clean_df["shot_type_de"] = ""
+def shot_made_column(pbp_df, derived):
+    """
+    whether each shot was made
+    """
+    return made_shot_array(
+        pbp_df["eventmsgtype"],
+        has_token(derived["_home_flags"], "MISS")
+        | has_token(derived["_away_flags"], "MISS"),
+    )
 
-    # create column whether shot was succesful or not
-    clean_df["shot_made"] = clean_df.apply(made_shot, axis=1)
 
-    # create a column that says whether the shot was blocked or not
-    clean_df["is_block"] = np.where(
-        clean_df["homedescription"].str.contains("BLOCK")
-        | clean_df["visitordescription"].str.contains("BLOCK"),
+def is_block_column(pbp_df, derived):
+    """
+    whether each shot was blocked. A block in the visitor description isn't
+    counted when the home description is missing
+    """
+    home_flags = derived["_home_flags"]
+    return np.where(
+        has_token(home_flags, "BLOCK")
+        | (~is_missing(home_flags) & has_token(derived["_away_flags"], "BLOCK")),
         1,
         0,
     )
-    # parse mtype column to get all the shot types being taken
-    clean_df["shot_type"] = clean_df.apply(parse_shot_types, axis=1)
 
-    # Clean time to get a seconds elapsed column
-    clean_df["seconds_elapsed"] = clean_df.apply(create_seconds_elapsed, axis=1)
 
-    # calculate event length of each event in seconds
-    clean_df["event_length"] = clean_df["seconds_elapsed"] - clean_df[
-        "seconds_elapsed"
-    ].shift(1)
+def event_length_column(pbp_df, derived):
+    """
+    length of each event in seconds
+    """
+    return event_length_array(derived["seconds_elapsed"])
 
-    # determine whether shot was a three pointer
-    clean_df["is_three"] = np.where(
-        (clean_df["homedescription"].str.contains("3PT")).fillna(False)
-        | (clean_df["visitordescription"].str.contains("3PT")).fillna(False),
-        1,
-        0,
+
+def player_rebound_column(pbp_df, derived):
+    """
+    whether each event is a rebound by a player instead of a team
+    """
+    return (derived["event_type_de"].values == "rebound") & ~np.isin(
+        pbp_df["player1_id"].values,
+        [derived["home_team_id"], derived["away_team_id"]],
     )
 
-    # determine points earned
-    clean_df["points_made"] = clean_df.apply(calc_points_made, axis=1)
 
-    # create columns that determine if rebound is offenseive or deffensive
-    clean_df["is_o_rebound"] = np.where(
-        (clean_df["event_type_de"] == "rebound")
-        & (clean_df["event_team"] == clean_df["event_team"].shift(1))
-        & (
-            ~clean_df["player1_id"].isin(
-                [clean_df.home_team_id.unique()[0], clean_df.away_team_id.unique()[0]]
-            )
+def same_team_column(pbp_df, derived):
+    """
+    whether each event's team is the same as the event before it
+    """
+    return same_as_previous(derived["event_team"])
+
+
+def is_putback_column(pbp_df, derived):
+    """
+    whether each shot is a putback off an offensive rebound
+    """
+    return putback_array(derived["is_o_rebound"], derived["event_length"])
+
+
+def team_column(index):
+    """
+    Inputs:
+    index       - position of the column in the tuple teams_column returns
+
+    Outputs:
+    team_column - column function of that team abbreviation or id
+    """
+
+    def team_value(pbp_df, derived):
+        return derived["_teams"][index]
+
+    return team_value
+
+
+def description_flag_column(token):
+    """
+    Inputs:
+    token       - word in DESCRIPTION_TOKENS
+
+    Outputs:
+    flag_column - column function of whether either description of each
+                  event has the word
+    """
+
+    def flag_column(pbp_df, derived):
+        return np.where(
+            has_token(derived["_home_flags"], token)
+            | has_token(derived["_away_flags"], token),
+            1,
+            0,
+        )
+
+    return flag_column
+
+
+TEAM_COLUMNS = [
+    "home_team_abbrev",
+    "away_team_abbrev",
+    "home_team_id",
+    "away_team_id",
+]
+FLAG_COLUMNS = ("_home_flags", "_away_flags")
+# every derived column scrape_pbp can add to the play by play, the columns
+# each one is calculated from and the function that calculates it. See
+# column_graph for how it is used
+PBP_COLUMN_GRAPH = {
+    "_game_info": (("game_id",), game_info_column),
+    "_teams": (
+        (
+            "_game_info",
+            "game_id",
+            "eventmsgtype",
+            "homedescription",
+            "visitordescription",
+            "player1_team_id",
+            "player1_team_abbreviation",
+            "player2_team_abbreviation",
         ),
-        1,
-        0,
-    )
-    clean_df["is_d_rebound"] = np.where(
-        (clean_df["event_type_de"] == "rebound")
-        & (clean_df["event_team"] != clean_df["event_team"].shift(1))
-        & (
-            ~clean_df["player1_id"].isin(
-                [clean_df.home_team_id.unique()[0], clean_df.away_team_id.unique()[0]]
-            )
+        teams_column,
+    ),
+    "game_date": ((), lambda pbp_df, derived: ""),
+    "season": (("game_id",), season_column),
+    # scan each description column once for every word the columns below are
+    # worked out from
+    "_home_flags": (
+        ("homedescription",),
+        lambda pbp_df, derived: tokenize_descriptions(pbp_df["homedescription"].values),
+    ),
+    "_away_flags": (
+        ("visitordescription",),
+        lambda pbp_df, derived: tokenize_descriptions(
+            pbp_df["visitordescription"].values
         ),
-        1,
-        0,
-    )
+    ),
+    "event_team": (
+        FLAG_COLUMNS + ("home_team_abbrev", "away_team_abbrev"),
+        event_team_column,
+    ),
+    "event_type_de": (
+        ("eventmsgtype",),
+        lambda pbp_df, derived: replace_codes(pbp_df["eventmsgtype"], EVENT_TYPE_DICT),
+    ),
+    # DON'T DELETE THIS WILL BRAKE WHOLE PROGRAM
+    "shot_type_de": ((), lambda pbp_df, derived: ""),
+    "shot_made": (FLAG_COLUMNS + ("eventmsgtype",), shot_made_column),
+    "is_block": (FLAG_COLUMNS, is_block_column),
+    "shot_type": (
+        ("eventmsgtype", "eventmsgactiontype"),
+        lambda pbp_df, derived: shot_type_array(
+            pbp_df["eventmsgtype"], pbp_df["eventmsgactiontype"]
+        ),
+    ),
+    "seconds_elapsed": (
+        ("pctimestring", "period"),
+        lambda pbp_df, derived: seconds_elapsed_array(
+            pbp_df["pctimestring"], pbp_df["period"]
+        ),
+    ),
+    "event_length": (("seconds_elapsed",), event_length_column),
+    "is_three": (FLAG_COLUMNS, description_flag_column("3PT")),
+    "points_made": (
+        ("is_three", "shot_made", "eventmsgtype"),
+        lambda pbp_df, derived: points_made_array(
+            pd.Series(derived["is_three"], index=pbp_df.index),
+            derived["shot_made"],
+            pbp_df["eventmsgtype"],
+        ),
+    ),
+    "_player_rebound": (
+        ("event_type_de", "player1_id", "home_team_id", "away_team_id"),
+        player_rebound_column,
+    ),
+    "_same_team": (("event_team",), same_team_column),
+    "is_o_rebound": (
+        ("_player_rebound", "_same_team"),
+        lambda pbp_df, derived: np.where(
+            derived["_player_rebound"] & derived["_same_team"], 1, 0
+        ),
+    ),
+    "is_d_rebound": (
+        ("_player_rebound", "_same_team"),
+        lambda pbp_df, derived: np.where(
+            derived["_player_rebound"] & ~derived["_same_team"], 1, 0
+        ),
+    ),
+    "is_turnover": (FLAG_COLUMNS, description_flag_column("Turnover")),
+    "is_steal": (FLAG_COLUMNS, description_flag_column("STEAL")),
+    "foul_type": (
+        ("eventmsgtype", "eventmsgactiontype"),
+        lambda pbp_df, derived: foul_type_array(
+            pbp_df["eventmsgtype"], pbp_df["eventmsgactiontype"]
+        ),
+    ),
+    "is_putback": (("is_o_rebound", "event_length"), is_putback_column),
+}
+PBP_COLUMN_GRAPH.update(
+    {column: (("_teams",), team_column(i)) for i, column in enumerate(TEAM_COLUMNS)}
+)
+# the derived columns in the order scrape_pbp adds them after the api columns
+PBP_DERIVED_COLUMNS = TEAM_COLUMNS + [
+    "game_date",
+    "season",
+    "event_team",
+    "event_type_de",
+    "shot_type_de",
+    "shot_made",
+    "is_block",
+    "shot_type",
+    "seconds_elapsed",
+    "event_length",
+    "is_three",
+    "points_made",
+    "is_o_rebound",
+    "is_d_rebound",
+    "is_turnover",
+    "is_steal",
+    "foul_type",
+    "is_putback",
+]
+
+
+def scrape_pbp(v2_dict, game_info=None, columns=None):
+    """
+    This function scrapes both of the pbp urls and returns a joined/cleaned
+    pbp dataframe. Only the derived columns that were asked for and the
+    columns they are calculated from are worked out
 
-    # create columns to determine turnovers and steals
-    clean_df["is_turnover"] = np.where(
-        (clean_df["homedescription"].str.contains("Turnover")).fillna(False)
-        | (clean_df["visitordescription"].str.contains("Turnover")).fillna(False),
-        1,
-        0,
-    )
-    clean_df["is_steal"] = np.where(
-        (clean_df["homedescription"].str.contains("STEAL")).fillna(False)
-        | (clean_df["visitordescription"].str.contains("STEAL")).fillna(False),
-        1,
-        0,
+    Inputs:
+    v2_dict     - stats.nba.com api response
+    game_info   - the game's entry in the game index. Defaults to looking it
+                  up
+    columns     - list of the api and derived columns to return in that
+                  order. None returns every column
+
+    Outputs:
+    clean_df - final cleaned dataframe
+    """
+    result_set = v2_dict["resultSets"][0]
+    headers = [header.lower() for header in result_set["headers"]]
+    if columns is None:
+        columns = headers + PBP_DERIVED_COLUMNS
+    check_columns(columns, headers + PBP_DERIVED_COLUMNS)
+
+    derived_order, api_columns = resolve_columns(PBP_COLUMN_GRAPH, columns)
+    # converting stats.nba.com json into pandas dataframe with only the
+    # columns that are needed
+    pbp_v2_df = rowset_frame(
+        result_set,
+        PBP_V2_DTYPES,
+        [header for header in headers if header in api_columns],
     )
 
-    # determine what type of fouls are being commited
-    clean_df["foul_type"] = clean_df.apply(parse_foul, axis=1)
+    # every derived column is worked out into its own array first and they
+    # are all added to the dataframe at once at the end instead of one at a
+    # time
+    # TODO columns to pull out [['evt', 'locX', 'locY', 'hs', 'vs', 'de']]
+    derived = compute_columns(
+        PBP_COLUMN_GRAPH,
+        derived_order,
+        pbp_v2_df,
+        {} if game_info is None else {"_game_info": game_info},
+    )
 
-    # determine if a shot is a putback off an offensive reboundk
-    clean_df["is_putback"] = np.where(
-        (clean_df["is_o_rebound"].shift(1) == 1) & (clean_df["event_length"] <= 3), 1, 0
+    return pd.DataFrame(
+        {
+            column: derived[column] if column in derived else pbp_v2_df[column]
+            for column in columns
+        },
+        index=pbp_v2_df.index,
     )
 
-    return clean_df
 
+def is_final_pbp(v2_dict):
+    """
+    Inputs:
+    v2_dict     - dictionary of the playbyplayv2 api response
 
-def get_pbp_api(game_id):
+    Outputs:
+    is_final    - True if the game is over. That is the last event ends the
+                  fourth period or an overtime and the score isn't tied
+    """
+    result_set = v2_dict["resultSets"][0]
+    rows = result_set["rowSet"]
+    if not rows:
+        return False
+    headers = [header.lower() for header in result_set["headers"]]
+    event_type = rows[-1][headers.index("eventmsgtype")]
+    period = rows[-1][headers.index("period")]
+    score_index = headers.index("score")
+    scores = [row[score_index] for row in rows if row[score_index]]
+    if event_type != 13 or period < 4 or not scores:
+        return False
+    home_score, away_score = scores[-1].split(" - ")
+    return home_score != away_score
+
+
+def get_pbp_api(game_id, client=None):
     """
     function gets both JSON requests from the two different APIs if both
     are available and only the stats.nba.com api if not.
 
     Inputs:
     game_id          - String representing game id
+    client           - NBAClient to make the api call with
 
     Outputs:
     v2_dict          - Dictionary of the JSON response from the stats.nba.com api
@@ -331,18 +575,23 @@ def get_pbp_api(game_id):
     )
 
     try:
-        v2_rep = requests.get(v2_api_url, headers=USER_AGENT)
+        v2_dict = get_json(
+            "playbyplayv2",
+            {"GameID": game_id},
+            v2_api_url,
+            headers=USER_AGENT,
+            client=client,
+            is_final=is_final_pbp,
+        )
     except json.decoder.JSONDecodeError as ex:
-        print(ex)
-        print(f"This is the stats.nba.com API's output: {v2_rep.text}")
-        sys.exit()
-
-    v2_dict = v2_rep.json()
+        raise ValueError(
+            f"The stats.nba.com API didn't return JSON for game {game_id}"
+        ) from ex
 
     return v2_dict
 
 
-def get_lineup_api(game_id, period):
+def get_lineup_api(game_id, period, client=None):
     """
     function pulls the possible lineups for the given period and game id for
     both the away and home teams
@@ -350,6 +599,7 @@ def get_lineup_api(game_id, period):
     Inputs:
     game_id            - id of game
     period             - period of game
+    client             - NBAClient to make the api call with
 
     Outputs:
     lineup_req_dict    - dictionary of lineup api request respons
@@ -371,369 +621,718 @@ def get_lineup_api(game_id, period):
         f"endRange={end_range}&rangeType=2"
     )
 
-    lineups_req = requests.get(url, headers=USER_AGENT)
-    lineup_req_dict = json.loads(lineups_req.text)
+    params = {
+        "gameId": game_id,
+        "period": period,
+        "startRange": start_range,
+        "endRange": end_range,
+    }
+    lineup_req_dict = get_json(
+        "boxscoreadvancedv2",
+        params,
+        url,
+        headers=USER_AGENT,
+        client=client,
+        is_final=has_lineup_rows,
+    )
 
     return lineup_req_dict
 
 
-def get_lineup(period_df, lineups, dataframe):
+def infer_period_starters(period_df):
     """
-    this function calculates the lineups for each team at each event and then
-    appends it to the current dataframe. This only works for one period at a
-    time
+    works out which players started the period for both teams from the play
+    by play alone in one pass over its columns. Players are counted as
+    starters if they record an event or are subbed out before they are
+    subbed in. A team's events stop being looked at once five of its starters
+    have been found
 
     Inputs:
-    period_df         - the main game pbp dataframe subsetted to only one period
-                        in the game
-    lineups           - lineup api response dictionary
-    dataframe         - full game dataframe. This is passed to get players name from
-                        id in case the player didn't have an event in that period.
+    period_df       - the main game pbp dataframe subsetted to only one period
 
     Outputs:
-    lineup_df     - period_df with each teams lineups calculate and added to the
-                    dataframe
+    starters        - dictionary of home and away to a tuple of the set of ids
+                      of the players who started the period and the set of
+                      ids of the players subbed in before they recorded an
+                      event
+    """
+    abbrev_teams = {
+        period_df[f"{team}_team_abbrev"].unique()[0]: team for team in ["home", "away"]
+    }
+    starters = {team: (set(), set()) for team in ["home", "away"]}
+    teams_left = len(starters)
+
+    for (
+        event_team,
+        has_name,
+        player1_team,
+        is_block,
+        is_steal,
+        event_type,
+        player1_id,
+        player2_id,
+    ) in zip(
+        period_df["event_team"].values,
+        pd.notnull(period_df["player1_name"]).values,
+        period_df["player1_team_abbreviation"].values,
+        period_df["is_block"].values,
+        period_df["is_steal"].values,
+        period_df["event_type_de"].values,
+        period_df["player1_id"].values,
+        period_df["player2_id"].values,
+    ):
+        if (
+            event_team != player1_team
+            or event_team not in abbrev_teams
+            or not has_name
+            or is_block != 0
+            or is_steal != 0
+        ):
+            continue
+        starting_lineup, subs = starters[abbrev_teams[event_team]]
+        if len(starting_lineup) == 5:
+            continue
+
+        if event_type != "substitution":
+            if player1_id != 0 and player1_id not in subs:
+                starting_lineup.add(player1_id)
+        else:
+            if player2_id not in starting_lineup:
+                subs.add(player2_id)
+            if player1_id not in subs:
+                starting_lineup.add(player1_id)
+
+        if len(starting_lineup) == 5:
+            teams_left -= 1
+            if teams_left == 0:
+                break
+
+    return starters
+
+
+def get_player_names(period_df):
     """
+    Inputs:
+    period_df       - the main game pbp dataframe subsetted to only one period
 
-    # subsets main dataframe by period and subsets into a home and away subs
-    subs_df = period_df[(period_df.event_type_de == "substitution")]
-    away_subs = subs_df[pd.isnull(subs_df["visitordescription"]) == 0]
-    home_subs = subs_df[pd.isnull(subs_df["homedescription"]) == 0]
+    Outputs:
+    player_names    - dictionary of each player1_id to the player1_name of its
+                      first event
+    """
+    player_ids = period_df["player1_id"].values[::-1]
+    player_names = period_df["player1_name"].values[::-1]
+    return dict(zip(player_ids, player_names))
+
+
+def infer_lineups(period_df):
+    """
+    builds the starting lineups of both teams from the play by play in the
+    same shape as the boxscoreadvancedv2 api response so it can be passed to
+    get_lineup in place of it
+
+    Inputs:
+    period_df       - the main game pbp dataframe subsetted to only one period
+
+    Outputs:
+    lineup_dict     - dictionary shaped like the lineup api response or None if
+                      five starters couldn't be found for both teams
+    """
+    game_id = period_df["game_id"].unique()[0]
+    starters = infer_period_starters(period_df)
+    if any(len(starting_lineup) != 5 for starting_lineup, _ in starters.values()):
+        return None
+
+    player_names = get_player_names(period_df)
+    players = []
+    for team in ["home", "away"]:
+        team_id = period_df[f"{team}_team_id"].unique()[0]
+        team_abbrev = period_df[f"{team}_team_abbrev"].unique()[0]
+        for player_id in starters[team][0]:
+            players.append(
+                [
+                    game_id,
+                    team_id,
+                    team_abbrev,
+                    None,
+                    player_id,
+                    player_names[player_id],
+                ]
+            )
+
+    return {"resultSets": [{"rowSet": players}]}
+
+
+def lineup_arrays(
+    period_df, home_ids_names, away_ids_names, lineup_ids=None, lineup_names=None
+):
+    """
+    works out the players on the court for each team at every event of a
+    period. Only the substitution events are walked, the lineup between two
+    substitutions is the same so each stretch of events is filled with it at
+    once
+
+    Inputs:
+    period_df       - the main game pbp dataframe subsetted to only one period
+    home_ids_names  - list of (id, name) tuples of the home team's starters
+    away_ids_names  - list of (id, name) tuples of the away team's starters
+    lineup_ids      - object array with a row for each event and a column for
+                      each of the ten players to write the ids into. Can be a
+                      slice of a whole game's array. Defaults to a new array
+    lineup_names    - object array like lineup_ids to write the names into
+
+    Outputs:
+    lineup_ids      - array of the ids of the home players then the away
+                      players on the court at each event
+    lineup_names    - array of the names of the same players
+    """
+    # subs with no visitor description are home subs and subs with no home
+    # description are away subs
+    is_sub = (period_df["event_type_de"] == "substitution").to_numpy()
+    no_home = pd.isnull(period_df["homedescription"]).to_numpy()
+    no_away = pd.isnull(period_df["visitordescription"]).to_numpy()
+    home_subs = is_sub & no_away
+    away_subs = is_sub & no_home & ~no_away
+    players_out = period_df["player1_id"].to_numpy()
+    players_in_ids = period_df["player2_id"].to_numpy()
+    players_in_names = period_df["player2_name"].to_numpy()
+
+    if lineup_ids is None:
+        lineup_ids = np.empty((period_df.shape[0], 10), dtype=object)
+    if lineup_names is None:
+        lineup_names = np.empty((period_df.shape[0], 10), dtype=object)
+    lineups = {"home": list(home_ids_names), "away": list(away_ids_names)}
+
+    def fill(start, end):
+        if start == end:
+            return
+        on_court = lineups["home"][:5] + lineups["away"][:5]
+        if len(lineups["home"]) < 5 or len(lineups["away"]) < 5:
+            raise IndexError(
+                f"Couldn't find five players on the court for each team in "
+                f"period {period_df.period.unique()[0]}"
+            )
+        lineup_ids[start:end] = [player[0] for player in on_court]
+        lineup_names[start:end] = [player[1] for player in on_court]
 
+    start = 0
+    for i in np.flatnonzero(home_subs | away_subs):
+        fill(start, i)
+        team = "home" if home_subs[i] else "away"
+        lineups[team] = [p for p in lineups[team] if p[0] != players_out[i]]
+        lineups[team].append((players_in_ids[i], players_in_names[i]))
+        start = i
+    fill(start, period_df.shape[0])
+
+    return lineup_ids, lineup_names
+
+
+def fill_lineups(period_df, home_ids_names, away_ids_names):
+    """
+    adds the players on the court for each team at every event of a period
+    with every lineup column assigned to the dataframe in one go
+
+    Inputs:
+    period_df       - the main game pbp dataframe subsetted to only one period
+    home_ids_names  - list of (id, name) tuples of the home team's starters
+    away_ids_names  - list of (id, name) tuples of the away team's starters
+
+    Outputs:
+    period_df       - period_df with the lineup columns added
+    """
+    lineup_ids, lineup_names = lineup_arrays(period_df, home_ids_names, away_ids_names)
+    for column, name in enumerate(LINEUP_COLUMNS):
+        period_df[name] = lineup_names[:, column]
+        period_df[f"{name}_id"] = lineup_ids[:, column]
+
+    return period_df
+
+
+def get_period_starters(period_df, lineups, stats=None):
+    """
+    finds the players who started the period for each team. The api's
+    starters are checked against the play by play and worked out from it
+    instead when they don't match
+
+    Inputs:
+    period_df       - the main game pbp dataframe subsetted to only one period
+    lineups         - lineup api response dictionary
+    stats           - dictionary to count the checked and inferred starters
+                      in. None counts them in LINEUP_API_STATS
+
+    Outputs:
+    home_ids_names  - list of (id, name) tuples of the home team's starters
+    away_ids_names  - list of (id, name) tuples of the away team's starters
+    """
     home_team = period_df["home_team_id"].unique()[0]
     away_team = period_df["away_team_id"].unique()[0]
     players = lineups["resultSets"][0]["rowSet"]
-    home_ids_names = [(p[4], p[5]) for p in players if p[1] == home_team]
-    away_ids_names = [(p[4], p[5]) for p in players if p[1] == away_team]
-
-    # gets the index of the first sub for home and away to get the players who started
-    # the period by subsetting the dataframe to all actions before the first sub for
-    # each team
-    away_indexes = list(away_subs.index)
-    home_indexes = list(home_subs.index)
-    # pulls the unique values from the whole period dataframe if there are no subs
-    # then it just pulls the unique ids from the from the dataframe itself because
-    # the away/home indexes will be an empty list
+    team_ids_names = {
+        "home": [(p[4], p[5]) for p in players if p[1] == home_team],
+        "away": [(p[4], p[5]) for p in players if p[1] == away_team],
+    }
 
-    try:
-        home_starting_line = list(
-            period_df[
-                (period_df.event_team == period_df["home_team_abbrev"].unique()[0])
-                & (~pd.isnull(period_df["player1_name"]))
-                & (
-                    period_df["player1_team_abbreviation"]
-                    == period_df["home_team_abbrev"].unique()[0]
-                )
-                & (period_df.is_block == 0)
-                & (period_df.is_steal == 0)
-            ]
-            .loc[: home_indexes[0], :]["player1_id"]
-            .unique()
+    # the players who had an event before their team's first sub started the
+    # period. If they don't match the api's starters the starters are worked
+    # out from the play by play instead
+    is_sub = (period_df["event_type_de"] == "substitution").values
+    has_name = pd.notnull(period_df["player1_name"]).values
+    starters = None
+    for team in ["home", "away"]:
+        team_abbrev = period_df[f"{team}_team_abbrev"].unique()[0]
+        team_events = (
+            (period_df["event_team"].values == team_abbrev)
+            & has_name
+            & (period_df["player1_team_abbreviation"].values == team_abbrev)
+            & (period_df["is_block"].values == 0)
+            & (period_df["is_steal"].values == 0)
         )
-    except IndexError:
-        home_starting_line = list(
-            period_df[
-                (period_df.event_team == period_df["home_team_abbrev"].unique()[0])
-                & (~pd.isnull(period_df["player1_name"]))
-                & (
-                    period_df["player1_team_abbreviation"]
-                    == period_df["home_team_abbrev"].unique()[0]
-                )
-                & (period_df.is_block == 0)
-                & (period_df.is_steal == 0)
-            ]["player1_id"].unique()
+        description = "homedescription" if team == "home" else "visitordescription"
+        team_subs = np.flatnonzero(is_sub & pd.notnull(period_df[description]).values)
+        if len(team_subs) > 0:
+            team_events[team_subs[0] + 1 :] = False
+        starting_line = set(period_df["player1_id"].values[team_events])
+
+        ids_names = team_ids_names[team]
+        fallback = starting_line != {x[0] for x in ids_names} or len(ids_names) != 5
+        add_lineup_stats(
+            {"starters_checked": 1, "starters_inferred": int(fallback)}, stats
         )
-
-    if {x for x in home_starting_line} != {x[0] for x in home_ids_names} or len(
-        home_ids_names
-    ) != 5:
-        starting_lineup = set()
-        subs = set()
-        for i in range(period_df.shape[0]):
-            if (
-                period_df.iloc[i, :]["event_team"]
-                == period_df["home_team_abbrev"].unique()[0]
-                and pd.isnull(period_df.iloc[i, :]["player1_name"]) != 1
-                and period_df.iloc[i, :]["player1_team_abbreviation"]
-                == period_df.iloc[i, :]["home_team_abbrev"]
-                and period_df.iloc[i, :]["is_block"] == 0
-                and period_df.iloc[i, :]["is_steal"] == 0
-            ):
-                if period_df.iloc[i, :]["event_type_de"] != "substitution":
-                    if (
-                        period_df.iloc[i, :]["player1_id"] != 0
-                        and period_df.iloc[i, :]["player1_id"] not in subs
-                    ):
-                        starting_lineup.add(period_df.iloc[i, :]["player1_id"])
-                else:
-                    if period_df.iloc[i, :]["player2_id"] not in starting_lineup:
-                        subs.add(period_df.iloc[i, :]["player2_id"])
-                    if period_df.iloc[i, :]["player1_id"] not in subs:
-                        starting_lineup.add(period_df.iloc[i, :]["player1_id"])
-
-                if len(starting_lineup) == 5:
-                    break
-        if len(home_ids_names) < 5:
-            home_ids_names = [
-                (
-                    period_df[period_df.player1_id == x].player1_id.unique()[0],
-                    period_df[period_df.player1_id == x].player1_name.unique()[0],
-                )
-                for x in starting_lineup
-            ]
+        if not fallback:
+            continue
+
+        if starters is None:
+            starters = infer_period_starters(period_df)
+            player_names = get_player_names(period_df)
+        starting_lineup, subs = starters[team]
+        if len(ids_names) < 5:
+            ids_names = [(x, player_names[x]) for x in starting_lineup]
         else:
-            home_ids_names = [(p[0], p[1]) for p in home_ids_names if p[0] not in subs]
-        if len(home_ids_names) != 5 and len(starting_lineup) == 5:
-            home_ids_names = [
-                (
-                    period_df[period_df.player1_id == x].player1_id.unique()[0],
-                    period_df[period_df.player1_id == x].player1_name.unique()[0],
-                )
-                for x in starting_lineup
-            ]
+            ids_names = [(p[0], p[1]) for p in ids_names if p[0] not in subs]
+        if len(ids_names) != 5 and len(starting_lineup) == 5:
+            ids_names = [(x, player_names[x]) for x in starting_lineup]
+        team_ids_names[team] = ids_names
+
+    home_ids_names = team_ids_names["home"]
+    away_ids_names = team_ids_names["away"]
 
-    try:
-        away_starting_line = list(
-            period_df[
-                (period_df.event_team == period_df["away_team_abbrev"].unique()[0])
-                & (~pd.isnull(period_df["player1_name"]))
-                & (
-                    period_df["player1_team_abbreviation"]
-                    == period_df["away_team_abbrev"].unique()[0]
-                )
-                & (period_df.is_block == 0)
-                & (period_df.is_steal == 0)
-            ]
-            .loc[: away_indexes[0], :]["player1_id"]
-            .unique()
-        )
-    except IndexError:
-        away_starting_line = list(
-            period_df[
-                (period_df.event_team == period_df["away_team_abbrev"].unique()[0])
-                & (~pd.isnull(period_df["player1_name"]))
-                & (
-                    period_df["player1_team_abbreviation"]
-                    == period_df["away_team_abbrev"].unique()[0]
-                )
-                & (period_df.is_block == 0)
-                & (period_df.is_steal == 0)
-            ]["player1_id"].unique()
-        )
-    if {x for x in away_starting_line} != {x[0] for x in away_ids_names} or len(
-        away_ids_names
-    ) != 5:
-        starting_lineup = set()
-        subs = set()
-        for i in range(period_df.shape[0]):
-            if (
-                period_df.iloc[i, :]["event_team"]
-                == period_df["away_team_abbrev"].unique()[0]
-                and pd.isnull(period_df.iloc[i, :]["player1_name"]) != 1
-                and period_df.iloc[i, :]["player1_team_abbreviation"]
-                == period_df.iloc[i, :]["away_team_abbrev"]
-                and period_df.iloc[i, :]["is_block"] == 0
-                and period_df.iloc[i, :]["is_steal"] == 0
-            ):
-                if period_df.iloc[i, :]["event_type_de"] != "substitution":
-                    if (
-                        period_df.iloc[i, :]["player1_id"] != 0
-                        and period_df.iloc[i, :]["player1_id"] not in subs
-                    ):
-                        starting_lineup.add(period_df.iloc[i, :]["player1_id"])
-                else:
-                    if period_df.iloc[i, :]["player2_id"] not in starting_lineup:
-                        subs.add(period_df.iloc[i, :]["player2_id"])
-                    if period_df.iloc[i, :]["player1_id"] not in subs:
-                        starting_lineup.add(period_df.iloc[i, :]["player1_id"])
-
-                if len(starting_lineup) == 5:
-                    break
-        if len(away_ids_names) < 5:
-            away_ids_names = [
-                (
-                    period_df[period_df.player1_id == x].player1_id.unique()[0],
-                    period_df[period_df.player1_id == x].player1_name.unique()[0],
-                )
-                for x in starting_lineup
-            ]
-        else:
-            away_ids_names = [(p[0], p[1]) for p in away_ids_names if p[0] not in subs]
-        if len(away_ids_names) != 5 and len(starting_lineup) == 5:
-            away_ids_names = [
-                (
-                    period_df[period_df.player1_id == x].player1_id.unique()[0],
-                    period_df[period_df.player1_id == x].player1_name.unique()[0],
-                )
-                for x in starting_lineup
-            ]
-
-    # creating columns to populate with players on the court
-    period_df.loc[:, "home_player_1"] = ""
-    period_df.loc[:, "home_player_1_id"] = ""
-    period_df.loc[:, "home_player_2"] = ""
-    period_df.loc[:, "home_player_2_id"] = ""
-    period_df.loc[:, "home_player_3"] = ""
-    period_df.loc[:, "home_player_3_id"] = ""
-    period_df.loc[:, "home_player_4"] = ""
-    period_df.loc[:, "home_player_4_id"] = ""
-    period_df.loc[:, "home_player_5"] = ""
-    period_df.loc[:, "home_player_5_id"] = ""
-    period_df.loc[:, "away_player_1"] = ""
-    period_df.loc[:, "away_player_1_id"] = ""
-    period_df.loc[:, "away_player_2"] = ""
-    period_df.loc[:, "away_player_2_id"] = ""
-    period_df.loc[:, "away_player_3"] = ""
-    period_df.loc[:, "away_player_3_id"] = ""
-    period_df.loc[:, "away_player_4"] = ""
-    period_df.loc[:, "away_player_4_id"] = ""
-    period_df.loc[:, "away_player_5"] = ""
-    period_df.loc[:, "away_player_5_id"] = ""
-    # add players to the columns by looping through the dataframe and putting the
-    # players in for each row using the starting lineup list. If there is a
-    # substitution event then the player coming on replaces the player going off in
-    # the list this is done for the whole period
     if (
         period_df.game_id.unique()[0] == "0020200992"
         and period_df.period.unique()[0] == 5
     ):
         away_ids_names.append((922, "Elden Campbell"))
 
-    for i in range(period_df.shape[0]):
-        if (
-            period_df.iloc[i, :]["event_type_de"] == "substitution"
-            and pd.isnull(period_df.iloc[i, :]["visitordescription"]) == 1
-        ):
-            home_ids_names = [
-                ids
-                for ids in home_ids_names
-                if ids[0] != period_df.iloc[i, :]["player1_id"]
-            ]
-            home_ids_names.append((period_df.iloc[i, 20], period_df.iloc[i, 21]))
-            period_df.iat[i, 57] = home_ids_names[0][0]
-            period_df.iat[i, 56] = home_ids_names[0][1]
-            period_df.iat[i, 59] = home_ids_names[1][0]
-            period_df.iat[i, 58] = home_ids_names[1][1]
-            period_df.iat[i, 61] = home_ids_names[2][0]
-            period_df.iat[i, 60] = home_ids_names[2][1]
-            period_df.iat[i, 63] = home_ids_names[3][0]
-            period_df.iat[i, 62] = home_ids_names[3][1]
-            period_df.iat[i, 65] = home_ids_names[4][0]
-            period_df.iat[i, 64] = home_ids_names[4][1]
-            period_df.iat[i, 67] = away_ids_names[0][0]
-            period_df.iat[i, 66] = away_ids_names[0][1]
-            period_df.iat[i, 69] = away_ids_names[1][0]
-            period_df.iat[i, 68] = away_ids_names[1][1]
-            period_df.iat[i, 71] = away_ids_names[2][0]
-            period_df.iat[i, 70] = away_ids_names[2][1]
-            period_df.iat[i, 73] = away_ids_names[3][0]
-            period_df.iat[i, 72] = away_ids_names[3][1]
-            period_df.iat[i, 75] = away_ids_names[4][0]
-            period_df.iat[i, 74] = away_ids_names[4][1]
-        elif (
-            period_df.iloc[i, :]["event_type_de"] == "substitution"
-            and pd.isnull(period_df.iloc[i, :]["homedescription"]) == 1
-        ):
-            away_ids_names = [
-                ids
-                for ids in away_ids_names
-                if ids[0] != period_df.iloc[i, :]["player1_id"]
-            ]
-            away_ids_names.append((period_df.iloc[i, 20], period_df.iloc[i, 21]))
-            period_df.iat[i, 57] = home_ids_names[0][0]
-            period_df.iat[i, 56] = home_ids_names[0][1]
-            period_df.iat[i, 59] = home_ids_names[1][0]
-            period_df.iat[i, 58] = home_ids_names[1][1]
-            period_df.iat[i, 61] = home_ids_names[2][0]
-            period_df.iat[i, 60] = home_ids_names[2][1]
-            period_df.iat[i, 63] = home_ids_names[3][0]
-            period_df.iat[i, 62] = home_ids_names[3][1]
-            period_df.iat[i, 65] = home_ids_names[4][0]
-            period_df.iat[i, 64] = home_ids_names[4][1]
-            period_df.iat[i, 67] = away_ids_names[0][0]
-            period_df.iat[i, 66] = away_ids_names[0][1]
-            period_df.iat[i, 69] = away_ids_names[1][0]
-            period_df.iat[i, 68] = away_ids_names[1][1]
-            period_df.iat[i, 71] = away_ids_names[2][0]
-            period_df.iat[i, 70] = away_ids_names[2][1]
-            period_df.iat[i, 73] = away_ids_names[3][0]
-            period_df.iat[i, 72] = away_ids_names[3][1]
-            period_df.iat[i, 75] = away_ids_names[4][0]
-            period_df.iat[i, 74] = away_ids_names[4][1]
-        else:
-            period_df.iat[i, 57] = home_ids_names[0][0]
-            period_df.iat[i, 56] = home_ids_names[0][1]
-            period_df.iat[i, 59] = home_ids_names[1][0]
-            period_df.iat[i, 58] = home_ids_names[1][1]
-            period_df.iat[i, 61] = home_ids_names[2][0]
-            period_df.iat[i, 60] = home_ids_names[2][1]
-            period_df.iat[i, 63] = home_ids_names[3][0]
-            period_df.iat[i, 62] = home_ids_names[3][1]
-            period_df.iat[i, 65] = home_ids_names[4][0]
-            period_df.iat[i, 64] = home_ids_names[4][1]
-            period_df.iat[i, 67] = away_ids_names[0][0]
-            period_df.iat[i, 66] = away_ids_names[0][1]
-            period_df.iat[i, 69] = away_ids_names[1][0]
-            period_df.iat[i, 68] = away_ids_names[1][1]
-            period_df.iat[i, 71] = away_ids_names[2][0]
-            period_df.iat[i, 70] = away_ids_names[2][1]
-            period_df.iat[i, 73] = away_ids_names[3][0]
-            period_df.iat[i, 72] = away_ids_names[3][1]
-            period_df.iat[i, 75] = away_ids_names[4][0]
-            period_df.iat[i, 74] = away_ids_names[4][1]
+    return home_ids_names, away_ids_names
+
+
+def get_lineup(period_df, lineups, dataframe):
+    """
+    this function calculates the lineups for each team at each event and then
+    appends it to the current dataframe. This only works for one period at a
+    time
+
+    Inputs:
+    period_df         - the main game pbp dataframe subsetted to only one period
+                        in the game
+    lineups           - lineup api response dictionary
+    dataframe         - full game dataframe. This is passed to get players name from
+                        id in case the player didn't have an event in that period.
+
+    Outputs:
+    lineup_df     - period_df with each teams lineups calculate and added to the
+                    dataframe
+    """
+
+    home_ids_names, away_ids_names = get_period_starters(period_df, lineups)
+    fill_lineups(period_df, home_ids_names, away_ids_names)
 
     return period_df
 
 
-def main_scrape(game_id):
+def add_lineup_stats(game_stats, stats=None):
     """
-    this is the main function that runs and ties all them together. Doing it
-    this way so I can better write tests that work on Travis CI due to their
-    IP being blacklisted by NBA.com.
+    Inputs:
+    game_stats  - dictionary of lineup stat to the amount to add to it
+    stats       - dictionary to add them to. None adds them to
+                  LINEUP_API_STATS
+    """
+    if stats is not None:
+        for stat, count in game_stats.items():
+            stats[stat] = stats.get(stat, 0) + count
+        return
+    with LINEUP_STATS_LOCK:
+        for stat, count in game_stats.items():
+            LINEUP_API_STATS[stat] += count
+
+
+def get_lineup_api_stats():
+    """
+    Outputs:
+    stats   - dictionary of how many lineup api calls main_scrape has made and
+              how many it skipped because lineup_mode was infer. Also has how
+              many team periods get_lineup checked the starters of and how
+              many of those didn't match the play by play so the starters were
+              inferred from it instead
+    """
+    with LINEUP_STATS_LOCK:
+        return dict(LINEUP_API_STATS)
+
+
+def get_game_periods(v2_dict, game_info=None):
+    """
+    gets the number of periods played from the raw play by play response
+    without parsing it into a dataframe
 
     Inputs:
-    game_id     - NBA game id of game to be scraped
+    v2_dict     - Dictionary of the JSON response from the stats.nba.com api
+    game_info   - the game's entry in the game index. Defaults to looking it
+                  up
 
     Outputs:
-    game_df     - pandas dataframe of the play by play
+    periods     - number of periods in the game. Capped at the game index's
+                  period count for games with bad extra periods
     """
+    result_set = v2_dict["resultSets"][0]
+    period_index = result_set["headers"].index("PERIOD")
+    periods = max(row[period_index] for row in result_set["rowSet"])
+    if game_info is None:
+        game_info = GAME_INDEX.get("nba", result_set["rowSet"][0][0])
+    if "periods" in game_info:
+        periods = min(periods, game_info["periods"])
+    return periods
+
+
+def fetch_game_date(game_id, v2_dict, client=None, game_info=None):
+    """
+    looks up the date a game was played in the game index or if it isn't
+    there using any team that appears in the raw play by play response
+
+    Inputs:
+    game_id     - NBA game id of the game
+    v2_dict     - Dictionary of the JSON response from the stats.nba.com api
+    client      - NBAClient to make the api calls with
+    game_info   - the game's entry in the game index
+
+    Outputs:
+    game_date   - datetime of the day the game was played
+    """
+    if game_info is not None and "game_date" in game_info:
+        return datetime.datetime.strptime(game_info["game_date"], "%Y-%m-%d")
 
-    v2_dict = get_pbp_api(game_id)
-    game_df = scrape_pbp(v2_dict)
-    periods = []
-    if game_id == "0021500916":
-        game_df = game_df[game_df["period"] < 5]
-    for period in range(1, game_df["period"].max() + 1):
-        lineups = get_lineup_api(game_id, period)
-        periods.append(
-            get_lineup(game_df[game_df["period"] == period].copy(), lineups, game_df,)
-        )
-    game_df = pd.concat(periods).reset_index(drop=True)
     season_dict = {
         "1": "Pre+Season",
         "2": "Regular+Season",
         "3": "All+Star",
         "4": "Playoffs",
-        "5": "Regular+Season",
+        "5": "PlayIn",
     }
-    season_type = season_dict[game_df["game_id"].unique()[0][2:3]]
-    if game_df["game_id"].unique()[0][2:3] == "5":
-        game_df["game_date"] = "2020-08-15"
+    season_type = season_dict[game_id[2:3]]
+    if game_id[3:5] == "99":
+        season = "1999-00"
     else:
-        if game_df["game_id"].unique()[0][3:5] == "99":
-            season = "1999-00"
-        else:
-            season = f"20{game_df['game_id'].unique()[0][3:5]}-{int(game_df['game_id'].unique()[0][3:5]) + 1}"
-        date_url = (
-            f"https://stats.nba.com/stats/teamgamelog?DateFrom=&DateTo=&LeagueID=&"
-            f"Season={season}"
-            f"&SeasonType={season_type}&TeamID={game_df['home_team_id'].unique()[0]}"
+        season = f"20{game_id[3:5]}-{int(game_id[3:5]) + 1}"
+
+    result_set = v2_dict["resultSets"][0]
+    team_index = result_set["headers"].index("PLAYER1_TEAM_ID")
+    team_id = next(row[team_index] for row in result_set["rowSet"] if row[team_index])
+
+    if season_type != "PlayIn":
+        return get_game_date(game_id, season, season_type, int(team_id), client=client)
+
+    # the 2019-20 bubble play in games aren't in the PlayIn team game logs so
+    # they fall back on the Playoffs logs and then on the day they were played
+    for play_in_type in ["PlayIn", "Playoffs"]:
+        try:
+            return get_game_date(
+                game_id, season, play_in_type, int(team_id), client=client
+            )
+        except KeyError:
+            continue
+    if season == "2019-20":
+        return datetime.datetime(2020, 8, 15)
+    raise KeyError(f"Couldn't find the date of play in game {game_id}")
+
+
+def check_nba_columns(columns):
+    """
+    raises a ValueError if any of the columns can't be scraped from an NBA
+    game
+
+    Inputs:
+    columns     - list of the columns asked for or None for every column
+    """
+    if columns is not None:
+        check_columns(
+            columns, list(PBP_V2_DTYPES) + PBP_DERIVED_COLUMNS + ALL_LINEUP_COLUMNS
         )
-        dates = requests.get(date_url, headers=USER_AGENT)
-        dates_dict = json.loads(dates.text)
-        schedule = dates_dict["resultSets"][0]["rowSet"]
-        game_date = [g[2] for g in schedule if g[1] == game_df["game_id"].unique()[0]]
-        formatted_date = datetime.datetime.strptime(game_date[0], "%b %d, %Y")
-        game_df["game_date"] = formatted_date
 
+
+def check_empty_pbp(game_id, v2_dict, game_info):
+    """
+    raises a ValueError if a game's play by play is empty. Games the game
+    index says were played before yesterday are added to the missing games
+    catalog so they aren't requested again. Games without a date or that
+    haven't been played yet aren't since their data may still come
+
+    Inputs:
+    game_id     - NBA game id of the game
+    v2_dict     - dictionary of the playbyplayv2 api response
+    game_info   - the game's entry in the game index
+    """
+    if v2_dict["resultSets"][0]["rowSet"]:
+        return
+
+    if "game_date" in game_info:
+        game_date = datetime.datetime.strptime(game_info["game_date"], "%Y-%m-%d")
+        if game_date.date() < datetime.date.today() - datetime.timedelta(days=1):
+            mark_missing_game(game_id, "the play by play api has no events")
+    raise ValueError(f"The stats.nba.com API has no play by play for game {game_id}")
+
+
+def fetch_game(game_id, client=None, lineup_mode="api", columns=None):
+    """
+    downloads every api response needed to scrape a game. Only the api calls
+    are made here so they go through the caller's client and rate limiter
+    and the play by play is parsed once in parse_game
+
+    Inputs:
+    game_id     - NBA game id of game to be scraped
+    client      - NBAClient to make the api calls with
+    lineup_mode - api downloads every period's starters from the lineup api.
+                  infer works them out from the play by play and only calls
+                  the api for periods where they can't be worked out
+    columns     - list of the columns that will be parsed. The lineup api
+                  isn't called if no lineup columns are in it and the game
+                  date isn't looked up if game_date isn't. None is every
+                  column
+
+    Outputs:
+    raw_game    - dictionary of the game id, the play by play response, a
+                  dictionary of period to the lineup api response, the game
+                  date and the game's entry in the game index
+    """
+    v2_dict = get_pbp_api(game_id, client=client)
+    game_info = get_game_info(game_id, client=client)
+    check_empty_pbp(game_id, v2_dict, game_info)
+    lineups = {}
+    if needs_lineups(columns) and lineup_mode != "infer":
+        for period in range(1, get_game_periods(v2_dict, game_info) + 1):
+            lineups[period] = get_lineup_api(game_id, period, client=client)
+            add_lineup_stats({"called": 1})
+
+    game_date = ""
+    if columns is None or "game_date" in columns:
+        game_date = fetch_game_date(game_id, v2_dict, client, game_info)
+
+    return {
+        "game_id": game_id,
+        "v2_dict": v2_dict,
+        "lineups": lineups,
+        "game_date": game_date,
+        "game_info": game_info,
+    }
+
+
+def get_game_frame(v2_dict, game_info, columns=None):
+    """
+    Inputs:
+    v2_dict     - dictionary of the playbyplayv2 api response
+    game_info   - dictionary of the game's entry in the game index
+    columns     - list of the play by play columns to parse. None is every
+                  column
+
+    Outputs:
+    game_df     - play by play dataframe of the game's periods in the game
+                  index sorted by period
+    """
+    game_df = scrape_pbp(v2_dict, game_info, columns)
+    if "periods" in game_info:
+        game_df = game_df[game_df["period"] <= game_info["periods"]]
+    if not game_df["period"].is_monotonic_increasing:
+        game_df = game_df.sort_values("period", kind="stable")
+    return game_df
+
+
+def parse_game(
+    raw_game, client=None, lineup_mode="api", columns=None, return_stats=False
+):
+    """
+    turns the api responses downloaded by fetch_game into the play by play
+    dataframe and works out the starters of each period
+
+    Inputs:
+    raw_game    - dictionary returned by fetch_game
+    client      - NBAClient to make any missing lineup api calls with
+    lineup_mode - api uses the downloaded lineups. infer works each period's
+                  starters out from the play by play and only calls the api
+                  for periods where five starters can't be found for each
+                  team
+    columns     - list of the columns to return in that order. Only these
+                  and the columns they are calculated from are worked out.
+                  None returns every column
+    return_stats - return the game's lineup api and starter counts with the
+                   dataframe instead of adding them to LINEUP_API_STATS so a
+                   parent process can add them with finish_parsed_game
+
+    Outputs:
+    game_df     - pandas dataframe of the play by play. A tuple of it and the
+                  dictionary of lineup stats if return_stats is True
+    """
+    stats = {stat: 0 for stat in LINEUP_API_STATS}
+    game_info = raw_game.get("game_info")
+    if game_info is None:
+        game_info = GAME_INDEX.get("nba", raw_game["game_id"])
+    lineups_needed = needs_lineups(columns)
+    pbp_columns = None
+    if columns is not None:
+        pbp_columns = [column for column in columns if column not in ALL_LINEUP_COLUMNS]
+        extra_columns = ["period"] + (LINEUP_DEPENDENCIES if lineups_needed else [])
+        pbp_columns += [column for column in extra_columns if column not in pbp_columns]
+    game_df = get_game_frame(raw_game["v2_dict"], game_info, pbp_columns)
+
+    game_columns = {column: game_df[column].values for column in game_df.columns}
+    if "game_date" in game_columns:
+        game_columns["game_date"] = raw_game["game_date"]
+    if lineups_needed:
+        starters = get_game_starters(
+            game_df, raw_game.get("lineups", {}), client, lineup_mode, stats
+        )
+        lineup_ids, lineup_names = get_game_lineups(game_df, starters)
+        for column, name in enumerate(LINEUP_COLUMNS):
+            game_columns[name] = lineup_names[:, column]
+            game_columns[f"{name}_id"] = lineup_ids[:, column]
+
+    if columns is not None:
+        game_columns = {column: game_columns[column] for column in columns}
+    game_df = pd.DataFrame(game_columns, index=pd.RangeIndex(game_df.shape[0]))
+    if return_stats:
+        return game_df, stats
+    add_lineup_stats(stats)
+    return game_df
+
+
+def finish_parsed_game(parsed_game):
+    """
+    adds the lineup stats returned by parse_game with return_stats to
+    LINEUP_API_STATS in the process that collects the games
+
+    Inputs:
+    parsed_game - tuple of the play by play dataframe and lineup stats
+
+    Outputs:
+    game_df     - pandas dataframe of the play by play
+    """
+    game_df, stats = parsed_game
+    add_lineup_stats(stats)
     return game_df
+
+
+def get_period_bounds(game_df):
+    """
+    Inputs:
+    game_df         - play by play dataframe of the game sorted by period
+
+    Outputs:
+    period_bounds   - iterator of (period, start, end) of the rows of each
+                      period
+    """
+    period_bounds = np.searchsorted(
+        game_df["period"].values, np.arange(1, game_df["period"].max() + 2)
+    )
+    return zip(range(1, len(period_bounds)), period_bounds[:-1], period_bounds[1:])
+
+
+def get_game_starters(
+    game_df, game_lineups, client=None, lineup_mode="api", stats=None
+):
+    """
+    finds the players who started each period of a game
+
+    Inputs:
+    game_df         - play by play dataframe of the game sorted by period with
+                      at least the LINEUP_DEPENDENCIES columns
+    game_lineups    - dictionary of period to the lineup api responses that
+                      were already downloaded
+    client          - NBAClient to make any missing lineup api calls with
+    lineup_mode     - api calls the lineup api for any period that wasn't
+                      downloaded. infer works the starters out from the play
+                      by play first
+    stats           - dictionary to count the lineup api calls and starters
+                      in. None counts them in LINEUP_API_STATS
+
+    Outputs:
+    starters        - dictionary of period to a tuple of the home and away
+                      lists of (id, name) tuples of the period's starters
+    """
+    game_id = game_df["game_id"].iloc[0]
+    starters = {}
+    for period, start, end in get_period_bounds(game_df):
+        period_df = game_df.iloc[start:end]
+        lineups = game_lineups.get(period)
+        if lineups is None:
+            if lineup_mode == "infer":
+                lineups = infer_lineups(period_df)
+            add_lineup_stats({"called" if lineups is None else "skipped": 1}, stats)
+        if lineups is None:
+            lineups = get_lineup_api(game_id, period, client=client)
+
+        starters[period] = get_period_starters(period_df, lineups, stats)
+
+    return starters
+
+
+def get_game_lineups(game_df, starters):
+    """
+    works out the players on the court at every event of a game. Each
+    period's lineups are written into its slice of arrays covering the whole
+    game so the periods never have to be copied out or put back together
+
+    Inputs:
+    game_df         - play by play dataframe of the game sorted by period
+    starters        - dictionary of period to the home and away starters from
+                      get_game_starters
+
+    Outputs:
+    lineup_ids      - array of the ids of the home players then the away
+                      players on the court at each event
+    lineup_names    - array of the names of the same players
+    """
+    lineup_ids = np.empty((game_df.shape[0], 10), dtype=object)
+    lineup_names = np.empty((game_df.shape[0], 10), dtype=object)
+    for period, start, end in get_period_bounds(game_df):
+        home_ids_names, away_ids_names = starters[period]
+        lineup_arrays(
+            game_df.iloc[start:end],
+            home_ids_names,
+            away_ids_names,
+            lineup_ids[start:end],
+            lineup_names[start:end],
+        )
+
+    return lineup_ids, lineup_names
+
+
+def main_scrape(game_id, client=None, lineup_mode="api", columns=None):
+    """
+    this is the main function that runs and ties all them together. Doing it
+    this way so I can better write tests that work on Travis CI due to their
+    IP being blacklisted by NBA.com.
+
+    Inputs:
+    game_id     - NBA game id of game to be scraped
+    client      - NBAClient to make the api calls with
+    lineup_mode - api pulls each period's starters from the lineup api. infer
+                  works them out from the play by play and only calls the
+                  api for periods where five starters can't be found for
+                  each team
+    columns     - list of the columns to return in that order. None returns
+                  every column. The lineup api is only called if lineup
+                  columns are asked for
+
+    Outputs:
+    game_df     - pandas dataframe of the play by play
+    """
+    raw_game = fetch_game(
+        game_id, client=client, lineup_mode=lineup_mode, columns=columns
+    )
+
+    return parse_game(raw_game, client=client, lineup_mode=lineup_mode, columns=columns)
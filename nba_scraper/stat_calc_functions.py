@@ -2,7 +2,9 @@
 These are the functions to calculate various statistics or to pull out/parse certain data types from the play by play. They have nothing to do with the functionality of actually scraping the
 data.
 """
+import re
 import numpy as np
+import pandas as pd
 
 
 foul_dict = {
@@ -297,6 +299,7 @@ def wnba_parse_foul(row):
     except KeyError:
         return np.nan
 
+
 def parse_foul(row):
     """
     function to determine what type of foul is being commited by the player
@@ -455,3 +458,320 @@ def calc_points_made(row):
         return 1
     else:
         return 0
+
+
+# The functions below are array versions of the row functions above. They
+# take whole columns, of one game or a season of games, and return the same
+# values the row functions would in a series with the same index
+
+
+def build_lookup_table(mapping):
+    """
+    Inputs:
+    mapping     - dictionary of non negative integer codes to values
+
+    Outputs:
+    table       - numpy object array where the value of each code is at its
+                  code's position and every other position is NaN
+    """
+    table = np.full(max(mapping) + 1, np.nan, dtype=object)
+    for code, value in mapping.items():
+        table[code] = value
+    return table
+
+
+# bit flags of the words the play by play columns are calculated from. Each
+# description is scanned once for all of them instead of once per word
+DESCRIPTION_TOKENS = {
+    "Turnover": 1,
+    "MISS": 2,
+    "BLOCK": 4,
+    "3PT": 8,
+    "STEAL": 16,
+    "Missed": 32,
+    "3pt": 64,
+    "BLK": 128,
+    "Steal": 256,
+}
+# descriptions that are None and descriptions that are NaN are flagged
+# separately as str.contains gives None for the first and NaN for the second
+# and np.where treats NaN as true
+NONE_DESCRIPTION = 512
+NAN_DESCRIPTION = 1024
+MISSING_DESCRIPTION = NONE_DESCRIPTION | NAN_DESCRIPTION
+# the lookahead finds every token even where two of them overlap the same as
+# scanning for each one separately would
+TOKEN_PATTERN = re.compile(f"(?=({'|'.join(map(re.escape, DESCRIPTION_TOKENS))}))")
+
+
+def tokenize_descriptions(descriptions):
+    """
+    Inputs:
+    descriptions - array like of play by play descriptions
+
+    Outputs:
+    flags       - numpy array of the DESCRIPTION_TOKENS bits of the words in
+                  each description or the missing bit if it has none
+    """
+    flags = []
+    for description in descriptions:
+        if isinstance(description, str):
+            description_flags = 0
+            for token in TOKEN_PATTERN.findall(description):
+                description_flags |= DESCRIPTION_TOKENS[token]
+            flags.append(description_flags)
+        elif description is None:
+            flags.append(NONE_DESCRIPTION)
+        elif pd.isnull(description):
+            flags.append(NAN_DESCRIPTION)
+        else:
+            flags.append(0)
+    return np.array(flags, dtype=np.uint16)
+
+
+def has_token(flags, token):
+    """
+    Inputs:
+    flags       - array of description flags from tokenize_descriptions
+    token       - word in DESCRIPTION_TOKENS
+
+    Outputs:
+    has_token   - boolean array of whether each description has the word
+    """
+    return (flags & DESCRIPTION_TOKENS[token]) != 0
+
+
+def is_missing(flags):
+    """
+    Inputs:
+    flags       - array of description flags from tokenize_descriptions
+
+    Outputs:
+    is_missing  - boolean array of whether each description is missing
+    """
+    return (flags & MISSING_DESCRIPTION) != 0
+
+
+FOUL_TABLE = build_lookup_table(foul_dict)
+SHOT_TABLES = {
+    event_type: build_lookup_table(shots) for event_type, shots in SHOT_DICT.items()
+}
+
+
+def lookup_codes(table, codes):
+    """
+    Inputs:
+    table       - lookup table built with build_lookup_table
+    codes       - array like of integer codes
+
+    Outputs:
+    values      - numpy object array of each code's value in the table. Codes
+                  that aren't in the table are NaN
+    """
+    codes = pd.to_numeric(pd.Series(codes), errors="coerce").to_numpy(dtype=float)
+    valid = np.isfinite(codes) & (codes >= 0) & (codes < len(table)) & (codes % 1 == 0)
+    values = np.full(len(codes), np.nan, dtype=object)
+    values[valid] = table[codes[valid].astype(int)]
+    return values
+
+
+def to_series(values, index):
+    """
+    Inputs:
+    values      - numpy array of calculated values
+    index       - index of the columns the values were calculated from
+
+    Outputs:
+    series      - series of the values with the dtype pandas would infer for
+                  them the same as DataFrame.apply does
+    """
+    return pd.Series(values, index=index).infer_objects()
+
+
+def replace_codes(codes, mapping):
+    """
+    replaces each code with its value in mapping leaving codes that aren't in
+    it unchanged the same as DataFrame.replace
+
+    Inputs:
+    codes       - series of integer codes
+    mapping     - dictionary of codes to values
+
+    Outputs:
+    values      - series of the replaced codes
+    """
+    values = lookup_codes(build_lookup_table(mapping), codes)
+    unmapped = pd.isna(values)
+    values[unmapped] = codes.to_numpy(dtype=object)[unmapped]
+    return to_series(values, codes.index)
+
+
+def made_shot_array(event_types, missed):
+    """
+    array version of made_shot and wnba_made_shot
+
+    Inputs:
+    event_types - series of the event message types
+    missed      - boolean array of whether a description says the shot was
+                  missed
+
+    Outputs:
+    shot_made   - series of 1 for made shots, 0 for misses and NaN for events
+                  that aren't shots
+    """
+    codes = event_types.to_numpy()
+    shot_made = np.select(
+        [codes == 1, codes == 2, (codes == 3) & missed, codes == 3],
+        [1, 0, 0, 1],
+        default=np.nan,
+    )
+    return pd.Series(shot_made, index=event_types.index)
+
+
+def shot_type_array(event_types, action_types):
+    """
+    array version of parse_shot_types and wnba_shot_types
+
+    Inputs:
+    event_types - series of the event message types
+    action_types - series of the event message action types
+
+    Outputs:
+    shot_type   - series of the shot types with NaN for events that aren't
+                  shots
+    """
+    shot_types = np.full(len(event_types), np.nan, dtype=object)
+    for event_type, table in SHOT_TABLES.items():
+        is_type = (event_types == event_type).to_numpy()
+        shot_types[is_type] = lookup_codes(table, action_types[is_type])
+    return to_series(shot_types, event_types.index)
+
+
+def foul_type_array(event_types, action_types):
+    """
+    array version of parse_foul and wnba_parse_foul
+
+    Inputs:
+    event_types - series of the event message types
+    action_types - series of the event message action types
+
+    Outputs:
+    foul_type   - series of the foul types with NaN for events that aren't
+                  fouls
+    """
+    foul_types = np.full(len(event_types), np.nan, dtype=object)
+    is_foul = (event_types == 6).to_numpy()
+    foul_types[is_foul] = lookup_codes(FOUL_TABLE, action_types[is_foul])
+    return to_series(foul_types, event_types.index)
+
+
+def parse_clock(clock, seconds_type=int):
+    """
+    Inputs:
+    clock       - series of game clock strings like 11:43
+    seconds_type - int or float depending on whether the clock has tenths
+
+    Outputs:
+    clock_seconds - numpy array of the seconds left in the period
+    """
+    clock_parts = clock.str.strip().str.split(":", expand=True)
+    minutes = clock_parts[0].astype(int).to_numpy()
+    seconds = clock_parts[1].astype(seconds_type).to_numpy()
+    return minutes * 60 + seconds
+
+
+def seconds_elapsed_array(clock, periods, max_time=720, seconds_type=int):
+    """
+    array version of create_seconds_elapsed and wnba_seconds_elapsed
+
+    Inputs:
+    clock       - series of game clock strings
+    periods     - series of the periods of each event
+    max_time    - length of a regulation period in seconds. wnba_seconds_elapsed
+                  uses 600
+    seconds_type - int for the nba clock and float for the wnba clock
+
+    Outputs:
+    seconds_elapsed - series of the game seconds elapsed at each event
+    """
+    clock_seconds = parse_clock(clock, seconds_type)
+    periods = periods.to_numpy().astype(int)
+    seconds_elapsed = np.where(
+        periods <= 4,
+        (max_time - clock_seconds) + 720 * (periods - 1),
+        (300 - clock_seconds) + 300 * (periods - 5) + 2880,
+    )
+    return pd.Series(seconds_elapsed, index=clock.index)
+
+
+def points_made_array(is_three, shot_made, event_types):
+    """
+    array version of calc_points_made and wnba_points_made
+
+    Inputs:
+    is_three    - series of whether each shot was a three
+    shot_made   - series of whether each shot was made
+    event_types - series of the event message types
+
+    Outputs:
+    points_made - series of the points scored on each event
+    """
+    made = (shot_made == 1).to_numpy()
+    is_three = is_three.to_numpy()
+    free_throw = (event_types == 3).to_numpy()
+    points_made = np.select(
+        [
+            (is_three == 1) & made,
+            (is_three == 0) & made & ~free_throw,
+            free_throw & made,
+        ],
+        [3, 2, 1],
+        default=0,
+    )
+    return pd.Series(points_made, index=event_types.index)
+
+
+def event_length_array(seconds_elapsed):
+    """
+    Inputs:
+    seconds_elapsed - array of the seconds elapsed in the game at each event
+
+    Outputs:
+    event_length    - float array of the seconds since the event before. The
+                      first event is NaN
+    """
+    seconds_elapsed = np.asarray(seconds_elapsed)
+    event_length = np.empty(len(seconds_elapsed))
+    event_length[0:1] = np.nan
+    np.subtract(seconds_elapsed[1:], seconds_elapsed[:-1], out=event_length[1:])
+    return event_length
+
+
+def same_as_previous(values):
+    """
+    Inputs:
+    values      - array of a column's values
+
+    Outputs:
+    same        - bool array of whether each value equals the one before it.
+                  The first value has nothing before it so it is False
+    """
+    values = np.asarray(values)
+    same = np.zeros(len(values), dtype=bool)
+    same[1:] = values[1:] == values[:-1]
+    return same
+
+
+def putback_array(is_o_rebound, event_length):
+    """
+    Inputs:
+    is_o_rebound - array of whether each event is an offensive rebound
+    event_length - array of the length of each event in seconds
+
+    Outputs:
+    is_putback  - int array of whether each event came within three seconds
+                  of an offensive rebound
+    """
+    after_o_rebound = np.zeros(len(is_o_rebound), dtype=bool)
+    after_o_rebound[1:] = np.asarray(is_o_rebound)[:-1] == 1
+    return np.where(after_o_rebound & (np.asarray(event_length) <= 3), 1, 0)
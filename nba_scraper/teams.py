@@ -0,0 +1,121 @@
+"""
+This file contains the team registry the WNBA scraper uses to match team ids
+to team abbreviations. NBA games get their teams from the game index so they
+don't need it. Teams are stored per league and season since franchises
+change their abbreviations when they move or rebrand.
+"""
+import threading
+
+from nba_scraper.client import USER_AGENT
+from nba_scraper.helper_functions import get_json
+
+SCHEDULE_URLS = {
+    "wnba": (
+        "https://data.wnba.com/data/5s/v2015/json/mobile_teams"
+        "/wnba/{season}/league/10_full_schedule.json"
+    ),
+}
+SCHEDULE_ENDPOINTS = {"wnba": "wnba_full_schedule"}
+TEAM_DETAILS_URLS = {
+    "wnba": "https://stats.wnba.com/stats/teamdetails?TeamID={team_id}",
+}
+
+
+class TeamRegistry:
+    """
+    Thread safe registry of team id to team abbreviation for each league and
+    season. It can be filled in bulk from a season's schedule or lazily one
+    team at a time
+    """
+
+    def __init__(self):
+        # (league, season) -> {team_id: abbreviation}
+        self.teams = {}
+        self.loaded_seasons = set()
+        self.lock = threading.Lock()
+
+    def add(self, league, season, team_id, abbrev):
+        """
+        Inputs:
+        league      - either nba or wnba
+        season      - season in the format of YYYY
+        team_id     - id of the team
+        abbrev      - abbreviation of the team that season
+        """
+        with self.lock:
+            self.teams.setdefault((league, int(season)), {})[int(team_id)] = abbrev
+
+    def get_abbrev(self, league, season, team_id):
+        """
+        Inputs:
+        league      - either nba or wnba
+        season      - season in the format of YYYY
+        team_id     - id of the team
+
+        Outputs:
+        abbrev      - abbreviation of the team or None if it isn't registered
+        """
+        with self.lock:
+            return self.teams.get((league, int(season)), {}).get(int(team_id))
+
+    def load_season(self, league, season, client=None):
+        """
+        registers every team in the season's schedule with one api call. Does
+        nothing if the season has already been loaded
+
+        Inputs:
+        league      - wnba, the only league in SCHEDULE_URLS
+        season      - season in the format of YYYY
+        client      - NBAClient to make the api call with
+        """
+        with self.lock:
+            if (league, int(season)) in self.loaded_seasons:
+                return
+            self.loaded_seasons.add((league, int(season)))
+
+        try:
+            schedule = get_json(
+                SCHEDULE_ENDPOINTS[league],
+                {"season": int(season)},
+                SCHEDULE_URLS[league].format(season=season),
+                client=client,
+            )
+            games = [g for month in schedule["lscd"] for g in month["mscd"]["g"]]
+        except (ValueError, KeyError, TypeError, OSError) as ex:
+            print(f"Couldn't load the {season} {league} schedule teams: {ex}")
+            return
+
+        for game in games:
+            for side in ["h", "v"]:
+                self.add(league, season, game[side]["tid"], game[side]["ta"])
+
+    def lookup_team(self, league, season, team_id, client=None):
+        """
+        gets a team's abbreviation registering it from the team details api
+        if it isn't registered yet
+
+        Inputs:
+        league      - wnba, the only league in TEAM_DETAILS_URLS
+        season      - season in the format of YYYY
+        team_id     - id of the team
+        client      - NBAClient to make the api call with
+
+        Outputs:
+        abbrev      - abbreviation of the team
+        """
+        abbrev = self.get_abbrev(league, season, team_id)
+        if abbrev is None:
+            team_data = get_json(
+                f"{league}_teamdetails",
+                {"TeamID": int(team_id)},
+                TEAM_DETAILS_URLS[league].format(team_id=int(team_id)),
+                headers=USER_AGENT,
+                client=client,
+            )
+            abbrev = team_data["resultSets"][0]["rowSet"][0][2]
+            self.add(league, season, team_id, abbrev)
+        return abbrev
+
+
+# the registry both scrapers use
+TEAM_REGISTRY = TeamRegistry()
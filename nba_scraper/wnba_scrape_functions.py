@@ -6,78 +6,84 @@ email: matt@barloweanalytics.com
 
 This file contains the main functions to scrape and compile the WNBA api
 """
-import sys
-import json
-import datetime
-import requests
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
+import requests
 
-from nba_scraper.helper_functions import EVENT_TYPE_DICT, get_season
+from nba_scraper.cache import get_cache
+from nba_scraper.client import USER_AGENT
+from nba_scraper.column_graph import (
+    check_columns,
+    compute_columns,
+    needs_lineups,
+    resolve_columns,
+)
+from nba_scraper.helper_functions import (
+    EVENT_TYPE_DICT,
+    get_json,
+    has_lineup_rows,
+)
+from nba_scraper.player_directory import PLAYER_DIRECTORY
+from nba_scraper.teams import TEAM_REGISTRY
 from nba_scraper.stat_calc_functions import (
-    wnba_made_shot,
-    wnba_parse_foul,
-    wnba_shot_types,
-    wnba_seconds_elapsed,
-    wnba_points_made,
+    made_shot_array,
+    foul_type_array,
+    shot_type_array,
+    seconds_elapsed_array,
+    points_made_array,
+    replace_codes,
+    tokenize_descriptions,
+    has_token,
+    NAN_DESCRIPTION,
+    event_length_array,
+    same_as_previous,
+    putback_array,
 )
 
-USER_AGENT = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:72.0) Gecko/20100101 Firefox/72.0",
-    "Accept": "application/json, text/plain, */*",
-    "Accept-Language": "en-US,en;q=0.5",
-    "X-NewRelic-ID": "VQECWF5UChAHUlNTBwgBVw==",
-    "x-nba-stats-origin": "stats",
-    "x-nba-stats-token": "true",
-    "Connection": "keep-alive",
-    "Referer": "https://stats.nba.com/",
-}
+# game id -> number of periods played for games whose pbp has been pulled
+PERIOD_COUNTS = {}
+PERIOD_COUNT_LOCK = threading.Lock()
+# every game has at least the four quarters so fewer periods is never stored
+MIN_PERIODS = 4
 
 
-def get_player_name(player_id):
+def get_player_name(player_id, client=None):
     """
-    function to get the players name givn a player id
+    function to get the players name givn a player id. Names are looked up in
+    the player directory first and only pulled from the api if they're missing
 
     Inputs:
     player_id   - id of player you want the name of
+    client      - NBAClient to make the api call with
 
     Ouputs:
     player_name - full name of player with given player_id
     """
-    player_url = f"https://a.data.nba.com/wnba/player/{player_id}"
-    player_data = requests.get(player_url, headers=USER_AGENT)
-    player_dict = json.loads(player_data.text)
-    player_name = (
-        f"{player_dict['data']['info']['fn']} {player_dict['data']['info']['ln']}"
-    )
+    return PLAYER_DIRECTORY.get_name(player_id, client=client)
 
-    return player_name
 
-
-def get_team_ids(pbp_df):
+def get_team_ids(pbp_df, client=None):
     """
-    this function gets the home and away team ids
+    this function gets the home and away team ids by matching the team ids in
+    the play by play against the home team's abbreviation in the team registry
 
     Inputs:
     pbp_df    - dataframe of the games play by play
+    client    - NBAClient to make the api calls with
 
     Outputs:
     home_team_id   - team id of the home team
     away_team_id   - team id of the away team
     """
 
-    team_ids = pbp_df["tid"].unique()
-    print(team_ids)
-    team_ids = [t for t in team_ids if t > 0]
-    team_url = f"https://stats.wnba.com/stats/teamdetails?TeamID={team_ids[0]}"
-    team_data = requests.get(team_url, headers=USER_AGENT)
-    team_data = json.loads(team_data.text)
-    print(team_data)
-
-    if (
-        pbp_df["home_team_abbrev"].unique()[0]
-        == team_data["resultSets"][0]["rowSet"][0][2]
+    team_ids = [t for t in pbp_df["tid"].unique() if t > 0]
+    season = get_wnba_season(pbp_df["game_id"].unique()[0])
+    TEAM_REGISTRY.load_season("wnba", season, client=client)
+
+    if pbp_df["home_team_abbrev"].unique()[0] == TEAM_REGISTRY.lookup_team(
+        "wnba", season, team_ids[0], client=client
     ):
         home_team_id, away_team_id = team_ids[0], team_ids[1]
     else:
@@ -86,7 +92,19 @@ def get_team_ids(pbp_df):
     return home_team_id, away_team_id
 
 
-def get_wnba_pbp_api(game_id, quarter, season):
+def is_final_period(wnba_dict):
+    """
+    Inputs:
+    wnba_dict   - dictionary of a period's data.wnba.com pbp response
+
+    Outputs:
+    is_final    - True if the period's last event is the end of the period
+    """
+    events = wnba_dict["g"]["pla"]
+    return len(events) > 0 and events[-1]["etype"] == 13
+
+
+def get_wnba_pbp_api(game_id, quarter, season, client=None):
     """
     function gets both JSON requests from the two different APIs if both
     are available and only the stats.nba.com api if not.
@@ -95,119 +113,316 @@ def get_wnba_pbp_api(game_id, quarter, season):
     game_id          - String representing game id
     quarter          - number representing what quarter you want
     season           - number in the format of YYYY representing what the season is
+    client           - NBAClient to make the api call with
 
     Outputs:
     wnba_dict         - Dictionary of the JSON response from data.wnba.com api
     """
     wnba_api_url = f"https://data.wnba.com/data/5s/v2015/json/mobile_teams/wnba/{season}/scores/pbp/1{game_id}_{quarter}_pbp.json"
 
-    try:
-        wnba_rep = requests.get(wnba_api_url)
-    except json.decoder.JSONDecodeError as ex:
-        print(ex)
-        print(f"This is the stats.nba.com API's output: {wnba_rep.text}")
-        sys.exit()
-
-    wnba_dict = wnba_rep.json()
+    params = {"game_id": game_id, "quarter": quarter, "season": season}
+    wnba_dict = get_json(
+        "wnba_pbp", params, wnba_api_url, client=client, is_final=is_final_period
+    )
 
     return wnba_dict
 
 
-def parse_wnba_pbp(game_id):
+def get_wnba_season(game_id):
     """
-    function to parse the JSON output of the api into a dataframe
-
     Inputs:
-    game_id     - Id of game to be parsed
-    season      - seaosn game is being played in
+    game_id     - WNBA game id
 
     Outputs:
-    wnba_pbp_df   - wnba play by play dataframe
+    season      - season the game was played in in the format of YYYY
     """
-
     if game_id[2:4] in ["98", "99"]:
-        season = f"19{game_id[2:4]}"
-    else:
-        season = f"20{game_id[2:4]}"
-    results = []
-    for x in range(1, 15):
-        try:
-            results.append(get_wnba_pbp_api(game_id, x, season))
-        except ValueError:
-            break
-    dfs = []
-    for period, v2_dict in enumerate(results):
-        pbp_v2_df = pd.DataFrame(v2_dict["g"]["pla"])
-        pbp_v2_df.columns = list(map(str.lower, pbp_v2_df.columns))
-        pbp_v2_df["period"] = period + 1
-        dfs.append(pbp_v2_df)
+        return f"19{game_id[2:4]}"
+    return f"20{game_id[2:4]}"
 
-    pbp_df = pd.concat(dfs)
 
-    pbp_df["game_date"] = results[0]["g"]["gcode"].split("/")[0]
-    pbp_df["game_date"] = pd.to_datetime(pbp_df["game_date"], format="%Y%m%d")
-    pbp_df["away_team_abbrev"] = results[0]["g"]["gcode"].split("/")[1][:3]
-    pbp_df["home_team_abbrev"] = results[0]["g"]["gcode"].split("/")[1][3:]
-    pbp_df["seconds_elapsed"] = pbp_df.apply(wnba_seconds_elapsed, axis=1)
-    pbp_df["shot_type"] = pbp_df.apply(wnba_shot_types, axis=1)
-    pbp_df["game_id"] = game_id
+def is_missing_period(ex):
+    """
+    Inputs:
+    ex          - exception raised by get_wnba_pbp_api
 
-    # create column whether shot was succesful or not
-    pbp_df["shot_made"] = pbp_df.apply(wnba_made_shot, axis=1)
+    Outputs:
+    is_missing  - True if the error is how the api answers for a period that
+                  doesn't exist. That is a 403 or 404 or a response that
+                  isn't JSON. Any other error, like a timeout, is False
+    """
+    if isinstance(ex, requests.HTTPError):
+        return ex.response is not None and ex.response.status_code in (403, 404)
+    return isinstance(ex, ValueError)
 
-    # calculate event length of each event in seconds
-    pbp_df["event_length"] = pbp_df["seconds_elapsed"] - pbp_df[
-        "seconds_elapsed"
-    ].shift(1)
 
-    # determine whether shot was a three pointer
-    pbp_df["is_three"] = np.where(pbp_df["de"].str.contains("3pt").fillna(False), 1, 0,)
+def get_wnba_periods(game_id, season, client=None, ot_probes=2):
+    """
+    function gets the pbp api response of every period in the game. The four
+    quarters are pulled at the same time along with a few overtime periods in
+    case the game went to overtime. Overtime requests that turn out not to be
+    needed are cancelled and the number of periods is stored so rescraping the
+    game doesn't have to probe for overtimes again. Only an overtime the api
+    says doesn't exist ends the game. Any other error, or any error in the
+    four quarters, is raised so a failed request can't cut the game short
 
-    pbp_df["event_type_de"] = pbp_df[["etype"]].replace({"etype": EVENT_TYPE_DICT})
+    Inputs:
+    game_id     - String representing game id
+    season      - number in the format of YYYY representing what the season is
+    client      - NBAClient to make the api calls with
+    ot_probes   - number of periods past the last one found to request ahead
+                  of time
 
-    # create a column that says whether the shot was blocked or not
-    pbp_df["is_block"] = np.where(pbp_df["de"].str.contains("BLK"), 1, 0,)
+    Outputs:
+    results     - list of the pbp api responses for each period in order
+    """
+    cache = get_cache()
+    with PERIOD_COUNT_LOCK:
+        period_count = PERIOD_COUNTS.get(game_id)
+    if period_count is None and cache is not None:
+        period_count = cache.get("wnba_period_count", {"game_id": game_id})
+
+    if period_count is not None and period_count >= MIN_PERIODS:
+        with ThreadPoolExecutor(max_workers=period_count) as executor:
+            return list(
+                executor.map(
+                    lambda x: get_wnba_pbp_api(game_id, x, season, client=client),
+                    range(1, period_count + 1),
+                )
+            )
 
-    # determine points earned
-    pbp_df["points_made"] = pbp_df.apply(wnba_points_made, axis=1)
+    executor = ThreadPoolExecutor(max_workers=4 + ot_probes)
+    futures = {}
+    last_requested = min(14, 4 + ot_probes)
+    for x in range(1, last_requested + 1):
+        futures[x] = executor.submit(get_wnba_pbp_api, game_id, x, season, client)
 
-    # create columns that determine if rebound is offenseive or deffensive
-    pbp_df["is_o_rebound"] = np.where(
-        (pbp_df["event_type_de"] == "rebound")
-        & (pbp_df["tid"] == pbp_df["tid"].shift(1))
-        & (pbp_df["pid"] != 0),
-        1,
-        0,
+    results = []
+    try:
+        for x in range(1, 15):
+            try:
+                results.append(futures[x].result())
+            except (requests.HTTPError, ValueError) as ex:
+                if not is_missing_period(ex) or x <= MIN_PERIODS:
+                    raise
+                break
+            # keep ot_probes requests ahead of the last period found
+            while last_requested < min(14, x + max(ot_probes, 1)):
+                last_requested += 1
+                futures[last_requested] = executor.submit(
+                    get_wnba_pbp_api, game_id, last_requested, season, client
+                )
+    finally:
+        # overtime requests that have already started are waited for so none
+        # are still running once the game is returned
+        for future in futures.values():
+            future.cancel()
+        executor.shutdown(wait=True)
+
+    if len(results) >= MIN_PERIODS:
+        with PERIOD_COUNT_LOCK:
+            PERIOD_COUNTS[game_id] = len(results)
+        if cache is not None:
+            cache.set("wnba_period_count", {"game_id": game_id}, len(results))
+
+    return results
+
+
+def game_date_column(pbp_df, derived):
+    """
+    date the game was played
+    """
+    return pd.to_datetime(derived["_game"]["gcode"].split("/")[0], format="%Y%m%d")
+
+
+def team_ids_column(pbp_df, derived):
+    """
+    tuple of the home and away team ids
+    """
+    team_df = pd.DataFrame(
+        {
+            "tid": pbp_df["tid"].values,
+            "game_id": derived["game_id"],
+            "home_team_abbrev": derived["home_team_abbrev"],
+        }
     )
-    pbp_df["is_d_rebound"] = np.where(
-        (pbp_df["event_type_de"] == "rebound")
-        & (pbp_df["tid"] != pbp_df["tid"].shift(1))
-        & (pbp_df["pid"] != 0),
+    return get_team_ids(team_df, client=derived["_game"]["client"])
+
+
+def rebound_column(pbp_df, derived, same_team):
+    """
+    Inputs:
+    pbp_df      - play by play dataframe of the api columns
+    derived     - dictionary of the derived columns already calculated
+    same_team   - True for offensive rebounds and False for defensive
+
+    Outputs:
+    is_rebound  - int array of whether each event is that type of rebound
+    """
+    return np.where(
+        (derived["event_type_de"].values == "rebound")
+        & (same_as_previous(pbp_df["tid"].values) == same_team)
+        & (pbp_df["pid"].values != 0),
         1,
         0,
     )
 
-    # create columns to determine turnovers and steals
-    pbp_df["is_turnover"] = np.where(
-        pbp_df["de"].str.contains("Turnover").fillna(False), 1, 0,
-    )
-    pbp_df["is_steal"] = np.where(
-        pbp_df["de"].str.contains("Steal").fillna(False), 1, 0,
-    )
 
-    # determine what type of fouls are being commited
-    pbp_df["foul_type"] = pbp_df.apply(wnba_parse_foul, axis=1)
+# every derived column parse_wnba_pbp can add to the play by play, the
+# columns each one is calculated from and the function that calculates it.
+# _game is the game id, gcode and client parse_wnba_pbp fills in. See
+# column_graph for how it is used
+WNBA_COLUMN_GRAPH = {
+    "_game": ((), None),
+    "game_date": (("_game",), game_date_column),
+    "away_team_abbrev": (
+        ("_game",),
+        lambda pbp_df, derived: derived["_game"]["gcode"].split("/")[1][:3],
+    ),
+    "home_team_abbrev": (
+        ("_game",),
+        lambda pbp_df, derived: derived["_game"]["gcode"].split("/")[1][3:],
+    ),
+    "seconds_elapsed": (
+        ("cl", "period"),
+        lambda pbp_df, derived: seconds_elapsed_array(
+            pbp_df["cl"], pbp_df["period"], max_time=600, seconds_type=float
+        ),
+    ),
+    "shot_type": (
+        ("etype", "mtype"),
+        lambda pbp_df, derived: shot_type_array(pbp_df["etype"], pbp_df["mtype"]),
+    ),
+    "game_id": (("_game",), lambda pbp_df, derived: derived["_game"]["game_id"]),
+    # scan the descriptions once for every word the columns below are worked
+    # out from
+    "_flags": (
+        ("de",),
+        lambda pbp_df, derived: tokenize_descriptions(pbp_df["de"].values),
+    ),
+    "shot_made": (
+        ("etype", "_flags"),
+        lambda pbp_df, derived: made_shot_array(
+            pbp_df["etype"], has_token(derived["_flags"], "Missed")
+        ),
+    ),
+    "event_length": (
+        ("seconds_elapsed",),
+        lambda pbp_df, derived: event_length_array(derived["seconds_elapsed"]),
+    ),
+    "is_three": (
+        ("_flags",),
+        lambda pbp_df, derived: np.where(has_token(derived["_flags"], "3pt"), 1, 0),
+    ),
+    "event_type_de": (
+        ("etype",),
+        lambda pbp_df, derived: replace_codes(pbp_df["etype"], EVENT_TYPE_DICT),
+    ),
+    # NaN descriptions count as blocks the same as when this used str.contains
+    "is_block": (
+        ("_flags",),
+        lambda pbp_df, derived: np.where(
+            has_token(derived["_flags"], "BLK")
+            | ((derived["_flags"] & NAN_DESCRIPTION) != 0),
+            1,
+            0,
+        ),
+    ),
+    "points_made": (
+        ("is_three", "shot_made", "etype"),
+        lambda pbp_df, derived: points_made_array(
+            pd.Series(derived["is_three"], index=pbp_df.index),
+            derived["shot_made"],
+            pbp_df["etype"],
+        ),
+    ),
+    "is_o_rebound": (
+        ("event_type_de", "tid", "pid"),
+        lambda pbp_df, derived: rebound_column(pbp_df, derived, True),
+    ),
+    "is_d_rebound": (
+        ("event_type_de", "tid", "pid"),
+        lambda pbp_df, derived: rebound_column(pbp_df, derived, False),
+    ),
+    "is_turnover": (
+        ("_flags",),
+        lambda pbp_df, derived: np.where(
+            has_token(derived["_flags"], "Turnover"), 1, 0
+        ),
+    ),
+    "is_steal": (
+        ("_flags",),
+        lambda pbp_df, derived: np.where(has_token(derived["_flags"], "Steal"), 1, 0),
+    ),
+    "foul_type": (
+        ("etype", "mtype"),
+        lambda pbp_df, derived: foul_type_array(pbp_df["etype"], pbp_df["mtype"]),
+    ),
+    "is_putback": (
+        ("is_o_rebound", "event_length"),
+        lambda pbp_df, derived: putback_array(
+            derived["is_o_rebound"], derived["event_length"]
+        ),
+    ),
+    "_team_ids": (("tid", "game_id", "home_team_abbrev"), team_ids_column),
+    "home_team_id": (("_team_ids",), lambda pbp_df, derived: derived["_team_ids"][0]),
+    "away_team_id": (("_team_ids",), lambda pbp_df, derived: derived["_team_ids"][1]),
+}
+# the derived columns in the order parse_wnba_pbp adds them after the api
+# columns
+WNBA_DERIVED_COLUMNS = [
+    column for column in WNBA_COLUMN_GRAPH if not column.startswith("_")
+]
 
-    # determine if a shot is a putback off an offensive reboundk
-    pbp_df["is_putback"] = np.where(
-        (pbp_df["is_o_rebound"].shift(1) == 1) & (pbp_df["event_length"] <= 3), 1, 0
-    )
-    pbp_df["home_team_id"], pbp_df["away_team_id"] = get_team_ids(pbp_df)
 
-    return pbp_df
+def parse_wnba_pbp(game_id, client=None, columns=None):
+    """
+    function to parse the JSON output of the api into a dataframe. Only the
+    derived columns that were asked for and the columns they are calculated
+    from are worked out
 
+    Inputs:
+    game_id     - Id of game to be parsed
+    client      - NBAClient to make the api calls with
+    columns     - list of the api and derived columns to return in that
+                  order. None returns every column
 
-def get_wnba_lineup(game_id, period):
+    Outputs:
+    wnba_pbp_df   - wnba play by play dataframe
+    """
+
+    season = get_wnba_season(game_id)
+    results = get_wnba_periods(game_id, season, client=client)
+    dfs = []
+    for period, v2_dict in enumerate(results):
+        pbp_v2_df = pd.DataFrame(v2_dict["g"]["pla"])
+        pbp_v2_df.columns = list(map(str.lower, pbp_v2_df.columns))
+        pbp_v2_df["period"] = period + 1
+        dfs.append(pbp_v2_df)
+
+    pbp_df = pd.concat(dfs)
+    if columns is None:
+        columns = list(pbp_df.columns) + WNBA_DERIVED_COLUMNS
+    check_columns(columns, list(pbp_df.columns) + WNBA_DERIVED_COLUMNS)
+
+    derived_order, _ = resolve_columns(WNBA_COLUMN_GRAPH, columns)
+    game = {
+        "game_id": game_id,
+        "gcode": results[0]["g"]["gcode"],
+        "client": client,
+    }
+    derived = compute_columns(WNBA_COLUMN_GRAPH, derived_order, pbp_df, {"_game": game})
+
+    return pd.DataFrame(
+        {
+            column: derived[column] if column in derived else pbp_df[column].values
+            for column in columns
+        },
+        index=pbp_df.index,
+    )
+
+
+def get_wnba_lineup(game_id, period, client=None):
     """
     function pulls the possible lineups for the given period and game id for
     both the away and home teams
@@ -215,6 +430,7 @@ def get_wnba_lineup(game_id, period):
     Inputs:
     game_id            - id of game
     period             - period of game
+    client             - NBAClient to make the api call with
 
     Outputs:
     lineup_req_dict    - dictionary of lineup api request respons
@@ -233,13 +449,25 @@ def get_wnba_lineup(game_id, period):
         f"endRange={end_range}&rangeType=2"
     )
 
-    lineups_req = requests.get(url, headers=USER_AGENT)
-    lineup_req_dict = json.loads(lineups_req.text)
+    params = {
+        "gameId": game_id,
+        "period": period,
+        "startRange": start_range,
+        "endRange": end_range,
+    }
+    lineup_req_dict = get_json(
+        "wnba_boxscoreadvancedv2",
+        params,
+        url,
+        headers=USER_AGENT,
+        client=client,
+        is_final=has_lineup_rows,
+    )
 
     return lineup_req_dict
 
 
-def get_lineup(period_df, lineups, dataframe):
+def get_lineup(period_df, lineups, dataframe, client=None):
     """
     this function calculates the lineups for each team at each event and then
     appends it to the current dataframe. This only works for one period at a
@@ -251,12 +479,18 @@ def get_lineup(period_df, lineups, dataframe):
     lineups           - lineup api response dictionary
     dataframe         - full game dataframe. This is passed to get players name from
                         id in case the player didn't have an event in that period.
+    client            - NBAClient to look up player names with
 
     Outputs:
     lineup_df     - period_df with each teams lineups calculate and added to the
                     dataframe
     """
 
+    # look up the names of every player subbed in during the period at once
+    # instead of one at a time as the substitutions come up
+    sub_ids = period_df[period_df.event_type_de == "substitution"]["epid"].unique()
+    PLAYER_DIRECTORY.resolve(sub_ids, client=client)
+
     home_team = period_df["home_team_id"].unique()[0]
     away_team = period_df["away_team_id"].unique()[0]
     players = lineups["resultSets"][0]["rowSet"]
@@ -271,7 +505,6 @@ def get_lineup(period_df, lineups, dataframe):
     # the away/home indexes will be an empty list
 
     if len(away_ids_names) != 5:
-
         subs_df = period_df[(period_df.event_type_de == "substitution")]
         away_subs = subs_df[subs_df["tid"] == subs_df["away_team_id"]]
         away_indexes = list(away_subs.index)
@@ -321,7 +554,9 @@ def get_lineup(period_df, lineups, dataframe):
                     if len(starting_lineup) == 5:
                         break
             if len(away_ids_names) < 5:
-                away_ids_names = [(x, get_player_name(x)) for x in starting_lineup]
+                away_ids_names = [
+                    (x, get_player_name(x, client=client)) for x in starting_lineup
+                ]
             elif len(home_ids_names) > 5:
                 away_ids_names = [
                     (p[0], p[1]) for p in away_ids_names if p[0] not in subs
@@ -378,7 +613,9 @@ def get_lineup(period_df, lineups, dataframe):
                     if len(starting_lineup) == 5:
                         break
             if len(home_ids_names) < 5:
-                home_ids_names = [(x, get_player_name(x)) for x in starting_lineup]
+                home_ids_names = [
+                    (x, get_player_name(x, client=client)) for x in starting_lineup
+                ]
             elif len(home_ids_names) > 5:
                 home_ids_names = [
                     (p[0], p[1]) for p in home_ids_names if p[0] not in subs
@@ -420,12 +657,7 @@ def get_lineup(period_df, lineups, dataframe):
             home_ids_names = [
                 ids for ids in home_ids_names if ids[0] != period_df.iloc[i, :]["pid"]
             ]
-            player_url = (
-                f"https://a.data.nba.com/wnba/player/{period_df.iloc[i, :]['epid']}"
-            )
-            player_data = requests.get(player_url, headers=USER_AGENT)
-            player_dict = json.loads(player_data.text)
-            player_name = f"{player_dict['data']['info']['fn']} {player_dict['data']['info']['ln']}"
+            player_name = get_player_name(period_df.iloc[i, :]["epid"], client=client)
             home_ids_names.append((period_df.iloc[i, :]["epid"], player_name))
             period_df.iat[i, 39] = home_ids_names[0][0]
             period_df.iat[i, 38] = home_ids_names[0][1]
@@ -454,12 +686,7 @@ def get_lineup(period_df, lineups, dataframe):
             away_ids_names = [
                 ids for ids in away_ids_names if ids[0] != period_df.iloc[i, :]["pid"]
             ]
-            player_url = (
-                f"https://a.data.nba.com/wnba/player/{period_df.iloc[i, :]['epid']}"
-            )
-            player_data = requests.get(player_url, headers=USER_AGENT)
-            player_dict = json.loads(player_data.text)
-            player_name = f"{player_dict['data']['info']['fn']} {player_dict['data']['info']['ln']}"
+            player_name = get_player_name(period_df.iloc[i, :]["epid"], client=client)
             away_ids_names.append((period_df.iloc[i, :]["epid"], player_name))
             period_df.iat[i, 39] = home_ids_names[0][0]
             period_df.iat[i, 38] = home_ids_names[0][1]
@@ -506,13 +733,17 @@ def get_lineup(period_df, lineups, dataframe):
     return period_df
 
 
-def wnba_main_scrape(game_id):
+def wnba_main_scrape(game_id, client=None, columns=None):
     """
     This is the main function which ties everything together and will be imported
     into nba_scraper module as the hook to scrape nba games
 
     Inputs:
     game_id      - WNBA game id to be scraped
+    client       - NBAClient to make the api calls with
+    columns      - list of the columns to return in that order. None returns
+                   every column. The lineup api is only called if lineup
+                   columns are asked for
 
     Outputs:
     game_df      - WNBA dataframe of the play by play
@@ -520,18 +751,30 @@ def wnba_main_scrape(game_id):
     WNBA has 204 games in a season with the same game_id structure as nba
     they add a 1 to the front of the game_id for some reason
     """
+    if not needs_lineups(columns):
+        return parse_wnba_pbp(game_id, client=client, columns=columns)
 
-    pbp_df = parse_wnba_pbp(game_id)
+    PLAYER_DIRECTORY.load_season(get_wnba_season(game_id), client=client)
+    pbp_df = parse_wnba_pbp(game_id, client=client)
 
     periods = []
 
     for period in range(1, pbp_df["period"].max() + 1):
-        lineups = get_wnba_lineup(game_id, period)
+        lineups = get_wnba_lineup(game_id, period, client=client)
         periods.append(
-            get_lineup(pbp_df[pbp_df["period"] == period].copy(), lineups, pbp_df,)
+            get_lineup(
+                pbp_df[pbp_df["period"] == period].copy(),
+                lineups,
+                pbp_df,
+                client=client,
+            )
         )
 
     pbp_df = pd.concat(periods)
+    if columns is not None:
+        # the lineups are filled in by column position so they need every
+        # column and the ones that weren't asked for are dropped after
+        pbp_df = pbp_df[columns]
 
     return pbp_df
 
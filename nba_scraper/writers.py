@@ -0,0 +1,184 @@
+"""
+This file contains the writers that save scraped games to disk one game at a
+time as they are scraped instead of building one dataframe of every game
+first. Files are written to a temporary file next to the final path and only
+renamed to it once every game is written so a crash never leaves a partial
+file at the final path. The games that were finished before a crash are kept
+in a .partial file next to it instead.
+"""
+import gzip
+import io
+import os
+import tempfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def get_compressed_path(path, compression=None):
+    """
+    Inputs:
+    path        - path of the file to write
+    compression - None, gzip or zstd
+
+    Outputs:
+    path        - the path with the compression's suffix added if it doesn't
+                  already end with it
+    """
+    if compression is None:
+        return path
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(
+            f"Unknown compression {compression}. "
+            f"Compression must be None or one of {list(COMPRESSION_SUFFIXES)}"
+        )
+    suffix = COMPRESSION_SUFFIXES[compression]
+    return path if path.endswith(suffix) else path + suffix
+
+
+def get_partial_path(path):
+    """
+    Inputs:
+    path        - path of the file to write
+
+    Outputs:
+    partial_path - path to keep the games written before a failure at. It is
+                   the path with .partial before its extensions so it can
+                   still be read the same way ex: nba2019.partial.csv.gz
+    """
+    directory, file_name = os.path.split(path)
+    name, dot, extensions = file_name.partition(".")
+    return os.path.join(directory, f"{name}.partial{dot}{extensions}")
+
+
+class CSVWriter:
+    """
+    Appends games to a csv file as they are scraped. The header and column
+    order are fixed by the columns passed in or by the first game written and
+    every game after that is written with the same columns
+    """
+
+    def __init__(self, path, columns=None, compression=None):
+        """
+        Inputs:
+        path        - path of the csv file to write
+        columns     - list of the columns to write in order. Defaults to the
+                      columns of the first game written
+        compression - None, gzip or zstd. zstd needs the zstandard package
+        """
+        if compression == "zstd" and zstandard is None:
+            raise ImportError(
+                "zstd compression needs the zstandard package. "
+                "Install it with pip install zstandard"
+            )
+        self.path = get_compressed_path(path, compression)
+        self.columns = list(columns) if columns is not None else None
+        self.compression = compression
+        self.games_written = 0
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        file_descriptor, self.temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self.raw_file = os.fdopen(file_descriptor, "wb")
+        if compression == "gzip":
+            self.binary_file = gzip.GzipFile(fileobj=self.raw_file, mode="wb")
+        elif compression == "zstd":
+            self.binary_file = zstandard.ZstdCompressor().stream_writer(self.raw_file)
+        else:
+            self.binary_file = self.raw_file
+        self.file = io.TextIOWrapper(self.binary_file, encoding="utf-8", newline="")
+
+    def write(self, game_df):
+        """
+        appends a game to the file writing the header first if it is the
+        first game
+
+        Inputs:
+        game_df     - dataframe of the game's play by play
+        """
+        if self.columns is None:
+            self.columns = list(game_df.columns)
+        else:
+            extra_columns = [c for c in game_df.columns if c not in self.columns]
+            if extra_columns:
+                print(f"Columns {extra_columns} aren't in the csv header")
+            game_df = game_df.reindex(columns=self.columns)
+
+        game_df.to_csv(
+            self.file, index=False, header=self.games_written == 0, columns=self.columns
+        )
+        self.games_written += 1
+
+    def close_files(self):
+        """
+        flushes and closes the text, compression and raw file objects. gzip
+        doesn't close the file it writes to so the raw file is closed here
+        """
+        try:
+            self.file.close()
+        finally:
+            self.raw_file.close()
+
+    def close(self):
+        """
+        finishes the file and renames it to its final path. Nothing is written
+        if no games were
+        """
+        self.close_files()
+        if self.games_written == 0:
+            os.remove(self.temp_path)
+            return
+        os.replace(self.temp_path, self.path)
+
+    def abort(self):
+        """
+        stops writing after a failure. The games already written are kept
+        in the partial file and the temporary file is deleted if there
+        weren't any
+        """
+        try:
+            self.close_files()
+        finally:
+            if self.games_written == 0:
+                if os.path.exists(self.temp_path):
+                    os.remove(self.temp_path)
+            else:
+                partial_path = get_partial_path(self.path)
+                os.replace(self.temp_path, partial_path)
+                print(
+                    f"Writing {self.path} failed after {self.games_written} "
+                    f"games. They were saved to {partial_path}"
+                )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_csv(game_frames, path, compression=None, columns=None):
+    """
+    writes games to a csv file one at a time as they come in
+
+    Inputs:
+    game_frames - iterable of game dataframes
+    path        - path of the csv file to write
+    compression - None, gzip or zstd
+    columns     - list of the columns to write in order. Defaults to the
+                  columns of the first game
+
+    Outputs:
+    games_written - number of games written to the file
+    """
+    with CSVWriter(path, columns, compression) as writer:
+        for game_df in game_frames:
+            writer.write(game_df)
+    return writer.games_written
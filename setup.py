@@ -5,6 +5,7 @@ with open("README.md", "r") as fh:
 setup(
     name="nba_scraper",
     packages=["nba_scraper"],
+    package_data={"nba_scraper": ["data/*.json"]},
     version="1.0.10",
     license="GNU General Public License v3.0",
     description="A Python package to scrape the NBA api and return a play by play file",
@@ -16,6 +17,7 @@ setup(
     download_url="https://github.com/mcbarlowe/nba_scraper/archive/v1.0.10.tar.gz",
     keywords=["basketball", "NBA", "scraper"],
     install_requires=["requests", "pandas", "numpy"],
+    extras_require={"zstd": ["zstandard"], "parquet": ["pyarrow"], "json": ["orjson"]},
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Science/Research",
@@ -1,12 +1,36 @@
 """
 unit tests for the nba_scraper module
 """
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime
 import pytest
 import json
+import random
+import time
+import numpy as np
 import pandas as pd
 import nba_scraper.scrape_functions as sf
 import nba_scraper.nba_scraper as ns
+import nba_scraper.helper_functions as hf
+import nba_scraper.wnba_scrape_functions as wsf
+import requests
+from requests.adapters import BaseAdapter
+from nba_scraper import cache, client
+from nba_scraper.rate_limit import RateLimiter
+from nba_scraper import schedule
+from nba_scraper.player_directory import PlayerDirectory
+from nba_scraper.game_index import get_index_season
+from nba_scraper.teams import TeamRegistry
+from nba_scraper import writers
+from nba_scraper.pipeline import iter_game_futures
+from nba_scraper.writers import CSVWriter, write_csv
+from nba_scraper.datasets import read_dataset, write_dataset
+from nba_scraper.game_index import GameIndex
+from nba_scraper import schema
+from nba_scraper.schema import compact_game
+from nba_scraper import json_decode
+from nba_scraper.column_graph import compute_columns, resolve_columns
 
 
 def test_pbp_scrape():
@@ -40,6 +64,197 @@ def test_lineup_scrape():
     assert isinstance(game_df, pd.DataFrame)
 
 
+def test_infer_lineups():
+    """
+    test that the starters worked out from the play by play match the
+    starters from the lineup api
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+
+    with open("test_files/lineups.json", "r") as lineup:
+        lineup_dict = json.load(lineup)
+
+    game_df = sf.scrape_pbp(v2_dict)
+    inferred_dict = sf.infer_lineups(game_df[game_df["period"] == 1].copy())
+
+    inferred_players = {(p[1], p[4]) for p in inferred_dict["resultSets"][0]["rowSet"]}
+    api_players = {(p[1], p[4]) for p in lineup_dict["resultSets"][0]["rowSet"]}
+    assert inferred_players == api_players
+
+
+def test_starter_fallback_stats():
+    """
+    test that get_lineup counts the periods where it had to infer the
+    starters because the lineup api didn't return them
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+
+    with open("test_files/lineups.json", "r") as lineup:
+        lineup_dict = json.load(lineup)
+
+    game_df = sf.scrape_pbp(v2_dict)
+    period_df = game_df[game_df["period"] == 2].copy()
+    starters = sf.infer_period_starters(period_df)
+    assert [len(starters[team][0]) for team in ["home", "away"]] == [5, 5]
+
+    before = sf.get_lineup_api_stats()
+    sf.get_lineup(game_df[game_df["period"] == 1].copy(), lineup_dict, game_df)
+    sf.get_lineup(period_df, {"resultSets": [{"rowSet": []}]}, game_df)
+    after = sf.get_lineup_api_stats()
+    assert after["starters_checked"] - before["starters_checked"] == 4
+    assert after["starters_inferred"] - before["starters_inferred"] == 2
+
+
+def test_tokenize_descriptions():
+    """
+    test that the description flags match scanning for each word with
+    str.contains including for missing descriptions
+    """
+    descriptions = pd.Series(
+        ["MISS Jump Shot", "3PT BLOCK", "MISSTEAL", None, np.nan, "Missed 3pt"],
+        dtype=object,
+    )
+    flags = sf.tokenize_descriptions(descriptions.values)
+
+    for token in ["MISS", "BLOCK", "3PT", "STEAL", "Missed", "3pt"]:
+        assert list(sf.has_token(flags, token)) == list(
+            descriptions.str.contains(token).fillna(False).astype(bool)
+        )
+    assert list(sf.is_missing(flags)) == list(descriptions.isnull())
+
+
+def test_fill_lineups():
+    """
+    test that each substitution puts the player coming in on the court and
+    takes the player going out off it from that event on
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+
+    with open("test_files/lineups.json", "r") as lineup:
+        lineup_dict = json.load(lineup)
+
+    game_df = sf.scrape_pbp(v2_dict)
+    period_df = sf.get_lineup(
+        game_df[game_df["period"] == 1].copy(), lineup_dict, game_df
+    )
+
+    home_id_columns = [f"home_player_{number}_id" for number in range(1, 6)]
+    home_subs = period_df[
+        (period_df["event_type_de"] == "substitution")
+        & period_df["visitordescription"].isnull()
+    ]
+    assert len(home_subs) > 0
+    for index, sub in home_subs.iterrows():
+        on_court = set(period_df.loc[index, home_id_columns])
+        assert sub["player2_id"] in on_court
+        assert sub["player1_id"] not in on_court
+
+    starters = {
+        p[4]
+        for p in lineup_dict["resultSets"][0]["rowSet"]
+        if p[1] == period_df["home_team_id"].iloc[0]
+    }
+    assert set(period_df[home_id_columns].iloc[0]) == starters
+
+
+def test_parse_game_lineups():
+    """
+    test that parse_game writing every period's lineups into one game frame
+    gives the same play by play as running get_lineup on each period and
+    putting them back together
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+
+    with open("test_files/lineups.json", "r") as lineup:
+        lineup_dict = json.load(lineup)
+
+    raw_game = {
+        "game_id": "0021700001",
+        "v2_dict": v2_dict,
+        "lineups": {1: lineup_dict, 2: {"resultSets": [{"rowSet": []}]}},
+        "game_date": "2017-10-17",
+        "game_info": {"periods": 2},
+    }
+    game_df = sf.parse_game(raw_game)
+
+    pbp_df = sf.scrape_pbp(v2_dict, {})
+    periods = [
+        sf.get_lineup(
+            pbp_df[pbp_df["period"] == period].copy(),
+            raw_game["lineups"][period],
+            pbp_df,
+        )
+        for period in [1, 2]
+    ]
+    expected_df = pd.concat(periods).reset_index(drop=True)
+    expected_df["game_date"] = "2017-10-17"
+
+    pd.testing.assert_frame_equal(game_df, expected_df)
+
+
+def test_resolve_columns():
+    """
+    test that only the derived columns asked for and the ones they need are
+    calculated and each one after the columns it needs
+    """
+    graph = {
+        "b": (("a",), lambda pbp_df, derived: pbp_df["a"] + 1),
+        "c": (("b", "a"), lambda pbp_df, derived: derived["b"] * pbp_df["a"]),
+        "d": (("a",), lambda pbp_df, derived: 1 / 0),
+    }
+    derived_order, api_columns = resolve_columns(graph, ["c", "a"])
+    assert derived_order == ["b", "c"]
+    assert api_columns == {"a"}
+
+    derived = compute_columns(graph, derived_order, pd.DataFrame({"a": [1, 2]}))
+    assert list(derived["c"]) == [2, 6]
+
+
+def test_scrape_columns(monkeypatch):
+    """
+    test that asking for some columns returns the same values as scraping
+    every column and that the lineup api is only called when lineup columns
+    are asked for
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+    with open("test_files/lineups.json", "r") as lineup:
+        lineup_dict = json.load(lineup)
+    calls = []
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            calls.append(url)
+            if "playbyplayv2" in url:
+                return v2_dict
+            if "boxscoreadvancedv2" in url:
+                return lineup_dict
+            raise ValueError("no schedule")
+
+    monkeypatch.setattr(cache, "CACHE", None)
+    monkeypatch.setattr(schedule, "GAME_INDEX", GameIndex())
+
+    columns = ["eventnum", "points_made", "is_putback", "home_team_abbrev"]
+    game_df = sf.main_scrape("0021700001", client=FakeClient(), columns=columns)
+    assert list(game_df.columns) == columns
+    assert not any("boxscoreadvancedv2" in url for url in calls)
+    pd.testing.assert_frame_equal(game_df, sf.scrape_pbp(v2_dict, {})[columns])
+
+    calls.clear()
+    game_df = sf.main_scrape(
+        "0021700001", client=FakeClient(), columns=["eventnum", "home_player_1_id"]
+    )
+    assert list(game_df.columns) == ["eventnum", "home_player_1_id"]
+    assert sum("boxscoreadvancedv2" in url for url in calls) == 4
+
+    with pytest.raises(ValueError):
+        ns.get_nba_stages(columns=["eventnum", "not_a_column"])
+
+
 def test_get_season():
     """
     tests the get get_season function in scraper_functions to make sure it
@@ -136,6 +351,48 @@ def test_calc_points():
     assert sf.calc_points_made(game_df.iloc[151, :].copy()) == 3
 
 
+def test_stat_arrays():
+    """
+    test that the array versions of the stat functions give exactly the same
+    columns as applying the row functions to a season of games
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+
+    game_df = sf.scrape_pbp(v2_dict)
+    season_df = pd.concat([game_df, game_df], ignore_index=True)
+    event_types = season_df["eventmsgtype"]
+    action_types = season_df["eventmsgactiontype"]
+
+    missed = sf.has_token(
+        sf.tokenize_descriptions(season_df["homedescription"].values), "MISS"
+    ) | sf.has_token(
+        sf.tokenize_descriptions(season_df["visitordescription"].values), "MISS"
+    )
+    pd.testing.assert_series_equal(
+        sf.made_shot_array(event_types, missed),
+        season_df.apply(sf.made_shot, axis=1),
+    )
+    pd.testing.assert_series_equal(
+        sf.shot_type_array(event_types, action_types),
+        season_df.apply(sf.parse_shot_types, axis=1),
+    )
+    pd.testing.assert_series_equal(
+        sf.foul_type_array(event_types, action_types),
+        season_df.apply(sf.parse_foul, axis=1),
+    )
+    pd.testing.assert_series_equal(
+        sf.seconds_elapsed_array(season_df["pctimestring"], season_df["period"]),
+        season_df.apply(sf.create_seconds_elapsed, axis=1),
+    )
+    pd.testing.assert_series_equal(
+        sf.points_made_array(
+            season_df["is_three"], season_df["shot_made"], event_types
+        ),
+        season_df.apply(sf.calc_points_made, axis=1),
+    )
+
+
 def test_check_format(capfd):
     """
     test check_format function
@@ -148,10 +405,211 @@ def test_check_format(capfd):
     out, err = capfd.readouterr()
     assert out == (
         f"You passed pand to scrape_game function as a data format.\n"
-        "This is an unaccepted format. Please either pass 'pandas' or 'csv'.\n\n"
+        "This is an unaccepted format. Please pass 'pandas', 'csv', "
+        "'parquet' or 'arrow'.\n\n"
     )
 
 
+def test_scrape_game_ids():
+    """
+    test that scrape_game_ids returns games in the order they were passed
+    whether scraped serially or with a pool of workers
+    """
+    game_ids = [f"00218000{x:02}" for x in range(1, 21)]
+
+    def fake_scrape(game_id):
+        time.sleep(random.random() / 100)
+        return pd.DataFrame({"game_id": [game_id]})
+
+    serial = ns.scrape_game_ids(game_ids, fake_scrape)
+    threaded = ns.scrape_game_ids(game_ids, fake_scrape, workers=8)
+
+    assert [df.game_id[0] for df in serial] == game_ids
+    assert [df.game_id[0] for df in threaded] == game_ids
+
+
+def test_iter_game_frames():
+    """
+    test that games can be yielded one at a time in order or as they finish
+    """
+    game_ids = [f"00218000{x:02}" for x in range(1, 6)]
+
+    def fake_scrape(game_id):
+        # the first game takes the longest
+        time.sleep(0.05 if game_id == game_ids[0] else 0)
+        return pd.DataFrame({"game_id": [game_id]})
+
+    game_iter = ns.iter_game_frames(game_ids, fake_scrape, workers=5)
+    assert next(game_iter).game_id[0] == game_ids[0]
+    assert [df.game_id[0] for df in game_iter] == game_ids[1:]
+
+    finished_ids = [
+        df.game_id[0]
+        for df in ns.iter_game_frames(game_ids, fake_scrape, workers=5, ordered=False)
+    ]
+    assert sorted(finished_ids) == game_ids
+    assert finished_ids[-1] == game_ids[0]
+
+
+def test_pipeline_processes():
+    """
+    test that games downloaded in threads and parsed in a process pool come
+    back in order and match games scraped in one step
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+    with open("test_files/lineups.json", "r") as lineup:
+        lineup_dict = json.load(lineup)
+
+    def fake_fetch(game_id):
+        time.sleep(random.random() / 100)
+        return {
+            "game_id": "0021700001",
+            "v2_dict": v2_dict,
+            "lineups": {period: lineup_dict for period in range(1, 5)},
+            "game_date": game_id,
+        }
+
+    game_ids = ["first", "second", "third"]
+    piped_games = ns.scrape_game_ids(
+        game_ids, fake_fetch, workers=2, parse_func=sf.parse_game, processes=2
+    )
+    expected_game = sf.parse_game(fake_fetch("first"))
+
+    assert [df.game_date[0] for df in piped_games] == game_ids
+    pd.testing.assert_frame_equal(piped_games[0], expected_game)
+
+
+def test_pipeline_cancel():
+    """
+    test that the games still waiting to be downloaded are cancelled when the
+    caller stops early
+    """
+    fetched = []
+
+    def slow_fetch(game_id):
+        time.sleep(0.05)
+        fetched.append(game_id)
+        return game_id
+
+    game_futures = iter_game_futures(
+        [str(x) for x in range(20)], slow_fetch, workers=2, buffer_size=6
+    )
+    game_id, game_future = next(game_futures)
+    game_futures.close()
+
+    assert game_future.result() == game_id == "0"
+    assert len(fetched) <= 4
+
+
+def test_pipeline_lineup_stats(monkeypatch):
+    """
+    test that the lineup api stats are counted in the parent process when
+    games are parsed in a process pool
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+
+    def no_lineup_api(game_id, period, client=None):
+        raise AssertionError("lineup api called for an inferable period")
+
+    monkeypatch.setattr(sf, "get_pbp_api", lambda game_id, client=None: v2_dict)
+    monkeypatch.setattr(sf, "get_game_info", lambda game_id, client=None: {})
+    monkeypatch.setattr(sf, "fetch_game_date", lambda *args: "2017-10-17")
+    monkeypatch.setattr(sf, "get_lineup_api", no_lineup_api)
+
+    scrape_func, parse_func, finish_func = ns.get_nba_stages("infer", processes=2)
+    raw_game = scrape_func("0021700001")
+    assert raw_game["lineups"] == {} and "starters" not in raw_game
+
+    before = sf.get_lineup_api_stats()
+    piped_games = ns.scrape_game_ids(
+        ["0021700001"],
+        scrape_func,
+        workers=2,
+        parse_func=parse_func,
+        processes=2,
+        finish_func=finish_func,
+    )
+    after = sf.get_lineup_api_stats()
+
+    assert after["called"] - before["called"] == 0
+    assert after["skipped"] - before["skipped"] == 4
+    assert after["starters_checked"] - before["starters_checked"] == 8
+    assert piped_games[0]["home_player_1_id"].notna().all()
+
+
+def test_resumable_job(tmp_path, monkeypatch):
+    """
+    test that a job retries failed games, saves each finished game and only
+    scrapes the games that are left when it is run again
+    """
+    monkeypatch.setattr("nba_scraper.backfill.time.sleep", lambda seconds: None)
+    game_ids = [f"00218000{x:02}" for x in range(1, 6)]
+    calls = []
+
+    def flaky_scrape(game_id):
+        calls.append(game_id)
+        if game_id == "0021800003" and calls.count(game_id) == 1:
+            raise ValueError("bad response")
+        if game_id == "0021800005":
+            raise ValueError("no data")
+        return pd.DataFrame({"game_id": [game_id]})
+
+    job_dir = str(tmp_path / "job")
+    scraped_games = ns.scrape_games(game_ids, flaky_scrape, job_dir=job_dir, retries=1)
+    assert [df.game_id[0] for df in scraped_games] == game_ids[:4]
+
+    with open(tmp_path / "job" / "manifest.json") as manifest_file:
+        manifest = json.load(manifest_file)
+    assert manifest["completed"] == [
+        "0021800001",
+        "0021800002",
+        "0021800004",
+        "0021800003",
+    ]
+    assert list(manifest["failed"]) == ["0021800005"]
+    assert manifest["pending"] == []
+
+    calls.clear()
+    scraped_games = ns.scrape_games(game_ids, flaky_scrape, job_dir=job_dir, retries=0)
+    assert calls == ["0021800005"]
+    assert [df.game_id[0] for df in scraped_games] == game_ids[:4]
+
+
+def test_job_streams_games(tmp_path, monkeypatch):
+    """
+    test that a job yields each game as soon as it is scraped and only
+    retries the failed games of its own game ids
+    """
+    monkeypatch.setattr("nba_scraper.backfill.time.sleep", lambda seconds: None)
+    job_dir = str(tmp_path / "job")
+    calls = []
+
+    def failing_scrape(game_id):
+        calls.append(game_id)
+        raise ValueError("no data")
+
+    ns.scrape_games(["0021800009"], failing_scrape, job_dir=job_dir, retries=0)
+
+    def scrape(game_id):
+        calls.append(game_id)
+        return pd.DataFrame({"game_id": [game_id]})
+
+    calls.clear()
+    game_frames = ns.iter_game_frames(
+        ["0021800001", "0021800002"], scrape, job_dir=job_dir, retries=1
+    )
+    assert next(game_frames).game_id[0] == "0021800001"
+    assert calls == ["0021800001"]
+    assert [df.game_id[0] for df in game_frames] == ["0021800002"]
+    assert "0021800009" not in calls
+
+    with open(tmp_path / "job" / "manifest.json") as manifest_file:
+        manifest = json.load(manifest_file)
+    assert list(manifest["failed"]) == ["0021800009"]
+
+
 def test_check_valid_dates():
     """
     test for check_valid_dates function in nba_scraper.py
@@ -165,3 +623,865 @@ def test_check_valid_dates():
 
     with pytest.raises(ValueError):
         ns.check_valid_dates("30-01-2018", "15-02-2018")
+
+
+def test_write_csv(tmp_path):
+    """
+    test that games are appended to the csv with one header in a fixed column
+    order and that a failed write keeps the games that were finished in a
+    partial file instead of the final one
+    """
+    game_frames = [
+        pd.DataFrame({"game_id": ["0021800001"], "period": [1], "score": ["2 - 0"]}),
+        pd.DataFrame({"score": ["0 - 3"], "period": [2], "game_id": ["0021800002"]}),
+    ]
+
+    csv_files = [(None, tmp_path / "games.csv"), ("gzip", tmp_path / "games.csv.gz")]
+    # zstandard is optional so only test zstd if it is installed
+    if writers.zstandard is not None:
+        csv_files.append(("zstd", tmp_path / "games.csv.zst"))
+
+    for compression, path in csv_files:
+        assert write_csv(game_frames, str(tmp_path / "games.csv"), compression) == 2
+        games_df = pd.read_csv(path, dtype=str)
+        assert list(games_df.columns) == ["game_id", "period", "score"]
+        assert list(games_df["game_id"]) == ["0021800001", "0021800002"]
+        assert list(games_df["score"]) == ["2 - 0", "0 - 3"]
+
+    def failing_frames():
+        yield game_frames[0]
+        raise ValueError("scrape failed")
+
+    for compression in [None, "gzip"]:
+        with pytest.raises(ValueError):
+            write_csv(failing_frames(), str(tmp_path / "failed.csv"), compression)
+    assert not (tmp_path / "failed.csv").exists()
+    for partial_name in ["failed.partial.csv", "failed.partial.csv.gz"]:
+        games_df = pd.read_csv(tmp_path / partial_name, dtype=str)
+        assert list(games_df["game_id"]) == ["0021800001"]
+
+    with pytest.raises(ValueError):
+        with CSVWriter(str(tmp_path / "empty.csv")):
+            raise ValueError("scrape failed")
+    assert not any(p.name.startswith("empty") for p in tmp_path.iterdir())
+    assert not any(p.name.endswith(".tmp") for p in tmp_path.iterdir())
+
+
+def test_mark_missing_game(tmp_path, monkeypatch):
+    """
+    test that a played game with an empty play by play is added to the
+    missing games catalog and skipped from then on while a game that hasn't
+    been played yet isn't
+    """
+    empty_dict = {"resultSets": [{"headers": [], "rowSet": []}]}
+    game_dates = {"0021700001": "2017-10-17", "0021700002": "2999-10-17"}
+    monkeypatch.setattr(cache, "CACHE", cache.ResponseCache(str(tmp_path)))
+    monkeypatch.setattr(schedule, "MISSING_GAMES", None)
+    monkeypatch.setattr(sf, "get_pbp_api", lambda game_id, client=None: empty_dict)
+    monkeypatch.setattr(
+        sf,
+        "get_game_info",
+        lambda game_id, client=None: {"game_date": game_dates[game_id]},
+    )
+
+    other_cache = cache.ResponseCache(str(tmp_path))
+    other_cache.set("missing_games", {}, {"wnba": {"1021900001": "no pbp"}})
+
+    for game_id in game_dates:
+        with pytest.raises(ValueError):
+            sf.fetch_game(game_id)
+
+    stored_games = other_cache.get("missing_games", {})
+    assert list(stored_games["wnba"]) == ["1021900001"]
+    assert list(stored_games["nba"]) == ["0021700001"]
+    missing_games = schedule.get_missing_games()
+    assert "0021700001" in missing_games
+    assert "0021700002" not in missing_games
+    monkeypatch.setattr(schedule, "MISSING_GAMES", None)
+    assert ns.get_available_games([21700001, 21700002]) == ["0021700002"]
+
+
+def test_parquet_dataset(tmp_path):
+    """
+    test that games written to a parquet dataset keep the same column types
+    and that reading one team's games only reads the games it played in
+    """
+    pytest.importorskip("pyarrow")
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+    with open("test_files/lineups.json", "r") as lineup:
+        lineup_dict = json.load(lineup)
+
+    game_df = sf.parse_game(
+        {
+            "game_id": "0021700001",
+            "v2_dict": v2_dict,
+            "lineups": {period: lineup_dict for period in range(1, 5)},
+            "game_date": datetime(2017, 10, 17),
+        }
+    )
+    other_game_df = game_df.copy()
+    other_game_df["game_id"] = "0021700002"
+    other_game_df["home_team_abbrev"] = "GSW"
+    other_game_df["away_team_abbrev"] = "HOU"
+    other_game_df.loc[other_game_df.index[0], "home_player_1_id"] = ""
+
+    # games written by separate writers, like separate processes, both end
+    # up in the season's index
+    assert write_dataset([game_df], str(tmp_path)) == 1
+    assert write_dataset([other_game_df], str(tmp_path)) == 1
+    game_dir = tmp_path / "league=nba" / "season=2018" / "game_id=0021700001"
+    assert (game_dir / "part-0.parquet").exists()
+    assert (game_dir / "_index.json").exists()
+
+    cle_df = read_dataset(str(tmp_path), team="CLE")
+    assert list(cle_df["game_id"].unique()) == ["0021700001"]
+    assert len(cle_df) == len(game_df)
+
+    games_df = read_dataset(str(tmp_path), seasons=[2018], columns=["home_player_1_id"])
+    assert str(games_df["home_player_1_id"].dtype) == "float64"
+    assert games_df["home_player_1_id"].isna().sum() == 1
+    assert read_dataset(str(tmp_path), team="BKN") is None
+
+
+def test_wnba_dataset(tmp_path):
+    """
+    test that WNBA games with tenths of a second in seconds_elapsed are
+    written to parquet and arrow datasets without losing them and that the
+    WNBA api ids come back as integers
+    """
+    pytest.importorskip("pyarrow")
+    game_df = pd.DataFrame(
+        {
+            "game_id": ["021900001"] * 3,
+            "period": [1, 1, 2],
+            "seconds_elapsed": [0.0, 12.4, 2714.8],
+            "event_length": [0.0, 12.4, 2702.4],
+            "home_team_abbrev": ["LVA"] * 3,
+            "away_team_abbrev": ["ATL"] * 3,
+            "home_team_id": [1611661319] * 3,
+            "away_team_id": [1611661330] * 3,
+            "game_date": ["2019-05-24"] * 3,
+            "tid": [1611661319, 0, 1611661330],
+            "pid": [1628888, 0, 1629001],
+            "opid": ["", "1628888", ""],
+        }
+    )
+
+    for file_format in ["parquet", "arrow"]:
+        data_dir = str(tmp_path / file_format)
+        write_dataset([game_df], data_dir, "wnba", file_format)
+        games_df = read_dataset(data_dir, "wnba", seasons=[2019])
+        assert list(games_df["seconds_elapsed"]) == [0.0, 12.4, 2714.8]
+        assert list(games_df["pid"]) == [1628888, 0, 1629001]
+        assert games_df["opid"].iloc[1] == 1628888
+        assert games_df["opid"].isna().sum() == 2
+
+
+def test_parquet_dataset_columns(tmp_path, monkeypatch):
+    """
+    test that a dataset scraped with only some columns still gets the columns
+    its partitions and index are built from
+    """
+    pytest.importorskip("pyarrow")
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+
+    monkeypatch.setattr(sf, "get_pbp_api", lambda game_id, client=None: v2_dict)
+    monkeypatch.setattr(sf, "get_game_info", lambda game_id, client=None: {})
+    monkeypatch.setattr(sf, "fetch_game_date", lambda *args: "2017-10-17")
+
+    ns.scrape_game(
+        ["0021700001"],
+        data_format="parquet",
+        data_dir=str(tmp_path),
+        columns=["eventnum", "points_made"],
+    )
+
+    games_df = read_dataset(str(tmp_path), team="CLE")
+    assert list(games_df.columns[:2]) == ["eventnum", "points_made"]
+    assert list(games_df["game_id"].unique()) == ["0021700001"]
+
+
+def test_compact_game(monkeypatch):
+    """
+    test that compact games keep their dtypes when concatenated and take
+    several times less memory
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+    with open("test_files/lineups.json", "r") as lineup:
+        lineup_dict = json.load(lineup)
+
+    game_df = sf.parse_game(
+        {
+            "game_id": "0021700001",
+            "v2_dict": v2_dict,
+            "lineups": {period: lineup_dict for period in range(1, 5)},
+            "game_date": datetime(2017, 10, 17),
+        }
+    )
+    other_game_df = game_df.copy()
+    other_game_df["game_id"] = "0021700002"
+    other_game_df.loc[other_game_df.index[0], "home_player_1_id"] = ""
+
+    compact_df = compact_game(game_df)
+    other_compact_df = compact_game(other_game_df)
+    assert str(compact_df["foul_type"].dtype) == "category"
+    assert str(compact_df["is_three"].dtype) == "int8"
+    assert str(compact_df["player1_id"].dtype) == "Int32"
+    assert compact_df["foul_type"].isna().sum() == game_df["foul_type"].isna().sum()
+    assert other_compact_df["home_player_1_id"].isna().sum() == 1
+    assert str(compact_df["seconds_elapsed"].dtype) == "float32"
+
+    games_df = pd.concat([compact_df, other_compact_df])
+    assert (games_df.dtypes == compact_df.dtypes).all()
+
+    if schema.STRING_DTYPE is not None:
+        assert (
+            compact_df.memory_usage(deep=True).sum() * 3
+            < game_df.memory_usage(deep=True).sum()
+        )
+
+    # pandas before 1.3 has no arrow strings so text columns stay objects
+    assert schema.get_string_dtype("0.24.2") is None
+    monkeypatch.setattr(schema, "STRING_DTYPE", None)
+    object_df = compact_game(game_df)
+    assert object_df["player1_name"].dtype == object
+    assert str(object_df["foul_type"].dtype) == "category"
+
+    other_game_df["home_team_abbrev"] = "XYZ"
+    with pytest.raises(ValueError):
+        compact_game(other_game_df)
+
+
+def test_rowset_frame():
+    """
+    test that the play by play columns are read straight into their types
+    from the rowSet and only the columns asked for are read
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+    result_set = v2_dict["resultSets"][0]
+
+    pbp_df = schema.rowset_frame(result_set, schema.PBP_V2_DTYPES)
+    expected_df = pd.DataFrame(
+        result_set["rowSet"], columns=[h.lower() for h in result_set["headers"]]
+    )
+    pd.testing.assert_frame_equal(pbp_df, expected_df)
+
+    pbp_df = schema.rowset_frame(
+        result_set, schema.PBP_V2_DTYPES, columns=["period", "player1_team_id"]
+    )
+    assert list(pbp_df.columns) == ["period", "player1_team_id"]
+    assert pbp_df["period"].dtype == np.int64
+    assert pbp_df["player1_team_id"].dtype == np.float64
+
+    # integer columns with a missing value are read as floats
+    pbp_df = schema.rowset_frame(
+        {"headers": ["PLAYER1_ID"], "rowSet": [[1], [None]]}, schema.PBP_V2_DTYPES
+    )
+    assert pbp_df["player1_id"].dtype == np.float64
+    assert pbp_df["player1_id"].isnull().tolist() == [False, True]
+
+
+def test_decode_json(monkeypatch):
+    """
+    test that responses decode the same with and without orjson and that
+    invalid JSON raises the standard library's error with both
+    """
+    data = b'{"resultSets": [{"rowSet": [[1, "MISS", null]]}]}'
+    decoded = json_decode.decode_json(data)
+    with pytest.raises(json.JSONDecodeError):
+        json_decode.decode_json(b"<html></html>")
+
+    monkeypatch.setattr(json_decode, "orjson", None)
+    assert json_decode.decode_json(data) == decoded
+    assert json_decode.decode_json(data.decode()) == decoded
+    with pytest.raises(json.JSONDecodeError):
+        json_decode.decode_json(b"<html></html>")
+
+
+def test_response_cache(tmp_path):
+    """
+    test the on disk response cache stores, expires and evicts responses and
+    that two caches on the same directory see the same responses
+    """
+    response_cache = cache.ResponseCache(
+        str(tmp_path), max_size=60, endpoint_ttl={"teamgamelog": 0}
+    )
+    response_cache.set("playbyplayv2", {"GameID": "0021700001"}, {"a": [1, 2]})
+
+    other_cache = cache.ResponseCache(str(tmp_path))
+    assert other_cache.get("playbyplayv2", {"GameID": "0021700001"}) == {"a": [1, 2]}
+    assert response_cache.get("playbyplayv2", {"GameID": "0021700002"}) is None
+
+    response_cache.set("teamgamelog", {"TeamID": 1}, {"b": 1})
+    time.sleep(0.01)
+    assert response_cache.get("teamgamelog", {"TeamID": 1}) is None
+
+    for game in range(10):
+        response_cache.set("playbyplayv2", {"GameID": game}, {"c": "x" * 10})
+    assert response_cache.size() <= 60
+    assert response_cache.get("playbyplayv2", {"GameID": 9}) == {"c": "x" * 10}
+    assert response_cache.get("playbyplayv2", {"GameID": 0}) is None
+
+
+def test_cache_update(tmp_path, monkeypatch):
+    """
+    test that values merged into the cache from many threads at once all
+    end up stored and that load_team_dates keeps the dates another process
+    stored
+    """
+    response_cache = cache.ResponseCache(str(tmp_path))
+
+    def add_team(team_id, stored):
+        stored = stored or {}
+        stored[str(team_id)] = team_id
+        return stored
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(
+            executor.map(
+                lambda team_id: response_cache.update(
+                    "game_date_index", {}, partial(add_team, team_id)
+                ),
+                range(16),
+            )
+        )
+    assert len(response_cache.get("game_date_index", {})) == 16
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            row = [1610612739, "0021700001", "OCT 17, 2017", "CLE vs. BOS"]
+            return {"resultSets": [{"rowSet": [row]}]}
+
+    index_params = {"Season": "2017-18", "SeasonType": "Regular+Season"}
+    other_cache = cache.ResponseCache(str(tmp_path))
+    other_cache.set("game_date_index", index_params, {"0021700002": "2017-10-17"})
+    monkeypatch.setattr(schedule, "GAME_DATES", {})
+    monkeypatch.setattr(cache, "CACHE", response_cache)
+    schedule.load_team_dates(
+        "2017-18", "Regular+Season", 1610612739, client=FakeClient()
+    )
+    assert response_cache.get("game_date_index", index_params) == {
+        "0021700001": "2017-10-17",
+        "0021700002": "2017-10-17",
+    }
+
+
+def test_get_json_cache(tmp_path, monkeypatch):
+    """
+    test that get_json only goes to the network when the response isn't cached
+    """
+    calls = []
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            calls.append(url)
+            return {"resultSets": []}
+
+    monkeypatch.setattr(cache, "CACHE", cache.ResponseCache(str(tmp_path)))
+
+    for _ in range(3):
+        response = hf.get_json(
+            "playbyplayv2", {"GameID": "1"}, "http://fake/1", client=FakeClient()
+        )
+        assert response == {"resultSets": []}
+    assert calls == ["http://fake/1"]
+
+
+def test_pbp_cached_when_final(tmp_path, monkeypatch):
+    """
+    test that the play by play of a game that isn't over yet isn't cached and
+    is downloaded again until it is
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+    in_progress_dict = json.loads(json.dumps(v2_dict))
+    in_progress_dict["resultSets"][0]["rowSet"] = v2_dict["resultSets"][0]["rowSet"][
+        :300
+    ]
+    responses = [in_progress_dict, in_progress_dict, v2_dict, in_progress_dict]
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            return responses.pop(0)
+
+    monkeypatch.setattr(cache, "CACHE", cache.ResponseCache(str(tmp_path)))
+
+    assert not sf.is_final_pbp(in_progress_dict)
+    assert sf.get_pbp_api("0021700001", client=FakeClient()) == in_progress_dict
+    assert sf.get_pbp_api("0021700001", client=FakeClient()) == in_progress_dict
+    assert sf.get_pbp_api("0021700001", client=FakeClient()) == v2_dict
+    assert sf.get_pbp_api("0021700001", client=FakeClient()) == v2_dict
+    assert len(responses) == 1
+
+
+def test_client_error_status(tmp_path, monkeypatch):
+    """
+    test that error responses raise instead of being decoded and cached
+    """
+
+    class ErrorTransport(BaseAdapter):
+        def send(self, request, **kwargs):
+            response = requests.Response()
+            response.status_code = 503
+            response._content = b'{"resultSets": [{"rowSet": []}]}'
+            response.request = request
+            return response
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(cache, "CACHE", cache.ResponseCache(str(tmp_path)))
+    nba_client = client.NBAClient(transport=ErrorTransport(), rate_limiter=False)
+
+    with pytest.raises(requests.HTTPError):
+        sf.get_lineup_api("0021700001", 1, client=nba_client)
+    params = {"gameId": "0021700001", "period": 1, "startRange": 5, "endRange": 1005}
+    assert cache.CACHE.get("boxscoreadvancedv2", params) is None
+
+
+def test_client_transport():
+    """
+    test that NBAClient sends requests through the transport it is given and
+    rewrites hosts in its host_map
+    """
+    sent_urls = []
+
+    class FakeTransport(BaseAdapter):
+        def send(self, request, **kwargs):
+            sent_urls.append(request.url)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'{"resultSets": [{"rowSet": []}]}'
+            response.request = request
+            return response
+
+        def close(self):
+            pass
+
+    nba_client = client.NBAClient(
+        transport=FakeTransport(),
+        host_map={"https://stats.nba.com": "http://localhost:8000"},
+    )
+    lineups = sf.get_lineup_api("0021700001", 1, client=nba_client)
+
+    assert lineups == {"resultSets": [{"rowSet": []}]}
+    assert sent_urls[0].startswith(
+        "http://localhost:8000/stats/boxscoreadvancedv2/?gameId=0021700001"
+    )
+
+
+def test_rate_limiter():
+    """
+    test that the rate limiter speeds up after fast successes, backs off after
+    errors and slow responses and keeps a separate rate for each host
+    """
+    limiter = RateLimiter(rate=2.0, max_rate=2.2, backoff=0)
+
+    limiter.record("stats.nba.com", 0.1, 200)
+    assert limiter.get_rate("stats.nba.com") == pytest.approx(2.05)
+    for _ in range(10):
+        limiter.record("stats.nba.com", 0.1, 200)
+    assert limiter.get_rate("stats.nba.com") == 2.2
+
+    limiter.record("stats.nba.com", 0.1, 429)
+    assert limiter.get_rate("stats.nba.com") == pytest.approx(1.1)
+    limiter.record("stats.nba.com", 10, 200)
+    assert limiter.get_rate("stats.nba.com") < 1.1
+    assert limiter.get_rate("data.nba.com") == 2.0
+
+    stats = limiter.stats()
+    assert stats["stats.nba.com"]["requests"] == 13
+    assert stats["stats.nba.com"]["errors"] == 1
+
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire("data.nba.com")
+    assert time.monotonic() - start >= 0.9
+
+
+def test_game_date_index(monkeypatch):
+    """
+    test that game dates come out of the season date index after the first
+    team game log is downloaded
+    """
+    calls = []
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            calls.append(url)
+            return {
+                "resultSets": [
+                    {
+                        "rowSet": [
+                            [1610612739, "0021700001", "OCT 17, 2017", "CLE vs. BOS"],
+                            [1610612739, "0021700020", "OCT 20, 2017", "CLE @ MIL"],
+                        ]
+                    }
+                ]
+            }
+
+    monkeypatch.setattr(schedule, "GAME_DATES", {})
+    monkeypatch.setattr(cache, "CACHE", None)
+
+    first_date = schedule.get_game_date(
+        "0021700001", "2017-18", "Regular+Season", 1610612739, client=FakeClient()
+    )
+    second_date = schedule.get_game_date(
+        "0021700020", "2017-18", "Regular+Season", 1610612749, client=FakeClient()
+    )
+
+    assert first_date == datetime(2017, 10, 17)
+    assert second_date == datetime(2017, 10, 20)
+    assert len(calls) == 1
+
+
+def test_schedule_date_games(monkeypatch):
+    """
+    test that date range queries come out of the sorted season schedule and
+    that each season's schedule is only downloaded once
+    """
+    calls = []
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            calls.append(url)
+            return {
+                "lscd": [
+                    {
+                        "mscd": {
+                            "g": [
+                                {"gid": "0021800001", "gdte": "2018-10-16"},
+                                {"gid": "0021800002", "gdte": "2018-10-16"},
+                                {"gid": "0021800003", "gdte": "2018-10-17"},
+                                {"gid": "0021800010", "gdte": "2018-10-20"},
+                            ]
+                        }
+                    },
+                    {"mscd": {"g": [{"gid": "0021800100", "gdte": "2018-11-01"}]}},
+                ]
+            }
+
+    monkeypatch.setattr(schedule, "SEASON_SCHEDULES", {})
+    monkeypatch.setattr(schedule, "GAME_INDEX", GameIndex())
+    monkeypatch.setattr(cache, "CACHE", None)
+
+    assert schedule.get_date_games("2018-10-16", "2018-10-17", FakeClient()) == [
+        "0021800001",
+        "0021800002",
+        "0021800003",
+    ]
+    assert schedule.get_date_games("2018-10-18", "2018-11-05", FakeClient()) == [
+        "0021800010",
+        "0021800100",
+    ]
+    assert schedule.get_date_games("2018-10-21", "2018-10-31", FakeClient()) == []
+    assert len(calls) == 1
+
+
+def test_get_season_games(monkeypatch):
+    """
+    test that season games come from the schedule filtered by season type and
+    the missing games catalog and fall back to the id range without one
+    """
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            return {
+                "lscd": [
+                    {
+                        "mscd": {
+                            "g": [
+                                {"gid": "0011200001", "gdte": "2012-10-05"},
+                                {"gid": "0021200001", "gdte": "2012-10-30"},
+                                {"gid": "0021201214", "gdte": "2013-04-16"},
+                                {"gid": "0051200101", "gdte": "2013-04-17"},
+                                {"gid": "0041200101", "gdte": "2013-04-20"},
+                            ]
+                        }
+                    }
+                ]
+            }
+
+    class BrokenClient:
+        def get_json(self, url, headers=None):
+            raise ValueError("no schedule")
+
+    monkeypatch.setattr(schedule, "SEASON_SCHEDULES", {})
+    monkeypatch.setattr(schedule, "GAME_INDEX", GameIndex())
+    monkeypatch.setattr(cache, "CACHE", None)
+
+    assert schedule.get_season_games(2013, client=FakeClient()) == ["0021200001"]
+    assert schedule.get_season_games(
+        2013, ["regular", "play_in", "playoffs"], client=FakeClient()
+    ) == ["0021200001", "0051200101", "0041200101"]
+    with pytest.raises(ValueError):
+        schedule.get_season_games(2013, ["finals"], client=FakeClient())
+
+    monkeypatch.setattr(schedule, "SEASON_SCHEDULES", {})
+    fallback_games = schedule.get_season_games(2013, client=BrokenClient())
+    assert len(fallback_games) == 1229
+    assert "0021201214" not in fallback_games
+    assert schedule.get_season_games(2013, ["playoffs"], client=BrokenClient()) == []
+
+
+def test_game_index(tmp_path, monkeypatch):
+    """
+    test that the game index is built from the schedule, used by the parser
+    instead of the play by play, saved to the cache and that the override
+    entries are applied on top of it
+    """
+    calls = []
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            calls.append(url)
+            return {
+                "lscd": [
+                    {
+                        "mscd": {
+                            "g": [
+                                {
+                                    "gid": "0021700001",
+                                    "gdte": "2017-10-17",
+                                    "h": {"tid": 1610612739, "ta": "CLE"},
+                                    "v": {"tid": 1610612738, "ta": "BOS"},
+                                }
+                            ]
+                        }
+                    }
+                ]
+            }
+
+    game_index = GameIndex()
+    monkeypatch.setattr(schedule, "SEASON_SCHEDULES", {})
+    monkeypatch.setattr(schedule, "GAME_INDEX", game_index)
+    monkeypatch.setattr(sf, "GAME_INDEX", game_index)
+    monkeypatch.setattr(cache, "CACHE", cache.ResponseCache(str(tmp_path)))
+
+    game_info = schedule.get_game_info("0021700001", FakeClient())
+    assert game_info == {
+        "game_date": "2017-10-17",
+        "season_type": "regular",
+        "home_team_id": 1610612739,
+        "home_team_abbrev": "CLE",
+        "away_team_id": 1610612738,
+        "away_team_abbrev": "BOS",
+    }
+    assert schedule.get_game_info("0021700002", FakeClient()) == {}
+    assert len(calls) == 1
+    assert GameIndex().get("nba", "0021700001") == game_info
+
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+    game_df = sf.scrape_pbp(v2_dict)
+    assert game_df["home_team_id"].unique().tolist() == [1610612739]
+    assert game_df["away_team_abbrev"].unique().tolist() == ["BOS"]
+    assert sf.fetch_game_date("0021700001", v2_dict, game_info=game_info) == (
+        datetime(2017, 10, 17)
+    )
+
+    assert game_index.get("nba", "0021500916")["periods"] == 4
+    assert game_index.get("nba", "0021700259")["home_team_abbrev"] == "HOU"
+
+
+def test_player_directory(tmp_path, monkeypatch):
+    """
+    test that the player directory only looks up each unknown player once and
+    that the names carry over to a new directory through the cache
+    """
+    calls = []
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            calls.append(url)
+            player_id = url.split("/")[-1]
+            return {"data": {"info": {"fn": "Player", "ln": player_id}}}
+
+    monkeypatch.setattr(cache, "CACHE", cache.ResponseCache(str(tmp_path)))
+
+    directory = PlayerDirectory()
+    directory.resolve([100, 101, 100, "101", 0], client=FakeClient())
+    assert len(calls) == 2
+    assert directory.get_name(101, client=FakeClient()) == "Player 101"
+    assert len(calls) == 2
+
+    new_directory = PlayerDirectory()
+    assert new_directory.get_name("100", client=FakeClient()) == "Player 100"
+    assert len(calls) == 2
+
+    other_directory = PlayerDirectory()
+    other_directory.names["200"] = "Player 200"
+    other_directory.save()
+    stored_names = cache.CACHE.get("wnba_player_directory", {})
+    assert set(stored_names) >= {"100", "101", "200"}
+
+
+def test_get_wnba_periods(monkeypatch):
+    """
+    test that every period of a WNBA game is returned in order, that only a
+    missing overtime ends the game and that the period count is remembered
+    so a rescrape doesn't probe for overtimes
+    """
+    calls = []
+    probe = {"error": None, "last_period": 5}
+
+    def http_error(status_code):
+        response = requests.Response()
+        response.status_code = status_code
+        return requests.HTTPError(f"{status_code}", response=response)
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            quarter = int(url.split("_")[-2])
+            calls.append(quarter)
+            if quarter > probe["last_period"]:
+                raise probe["error"]
+            return {"g": {"pla": [], "period": quarter}}
+
+    monkeypatch.setattr(cache, "CACHE", None)
+
+    for error in [http_error(404), http_error(403), ValueError("No JSON")]:
+        monkeypatch.setattr(wsf, "PERIOD_COUNTS", {})
+        probe["error"] = error
+        results = wsf.get_wnba_periods("021900001", "2019", client=FakeClient())
+        assert [r["g"]["period"] for r in results] == [1, 2, 3, 4, 5]
+
+    for error, last_period in [(http_error(500), 5), (http_error(404), 3)]:
+        monkeypatch.setattr(wsf, "PERIOD_COUNTS", {})
+        probe["error"] = error
+        probe["last_period"] = last_period
+        with pytest.raises(requests.HTTPError):
+            wsf.get_wnba_periods("021900001", "2019", client=FakeClient())
+        assert wsf.PERIOD_COUNTS == {}
+
+    probe["error"] = http_error(404)
+    probe["last_period"] = 5
+    results = wsf.get_wnba_periods("021900001", "2019", client=FakeClient())
+    assert [r["g"]["period"] for r in results] == [1, 2, 3, 4, 5]
+
+    calls.clear()
+    results = wsf.get_wnba_periods("021900001", "2019", client=FakeClient())
+    assert [r["g"]["period"] for r in results] == [1, 2, 3, 4, 5]
+    assert sorted(calls) == [1, 2, 3, 4, 5]
+
+
+def test_team_registry(monkeypatch):
+    """
+    test that the team registry is filled from one schedule call and that the
+    WNBA home and away teams are matched without any team details calls
+    """
+    calls = []
+
+    class FakeClient:
+        def get_json(self, url, headers=None):
+            calls.append(url)
+            game = {
+                "gid": "1021900001",
+                "h": {"tid": 1611661319, "ta": "LVA"},
+                "v": {"tid": 1611661330, "ta": "ATL"},
+            }
+            return {"lscd": [{"mscd": {"g": [game]}}]}
+
+    registry = TeamRegistry()
+    monkeypatch.setattr(cache, "CACHE", None)
+    monkeypatch.setattr(wsf, "TEAM_REGISTRY", registry)
+
+    pbp_df = pd.DataFrame(
+        {
+            "tid": [0, 1611661330, 1611661319],
+            "game_id": "021900001",
+            "home_team_abbrev": "LVA",
+        }
+    )
+    assert wsf.get_team_ids(pbp_df, client=FakeClient()) == (1611661319, 1611661330)
+    assert wsf.get_team_ids(pbp_df, client=FakeClient()) == (1611661319, 1611661330)
+    assert len(calls) == 1
+    assert registry.get_abbrev("wnba", 2019, 1611661330) == "ATL"
+
+
+def test_home_away_abbrevs():
+    """
+    test that the home and away teams are worked out from the description
+    columns of the play by play
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+
+    pbp_df = pd.DataFrame(
+        v2_dict["resultSets"][0]["rowSet"], columns=v2_dict["resultSets"][0]["headers"]
+    )
+    pbp_df.columns = list(map(str.lower, pbp_df.columns))
+
+    assert sf.get_home_away_abbrevs(pbp_df) == ("CLE", "BOS")
+
+
+def test_game_teams_override(monkeypatch):
+    """
+    test that the team abbreviations in game_overrides.json win over the
+    teams in a bad schedule row
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+
+    pbp_df = pd.DataFrame(
+        v2_dict["resultSets"][0]["rowSet"], columns=v2_dict["resultSets"][0]["headers"]
+    )
+    pbp_df.columns = list(map(str.lower, pbp_df.columns))
+    schedule_info = {"home_team_id": 1610612738, "away_team_id": 1610612739}
+
+    monkeypatch.setattr(sf.GAME_INDEX, "overrides", {"nba": {}})
+    assert sf.get_game_teams(pbp_df, schedule_info) == (
+        "BOS",
+        "CLE",
+        1610612738,
+        1610612739,
+    )
+
+    override = {"home_team_abbrev": "CLE", "away_team_abbrev": "BOS"}
+    monkeypatch.setattr(sf.GAME_INDEX, "overrides", {"nba": {"0021700001": override}})
+    assert sf.get_game_teams(pbp_df, dict(schedule_info, **override)) == (
+        "CLE",
+        "BOS",
+        1610612739,
+        1610612738,
+    )
+
+
+def test_play_in_game_date(monkeypatch):
+    """
+    test that play in games not in the PlayIn game logs fall back on the
+    Playoffs logs and then on the day of the 2019-20 bubble play in
+    """
+    with open("test_files/v2_dict.json", "r") as v2_file:
+        v2_dict = json.load(v2_file)
+    lookups = []
+    playoff_dates = {}
+
+    def fake_get_game_date(game_id, season, season_type, team_id, client=None):
+        lookups.append(season_type)
+        if season_type == "Playoffs" and game_id in playoff_dates:
+            return playoff_dates[game_id]
+        raise KeyError(game_id)
+
+    monkeypatch.setattr(sf, "get_game_date", fake_get_game_date)
+    assert sf.fetch_game_date("0051900111", v2_dict) == datetime(2020, 8, 15)
+    assert lookups == ["PlayIn", "Playoffs"]
+
+    playoff_dates["0051900111"] = datetime(2020, 8, 16)
+    assert sf.fetch_game_date("0051900111", v2_dict) == datetime(2020, 8, 16)
+    with pytest.raises(KeyError):
+        sf.fetch_game_date("0052000111", v2_dict)
+
+
+def test_get_index_season():
+    """
+    test that game ids from the 1990s map to 19xx seasons
+    """
+    assert get_index_season("0029600001") == 1996
+    assert get_index_season("1029700001") == 1997
+    assert get_index_season("0020000001") == 2000
+    assert get_index_season("0021900001") == 2019